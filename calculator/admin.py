@@ -1,30 +1,230 @@
 # calculator/admin.py
-from django.contrib import admin
-from django.utils.html import format_html
-from .models import Filament, Project, Sale
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import BigIntegerField, CharField, F, Q, Value
+from django.db.models.functions import Cast, Floor, Lower
+from django.utils.functional import cached_property
+
+from .dbstats import estimated_row_count
+from .customers import DIGITS
+from .models import ArchivedSale, Customer, Filament, Order, Printer, PrintJob, Project, Sale
+
+# Upper bound for prefix range scans: field >= term AND field < term + MAX_CHAR
+MAX_CHAR = '\U0010ffff'
+
+# field__lower__gte=...: LOWER(field), which the Lower() expression indexes serve
+CharField.register_lookup(Lower)
+
+
+def fold_case(term):
+    """Lowercase like SQLite's LOWER(), which only folds ASCII letters."""
+    return ''.join(c.lower() if c.isascii() else c for c in term)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Unfiltered changelists take their count from SQLite statistics instead of COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_row_count(self.object_list.model, using=self.object_list.db)
+            if estimate is not None:
+                return estimate
+        return super().count
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for large tables: estimated counts, no second
+    unfiltered COUNT(*), and searches that can use B-tree indexes.
+
+    Each search term must match the start of one of `prefix_search_fields`
+    (run as a range scan, which SQLite serves from a B-tree index where LIKE
+    cannot) or equal one of the integer `exact_search_fields`. Range scans are
+    case-sensitive, which does not matter for Persian text or digits; fields
+    that also hold Latin names are listed in `casefold_search_fields` and
+    scanned as LOWER(field), each backed by an index on that expression.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    prefix_search_fields = ()
+    casefold_search_fields = ()
+    exact_search_fields = ()
+
+    def get_search_fields(self, request):
+        # Only decides whether the search box is shown
+        return [*self.prefix_search_fields, *self.exact_search_fields]
+
+    def _prefix_condition(self, field, term):
+        lookup = field
+        if field in self.casefold_search_fields:
+            lookup, term = f'{field}__lower', fold_case(term)
+        condition = {f'{lookup}__gte': term, f'{lookup}__lt': term + MAX_CHAR}
+        relation, _, remote_field = field.partition('__')
+        if not remote_field:
+            return Q(**condition)
+        remote_lookup = lookup.partition('__')[2]
+        # fk IN (subquery) keeps each OR branch indexable; a JOIN would not
+        related = self.model._meta.get_field(relation).related_model
+        return Q(**{f'{relation}__in': related.objects.filter(
+            **{f'{remote_lookup}__gte': term, f'{remote_lookup}__lt': term + MAX_CHAR})})
+
+    def get_search_results(self, request, queryset, search_term):
+        for term in search_term.split():
+            condition = Q()
+            for field in self.prefix_search_fields:
+                condition |= self._prefix_condition(field, term)
+            if term.isdigit():
+                for field in self.exact_search_fields:
+                    condition |= Q(**{field: int(term)})
+            queryset = queryset.filter(condition)
+        return queryset, False
+
 
 @admin.register(Filament)
-class FilamentAdmin(admin.ModelAdmin):
+class FilamentAdmin(ScalableAdmin):
     list_display = ['name', 'color', 'material', 'remaining_amount', 'initial_amount', 'cost_per_kg', 'created_date']
     list_filter = ['material', 'created_date']
-    search_fields = ['name', 'color']
+    prefix_search_fields = ['name', 'color']
+    casefold_search_fields = ['name', 'color']
+    search_help_text = 'جستجو با ابتدای نام یا رنگ'
+    readonly_fields = ['created_date']
+
+
+@admin.register(Printer)
+class PrinterAdmin(admin.ModelAdmin):
+    list_display = ['name', 'bed_x', 'bed_y', 'bed_z', 'power_kw', 'depreciation_per_hour', 'loaded_filament', 'is_active']
+    list_filter = ['is_active']
+    readonly_fields = ['created_date']
+
+
+@admin.register(PrintJob)
+class PrintJobAdmin(admin.ModelAdmin):
+    list_display = ['project', 'quantity', 'status', 'printer', 'sequence', 'planned_start', 'planned_end']
+    list_select_related = ['project', 'printer']
+    list_filter = ['status', 'printer']
+    raw_id_fields = ['project']
     readonly_fields = ['created_date']
-    
+
+
+class ProjectActionForm(ActionForm):
+    filament = forms.ModelChoiceField(
+        queryset=Filament.objects.order_by('name', 'color'), required=False, label='فیلامنت جدید'
+    )
+
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(ScalableAdmin):
     list_display = ['code', 'model_name', 'filament', 'total_cost', 'selling_price', 'created_date']
+    list_select_related = ['filament']
     list_filter = ['filament', 'created_date']
-    search_fields = ['model_name', 'code']
-    readonly_fields = ['code', 'filament_weight_used', 'electricity_cost', 'depreciation_cost', 
-                      'post_processing_cost', 'painting_cost', 'material_cost', 'total_cost', 
+    prefix_search_fields = ['model_name']
+    casefold_search_fields = ['model_name']
+    exact_search_fields = ['code']
+    search_help_text = 'جستجو با ابتدای نام مدل یا کد دقیق'
+    readonly_fields = ['code', 'gcode_print_hours', 'filament_weight_used', 'electricity_cost', 'depreciation_cost',
+                      'post_processing_cost', 'painting_cost', 'material_cost', 'total_cost',
                       'selling_price', 'created_date']
+    action_form = ProjectActionForm
+    actions = ['reprice', 'recalculate_costs', 'reassign_filament']
+
+    @admin.action(description='محاسبه مجدد قیمت فروش بر اساس سیاست قیمت‌گذاری')
+    def reprice(self, request, queryset):
+        updated = queryset.update(selling_price=Project.policy_price_expression())
+        self.message_user(request, f'قیمت {updated} مدل به‌روزرسانی شد.', messages.SUCCESS)
+
+    @admin.action(description='محاسبه مجدد هزینه‌ها با قیمت فعلی فیلامنت و پرینتر')
+    def recalculate_costs(self, request, queryset):
+        updated = Project.recalculate_costs(queryset)
+        self.message_user(request, f'هزینه {updated} مدل دوباره محاسبه شد.', messages.SUCCESS)
+
+    @admin.action(description='تغییر فیلامنت مدل‌های انتخاب‌شده')
+    def reassign_filament(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        filament = form.cleaned_data['filament'] if form.is_valid() else None
+        if filament is None:
+            self.message_user(request, 'ابتدا فیلامنت جدید را انتخاب کنید.', messages.WARNING)
+            return
+        # One UPDATE: every SET expression reads the old row, so the new
+        # total is derived from the old total minus the old material cost.
+        material_cost = Cast(Floor(F('filament_weight_used') * Value(filament.cost_per_kg / 1000) + 0.5),
+                             BigIntegerField())
+        total_cost = F('total_cost') - F('material_cost') + material_cost
+        with transaction.atomic():
+            updated = queryset.update(
+                filament=filament,
+                material_cost=material_cost,
+                total_cost=total_cost,
+                selling_price=Project.policy_price_expression(total_cost),
+            )
+        self.message_user(request, f'فیلامنت {updated} مدل به «{filament}» تغییر کرد.', messages.SUCCESS)
 
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(ScalableAdmin):
     list_display = ['project_code', 'customer_name', 'customer_phone', 'sale_date']
     list_filter = ['sale_date', 'project__filament']
-    search_fields = ['customer_name', 'customer_phone', 'project__model_name', 'project_code']
-    readonly_fields = ['project_code', 'sale_date']
-    
+    prefix_search_fields = ['customer_name', 'customer_phone', 'project__model_name']
+    casefold_search_fields = ['project__model_name']
+    exact_search_fields = ['project_code']
+    search_help_text = 'جستجو با ابتدای نام مشتری، تلفن یا نام مدل، یا کد دقیق مدل'
+    readonly_fields = ['project_code', 'sale_date', 'order', 'customer']
+
+
+class OrderLineInline(admin.TabularInline):
+    # Lines are written with their order's stored totals; edit neither here
+    model = Sale
+    fields = ['project_code', 'quantity', 'unit_price', 'packaging_cost', 'total_price']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Order)
+class OrderAdmin(ScalableAdmin):
+    list_display = ['pk', 'customer_name', 'customer_phone', 'line_count', 'total_price', 'order_date']
+    date_hierarchy = 'order_date'
+    prefix_search_fields = ['customer_name', 'customer_phone']
+    exact_search_fields = ['id']
+    search_help_text = 'جستجو با ابتدای نام مشتری یا تلفن، یا شماره دقیق سفارش'
+    readonly_fields = ['order_date', 'line_count', 'total_quantity', 'subtotal', 'packaging_cost',
+                       'production_cost', 'total_price']
+    inlines = [OrderLineInline]
+
+
+@admin.register(Customer)
+class CustomerAdmin(ScalableAdmin):
+    list_display = ['name', 'phone', 'order_count', 'revenue', 'profit', 'last_purchase']
+    prefix_search_fields = ['phone', 'name']
+    search_help_text = 'جستجو با ابتدای شماره تماس یا نام'
+    readonly_fields = ['order_count', 'revenue', 'profit', 'first_purchase', 'last_purchase']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Phones are stored with ASCII digits
+        return super().get_search_results(request, queryset, search_term.translate(DIGITS))
+
+
+@admin.register(ArchivedSale)
+class ArchivedSaleAdmin(ScalableAdmin):
+    """Read-only view of archive.sqlite3; rows get there through manage.py archive_sales."""
+    list_display = ['project_code', 'model_name', 'quantity', 'total_price', 'customer_name', 'sale_date']
+    date_hierarchy = 'sale_date'
+    exact_search_fields = ['project_code']
+    search_help_text = 'جستجو با کد دقیق مدل'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
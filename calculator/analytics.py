@@ -0,0 +1,370 @@
+# calculator/analytics.py
+import os
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DatabaseError
+from django.db.models import Avg, BigIntegerField, CharField, Count, ExpressionWrapper, F, Func, Max, Sum, Value
+
+from .jalali import jalali_month_label
+from .localtime import local_day_range, utc_offset_segments
+from .models import ArchivedFiscalYear, ArchivedSale, Filament, Order, Project, Sale, SaleRollup
+
+BUCKETS = ('hour', 'day', 'week', 'month', 'quarter', 'year')
+
+# bucket -> CalendarDay fields (through Sale.calendar_day) that identify a period
+PERIOD_FIELDS = {
+    'day': ('calendar_day', 'calendar_day__jalali_year', 'calendar_day__jalali_month', 'calendar_day__jalali_day'),
+    'week': ('calendar_day__week_start',),
+    'month': ('calendar_day__jalali_year', 'calendar_day__jalali_month'),
+    'quarter': ('calendar_day__jalali_year', 'calendar_day__jalali_quarter'),
+    'year': ('calendar_day__jalali_year',),
+}
+
+# group name -> values() fields; the first one is the grouping key
+GROUPS = {
+    'project': ('project_id', 'project__code', 'project__model_name'),
+    'filament': ('project__filament_id', 'project__filament__name', 'project__filament__color'),
+    'material': ('project__filament__material',),
+}
+
+
+# Per-sale money computed in SQL, in whole Toman, so SUMs are exact integers
+# (same definitions as Sale.total_profit: packaging is a pass-through cost, not profit)
+PRODUCTION_COST = ExpressionWrapper(F('project__total_cost') * F('quantity'), output_field=BigIntegerField())
+PROFIT = ExpressionWrapper((F('unit_price') - F('project__total_cost')) * F('quantity'), output_field=BigIntegerField())
+
+
+class _ShiftedDate(Func):
+    # SQLite strftime() with a '+N seconds' modifier: stays in native SQL
+    # instead of calling Django's per-row Python tz conversion function.
+    output_field = CharField()
+
+
+def _local_hour(offset):
+    return _ShiftedDate(Value('%Y-%m-%d %H:00'), F('sale_date'), Value(f'{offset:+d} seconds'), function='strftime')
+
+
+def _period(row, bucket):
+    """(sortable period key, display label) of an aggregated row."""
+    if bucket == 'hour':
+        return row['k'], row['k']
+    if bucket == 'day':
+        d = row['calendar_day']
+        return d.isoformat(), '%d/%02d/%02d' % (
+            row['calendar_day__jalali_year'], row['calendar_day__jalali_month'], row['calendar_day__jalali_day'])
+    if bucket == 'week':
+        d = row['calendar_day__week_start']
+        return d.isoformat(), d.isoformat()
+    jy = row['calendar_day__jalali_year']
+    if bucket == 'month':
+        jm = row['calendar_day__jalali_month']
+        return f'{jy:04d}-{jm:02d}', jalali_month_label(jy, jm)
+    if bucket == 'quarter':
+        q = row['calendar_day__jalali_quarter']
+        return f'{jy:04d}-Q{q}', f'فصل {q} {jy}'
+    return f'{jy:04d}', str(jy)
+
+
+def _aggregate(qs, keys, group_fields):
+    return (qs.values(*keys, *group_fields)
+            .annotate(
+                count=Count('id'),
+                total_quantity=Sum('quantity'),
+                revenue=Sum('total_price'),
+                packaging_cost=Sum('packaging_cost'),
+                production_cost=Sum(PRODUCTION_COST),
+                profit=Sum(PROFIT),
+            )
+            .order_by(*keys))
+
+
+def sales_series(start_date, end_date, bucket='day', group=None):
+    """
+    Revenue / cost / profit / quantity of sales between two local dates
+    (inclusive) per time bucket, optionally split by project, filament or material.
+
+    Day and coarser buckets are one GROUP BY over Sale.local_date joined to the
+    CalendarDay dimension. Hourly buckets shift sale_date in SQL, one query per
+    constant-UTC-offset span. Dates in archived fiscal years come from the
+    archive's day rollups (hourly: its sale rows).
+    """
+    group_fields = GROUPS[group] if group else ()
+
+    cutoff = archived_through()
+    rows = []
+    if cutoff and start_date <= cutoff:
+        rows.extend(_archived_series_rows(start_date, min(end_date, cutoff), bucket, group_fields))
+
+    if bucket == 'hour':
+        start, end = local_day_range(start_date, end_date)
+        for seg_start, seg_end, offset in utc_offset_segments(start, end):
+            qs = (Sale.objects
+                  .filter(sale_date__gte=seg_start, sale_date__lt=seg_end)
+                  .annotate(k=_local_hour(offset)))
+            rows.extend(_aggregate(qs, ('k',), group_fields))
+    else:
+        qs = Sale.objects.filter(calendar_day__gte=start_date, calendar_day__lte=end_date)
+        rows.extend(_aggregate(qs, PERIOD_FIELDS[bucket], group_fields))
+
+    series = OrderedDict()
+    totals = {'count': 0, 'quantity': 0, 'revenue': 0, 'cost': 0, 'profit': 0}
+    for row in rows:
+        period, label = _period(row, bucket)
+        group_key = row[group_fields[0]] if group_fields else None
+        # Hourly rows of the same local hour may come from two offset spans,
+        # and a week or hour may be split between the archive and hot data.
+        item = series.get((period, group_key))
+        if item is None:
+            item = series[(period, group_key)] = {
+                'period': period,
+                'label': label,
+                'count': 0, 'quantity': 0, 'revenue': 0, 'cost': 0, 'profit': 0,
+            }
+            if group_fields:
+                item['group'] = {f.split('__')[-1]: row[f] for f in group_fields}
+        cost = (row['production_cost'] or 0) + (row['packaging_cost'] or 0)
+        for target in (item, totals):
+            target['count'] += row['count']
+            target['quantity'] += row['total_quantity'] or 0
+            target['revenue'] += row['revenue'] or 0
+            target['cost'] += cost
+            target['profit'] += row['profit'] or 0
+
+    return {
+        'bucket': bucket,
+        'group': group,
+        'series': sorted(series.values(), key=lambda item: item['period']),
+        'totals': totals,
+    }
+
+
+def sales_totals(qs):
+    """Count / revenue / cost / profit of a Sale queryset in one aggregate query."""
+    totals = qs.aggregate(
+        total_sales=Count('id'),
+        total_revenue=Sum('total_price'),
+        total_production_cost=Sum(PRODUCTION_COST),
+        total_packaging_cost=Sum('packaging_cost'),
+        total_profit=Sum(PROFIT),
+    )
+    totals = {k: v or 0 for k, v in totals.items()}
+    totals['total_cost'] = totals['total_production_cost'] + totals['total_packaging_cost']
+    return totals
+
+
+
+def order_totals(since=None):
+    """Order count, average order value and average lines per order, from the stored order totals."""
+    qs = Order.objects.all()
+    if since is not None:
+        qs = qs.filter(order_date__gte=since)
+    totals = qs.aggregate(
+        total_orders=Count('id'),
+        average_order_value=Avg('total_price'),
+        average_order_lines=Avg('line_count'),
+    )
+    return {
+        'total_orders': totals['total_orders'],
+        'average_order_value': round(totals['average_order_value'] or 0),
+        'average_order_lines': round(totals['average_order_lines'] or 0, 1),
+    }
+
+SaleRow = namedtuple('SaleRow', [
+    'id', 'project_code', 'model_name', 'filament_name', 'filament_color', 'image_url',
+    'quantity', 'unit_price', 'packaging_cost', 'total_price', 'production_cost', 'profit',
+    'customer_name', 'customer_phone', 'sale_date',
+])
+
+_ROW_FIELDS = (
+    'id', 'project_code', 'project__model_name', 'project__filament__name', 'project__filament__color',
+    'project__picture', 'quantity', 'unit_price', 'packaging_cost', 'total_price', 'row_production_cost',
+    'row_profit', 'customer_name', 'customer_phone', 'sale_date',
+)
+
+
+def sale_rows_queryset(qs):
+    """Tuples of the reports table columns; money columns are computed in SQL. Paginate this."""
+    return qs.annotate(row_production_cost=PRODUCTION_COST, row_profit=PROFIT).values_list(*_ROW_FIELDS)
+
+
+def sale_rows(rows):
+    """
+    SaleRow objects for (a page of) sale_rows_queryset() without instantiating
+    Sale/Project/Filament. Project.picture already holds the resized thumbnail,
+    so its URL is built from the stored name.
+    """
+    image_urls = {}
+    for row in rows:
+        picture = row[5]
+        if picture and picture not in image_urls:
+            image_urls[picture] = default_storage.url(picture)
+        yield SaleRow._make(row[:5] + (image_urls.get(picture),) + row[6:])
+
+
+# --------------------------------------------------------------------------------------
+# Archived sales (closed fiscal years in archive.sqlite3, see calculator/archive.py)
+# --------------------------------------------------------------------------------------
+
+# Sale-side values() names -> SaleRollup / ArchivedSale columns
+ARCHIVE_FIELDS = {
+    'calendar_day': 'local_date',
+    'calendar_day__jalali_year': 'jalali_year',
+    'calendar_day__jalali_month': 'jalali_month',
+    'calendar_day__jalali_day': 'jalali_day',
+    'calendar_day__jalali_quarter': 'jalali_quarter',
+    'calendar_day__week_start': 'week_start',
+    'project_id': 'project_id',
+    'project__code': 'project_code',
+    'project__model_name': 'model_name',
+    'project__filament_id': 'filament_id',
+    'project__filament__material': 'material',
+}
+# Filled from the Filament table; the archive keeps only the id
+FILAMENT_FIELDS = {'project__filament__name': 'name', 'project__filament__color': 'color'}
+
+ROLLUP_SUMS = {
+    'count': Sum('count'),
+    'total_quantity': Sum('quantity'),
+    'revenue': Sum('revenue'),
+    'packaging_cost': Sum('packaging_cost'),
+    'production_cost': Sum('production_cost'),
+    'profit': Sum('profit'),
+}
+ARCHIVED_SALE_SUMS = {
+    'count': Count('id'),
+    'total_quantity': Sum('quantity'),
+    'revenue': Sum('total_price'),
+    'packaging_cost': Sum('packaging_cost'),
+    'production_cost': Sum('production_cost'),
+    'sold': Sum(F('unit_price') * F('quantity')),
+}
+
+
+def archived_through():
+    """Last local date held in the sales archive, or None when nothing is archived."""
+    if not os.path.exists(settings.DATABASES['archive']['NAME']):
+        return None
+    try:
+        return ArchivedFiscalYear.objects.aggregate(last=Max('last_date'))['last']
+    except DatabaseError:  # archive database not migrated yet
+        return None
+
+
+def _archive_aggregate(qs, keys, group_fields, sums):
+    """Archive rows shaped like _aggregate() rows (same keys)."""
+    names = [f for f in (*keys, *group_fields) if f not in FILAMENT_FIELDS]
+    columns = [ARCHIVE_FIELDS.get(f, f) for f in names]
+    rows = list(qs.values(*columns).annotate(**sums).order_by(*[ARCHIVE_FIELDS.get(k, k) for k in keys]))
+    filaments = {}
+    if any(f in FILAMENT_FIELDS for f in group_fields):
+        filaments = {f.pk: f for f in Filament.objects.only('name', 'color')}
+    for row in rows:
+        out = {name: row[column] for name, column in zip(names, columns)}
+        for field, attr in FILAMENT_FIELDS.items():
+            if field in group_fields:
+                filament = filaments.get(row['filament_id'])
+                out[field] = getattr(filament, attr) if filament else None
+        out.update((k, row[k]) for k in sums)
+        yield out
+
+
+def _archived_series_rows(start_date, end_date, bucket, group_fields):
+    if bucket == 'hour':
+        rows = []
+        start, end = local_day_range(start_date, end_date)
+        for seg_start, seg_end, offset in utc_offset_segments(start, end):
+            qs = (ArchivedSale.objects
+                  .filter(sale_date__gte=seg_start, sale_date__lt=seg_end)
+                  .annotate(k=_local_hour(offset)))
+            rows.extend(_archive_aggregate(qs, ('k',), group_fields, ARCHIVED_SALE_SUMS))
+        for row in rows:
+            # Same definition as PROFIT; an annotation named after a column
+            # hides that column, so it is derived here
+            row['profit'] = row.pop('sold') - row['production_cost']
+        return rows
+    qs = SaleRollup.objects.filter(local_date__gte=start_date, local_date__lte=end_date)
+    return list(_archive_aggregate(qs, PERIOD_FIELDS[bucket], group_fields, ROLLUP_SUMS))
+
+
+def archived_report(since=None, item_filter=''):
+    """
+    The reports page's figures over archived sales, from the day rollups:
+    totals (sales_totals() keys), product, day and Jalali month groups.
+    `since` is a local date (archived sales count per whole day).
+    """
+    qs = SaleRollup.objects.all()
+    if since:
+        qs = qs.filter(local_date__gte=since)
+    if item_filter:
+        qs = qs.filter(model_name__icontains=item_filter)
+
+    totals = qs.aggregate(
+        total_sales=Sum('count'),
+        total_revenue=Sum('revenue'),
+        total_production_cost=Sum('production_cost'),
+        total_packaging_cost=Sum('packaging_cost'),
+        total_profit=Sum('profit'),
+    )
+    totals = {k: v or 0 for k, v in totals.items()}
+    totals['total_cost'] = totals['total_production_cost'] + totals['total_packaging_cost']
+
+    def grouped(*fields, sums=('count', 'revenue', 'total_quantity')):
+        return _archive_aggregate(qs, fields, (), {k: ROLLUP_SUMS[k] for k in sums})
+
+    return {
+        'totals': totals,
+        'products': list(grouped('project__model_name')),
+        'daily': list(grouped('calendar_day', 'calendar_day__jalali_year',
+                              'calendar_day__jalali_month', 'calendar_day__jalali_day')),
+        'monthly': list(grouped('calendar_day__jalali_year', 'calendar_day__jalali_month')),
+    }
+
+
+def merge_stats(hot, archived, keys, order_by, limit=None, reverse=True):
+    """Sum count / revenue / total_quantity of two lists of grouped rows by `keys`."""
+    merged = OrderedDict()
+    for row in [*hot, *archived]:
+        key = tuple(row[k] for k in keys)
+        item = merged.get(key)
+        if item is None:
+            merged[key] = dict(row)
+        else:
+            for field in ('count', 'revenue', 'total_quantity'):
+                item[field] = (item[field] or 0) + (row[field] or 0)
+    rows = sorted(merged.values(), key=order_by, reverse=reverse)
+    return rows[:limit] if limit else rows
+
+
+_ARCHIVED_ROW_FIELDS = (
+    'id', 'project_code', 'model_name', 'project_id', 'filament_id', 'quantity', 'unit_price',
+    'packaging_cost', 'total_price', 'production_cost', 'customer_name', 'customer_phone', 'sale_date',
+)
+
+
+def archived_sale_rows_queryset(since=None, item_filter=''):
+    """Archived sales for the reports table (drill-down). Paginate this."""
+    qs = ArchivedSale.objects.all()
+    if since:
+        qs = qs.filter(local_date__gte=since)
+    if item_filter:
+        qs = qs.filter(model_name__icontains=item_filter)
+    return qs.order_by('-sale_date', '-id').values_list(*_ARCHIVED_ROW_FIELDS)
+
+
+def archived_sale_rows(rows):
+    """SaleRow objects for a page of archived_sale_rows_queryset(); pictures and spools from the live tables."""
+    rows = list(rows)
+    projects = {p['id']: p for p in Project.objects.filter(id__in={r[3] for r in rows}).values('id', 'picture')}
+    filaments = {f['id']: f for f in Filament.objects.filter(id__in={r[4] for r in rows}).values('id', 'name', 'color')}
+    for (pk, code, model_name, project_id, filament_id, quantity, unit_price, packaging_cost, total_price,
+         production_cost, customer_name, customer_phone, sale_date) in rows:
+        picture = projects.get(project_id, {}).get('picture')
+        filament = filaments.get(filament_id, {})
+        yield SaleRow(
+            pk, code, model_name, filament.get('name'), filament.get('color'),
+            default_storage.url(picture) if picture else None,
+            quantity, unit_price, packaging_cost, total_price, production_cost,
+            unit_price * quantity - production_cost, customer_name, customer_phone, sale_date,
+        )
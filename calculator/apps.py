@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class CalculatorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calculator'
-    verbose_name = 'محاسبگر پرینت سه‌بعدی'
\ No newline at end of file
+    verbose_name = 'محاسبگر پرینت سه‌بعدی'
+
+    def ready(self):
+        from . import customers, dbrouting
+        customers.connect_signals()
+        dbrouting.connect_signals()
@@ -0,0 +1,145 @@
+# calculator/archive.py
+# Hot/cold split of Sale: closed fiscal years are moved into archive.sqlite3
+# (the "archive" database) as ArchivedSale rows plus SaleRollup day x project
+# sums, so the main database keeps only recent sales. The move runs on the
+# default connection with archive.sqlite3 ATTACHed, in two steps per year:
+# copy and roll up (idempotent), then delete only the hot rows the archive
+# holds. A crash between the two leaves duplicates that a re-run removes;
+# never a loss. Reading the archive back is in calculator/analytics.py.
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cache import bump_generation
+from .dbrouting import ARCHIVE_DB
+from .dbstats import refresh_table_stats
+from .models import (
+    ArchivedFiscalYear, ArchivedSale, CalendarDay, Filament, Project, Sale, SaleRollup,
+)
+
+ArchivedYear = namedtuple('ArchivedYear', 'fiscal_year sales')
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def current_fiscal_year(today=None):
+    today = today or timezone.localdate()
+    day = CalendarDay.objects.filter(date=today).values_list('fiscal_year', flat=True).first()
+    if day is None:
+        raise ArchiveError(f"{today} is not in the calendar table; run manage.py build_calendar")
+    return day
+
+
+def archivable_years(keep=None, today=None):
+    """Fiscal years of hot sales older than the newest `keep` (SALES_HOT_FISCAL_YEARS)."""
+    keep = settings.SALES_HOT_FISCAL_YEARS if keep is None else keep
+    if keep < 1:
+        raise ArchiveError("The current fiscal year is never archived (keep must be at least 1)")
+    newest_cold = current_fiscal_year(today) - keep
+    return sorted(
+        Sale.objects.filter(calendar_day__fiscal_year__lte=newest_cold)
+        .values_list('calendar_day__fiscal_year', flat=True).distinct().order_by()
+    )
+
+
+def _tables():
+    return {
+        'sale': Sale._meta.db_table,
+        'project': Project._meta.db_table,
+        'filament': Filament._meta.db_table,
+        'day': CalendarDay._meta.db_table,
+        'archived': ArchivedSale._meta.db_table,
+        'rollup': SaleRollup._meta.db_table,
+        'years': ArchivedFiscalYear._meta.db_table,
+    }
+
+
+COPY_SQL = """
+INSERT OR IGNORE INTO archive.{archived}
+    (id, order_id, customer_id, project_id, project_code, model_name, filament_id, material, quantity, customer_name,
+     customer_phone, unit_price, packaging_cost, total_price, production_cost, sale_date, local_date, notes)
+SELECT s.id, s.order_id, s.customer_id, s.project_id, s.project_code, p.model_name, p.filament_id, COALESCE(f.material, ''),
+       s.quantity, s.customer_name, s.customer_phone, s.unit_price, s.packaging_cost, s.total_price,
+       p.total_cost * s.quantity, s.sale_date, s.local_date, s.notes
+FROM main.{sale} s
+JOIN main.{project} p ON p.id = s.project_id
+LEFT JOIN main.{filament} f ON f.id = p.filament_id
+JOIN main.{day} d ON d.date = s.local_date
+WHERE d.fiscal_year = %s
+"""
+
+ROLLUP_SQL = """
+INSERT INTO archive.{rollup}
+    (local_date, week_start, jalali_year, jalali_month, jalali_day, jalali_quarter, fiscal_year,
+     project_id, project_code, model_name, filament_id, material,
+     count, quantity, revenue, packaging_cost, production_cost, profit)
+SELECT a.local_date, d.week_start, d.jalali_year, d.jalali_month, d.jalali_day, d.jalali_quarter, d.fiscal_year,
+       a.project_id, MAX(a.project_code), MAX(a.model_name), MAX(a.filament_id), MAX(a.material),
+       COUNT(*), SUM(a.quantity), SUM(a.total_price), SUM(a.packaging_cost), SUM(a.production_cost),
+       SUM(a.unit_price * a.quantity - a.production_cost)
+FROM archive.{archived} a
+JOIN main.{day} d ON d.date = a.local_date
+WHERE d.fiscal_year = %s
+GROUP BY a.local_date, a.project_id
+"""
+
+YEAR_SQL = """
+INSERT OR REPLACE INTO archive.{years} (fiscal_year, first_date, last_date, sales, archived_at)
+SELECT %s, MIN(d.date), MAX(d.date),
+       (SELECT COUNT(*) FROM archive.{archived} a JOIN main.{day} d2 ON d2.date = a.local_date
+        WHERE d2.fiscal_year = %s),
+       %s
+FROM main.{day} d WHERE d.fiscal_year = %s
+"""
+
+DELETE_SQL = """
+DELETE FROM main.{sale}
+WHERE local_date IN (SELECT date FROM main.{day} WHERE fiscal_year = %s)
+  AND id IN (SELECT id FROM archive.{archived})
+"""
+
+
+def _archive_year(cursor, year):
+    t = _tables()
+    now = cursor.db.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        cursor.execute(COPY_SQL.format(**t), [year])
+        cursor.execute(f"DELETE FROM archive.{t['rollup']} WHERE fiscal_year = %s", [year])
+        cursor.execute(ROLLUP_SQL.format(**t), [year])
+        cursor.execute(YEAR_SQL.format(**t), [year, year, now, year])
+    with transaction.atomic():
+        cursor.execute(DELETE_SQL.format(**t), [year])
+        return cursor.rowcount
+
+
+def archive_sales(years, vacuum=False):
+    """
+    Move the sales of the given fiscal years to the archive; returns
+    ArchivedYear(fiscal_year, sales moved) per year. Refreshes planner
+    statistics afterwards and, with `vacuum`, shrinks the main file (this
+    blocks writers while it runs).
+    """
+    call_command('migrate', database=ARCHIVE_DB, interactive=False, verbosity=0)
+    archive_path = connections[ARCHIVE_DB].settings_dict['NAME']
+    moved = []
+    connection = connections['default']
+    with connection.cursor() as cursor:
+        cursor.execute("ATTACH DATABASE %s AS archive", [str(archive_path)])
+        try:
+            for year in years:
+                moved.append(ArchivedYear(year, _archive_year(cursor, year)))
+        finally:
+            cursor.execute("DETACH DATABASE archive")
+        if vacuum and moved:
+            cursor.execute("VACUUM")
+
+    bump_generation(Sale)
+    bump_generation(ArchivedSale)
+    refresh_table_stats()
+    refresh_table_stats(ARCHIVE_DB)
+    return moved
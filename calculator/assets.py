@@ -0,0 +1,55 @@
+# calculator/assets.py
+# Third-party front-end assets. `manage.py vendor_assets` downloads them into
+# static/vendor/ at build time; until then templates fall back to the CDNs.
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+BOOTSTRAP_VERSION = '5.3.0'
+FONTAWESOME_VERSION = '6.4.0'
+VAZIRMATN_VERSION = '33.0.3'
+
+BOOTSTRAP_CDN = f'https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist'
+FONTAWESOME_CDN = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONTAWESOME_VERSION}'
+VAZIRMATN_CDN = f'https://cdn.jsdelivr.net/npm/vazirmatn@{VAZIRMATN_VERSION}/fonts/webfonts'
+
+# Only the weights the stylesheet actually uses
+VAZIRMATN_WEIGHTS = {
+    300: 'Light',
+    400: 'Regular',
+    500: 'Medium',
+    600: 'SemiBold',
+    700: 'Bold',
+}
+
+# (name, kind) -> (vendored static path, CDN fallback URL)
+VENDOR_ASSETS = {
+    ('bootstrap', 'css'): (
+        'vendor/bootstrap/bootstrap.rtl.min.css',
+        f'{BOOTSTRAP_CDN}/css/bootstrap.rtl.min.css',
+    ),
+    ('bootstrap', 'js'): (
+        'vendor/bootstrap/bootstrap.bundle.min.js',
+        f'{BOOTSTRAP_CDN}/js/bootstrap.bundle.min.js',
+    ),
+    ('fontawesome', 'css'): (
+        'vendor/fontawesome/fontawesome.subset.css',
+        f'{FONTAWESOME_CDN}/css/all.min.css',
+    ),
+    ('vazirmatn', 'css'): (
+        'vendor/vazirmatn/vazirmatn.css',
+        'https://fonts.googleapis.com/css2?family=Vazirmatn:wght@300;400;500;600;700&display=swap',
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def _is_vendored(path):
+    return finders.find(path) is not None
+
+
+def vendor_url(name, kind):
+    """URL of a third-party asset: the local copy when vendored, the CDN otherwise."""
+    path, cdn_url = VENDOR_ASSETS[(name, kind)]
+    return static(path) if _is_vendored(path) else cdn_url
@@ -0,0 +1,396 @@
+# calculator/backup.py
+# Online backups of DATA_DIR: calculator.sqlite3, archive.sqlite3 and
+# lic_state.sqlite3 are copied with SQLite's backup API in small page steps
+# (writers are never locked out for more than one step), checked, gzipped and
+# checksummed into BACKUP_DIR/snapshots/<name>/. Media files go to a
+# content-addressed store (BACKUP_DIR/media/<sha256>) so each distinct file is
+# stored once; a snapshot manifest maps media paths to hashes. Old snapshots
+# are rotated and blobs no snapshot references are dropped.
+#
+# Snapshots, rotation, verification and restores hold BACKUP_DIR/backup.lock
+# (an EXCLUSIVE transaction on an empty SQLite file, released even if its
+# holder dies), so the scheduler and a manage.py backup in another terminal
+# can never prune the blobs of a snapshot that is still being written.
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+
+MANIFEST = "manifest.json"
+CHUNK = 1024 * 1024
+# Busy timeout for the backup's own connections, seconds
+CONNECT_TIMEOUT = 30
+LOCK_FILE = "backup.lock"
+# How long to wait for another backup or restore to finish, seconds
+LOCK_TIMEOUT = 15 * 60
+
+Snapshot = namedtuple("Snapshot", "name path created databases media_files media_bytes new_media")
+
+
+class BackupError(Exception):
+    pass
+
+
+_held = threading.local()
+
+
+@contextmanager
+def _exclusive():
+    """Hold the backup lock; re-entrant within a thread (a restore takes a snapshot)."""
+    if getattr(_held, "depth", 0):
+        _held.depth += 1
+        try:
+            yield
+        finally:
+            _held.depth -= 1
+        return
+    directory = Path(settings.BACKUP_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(directory / LOCK_FILE, timeout=LOCK_TIMEOUT, isolation_level=None)
+    try:
+        try:
+            conn.execute("BEGIN EXCLUSIVE")
+        except sqlite3.OperationalError as e:
+            raise BackupError(f"Another backup or restore is still running ({e})") from e
+        _held.depth = 1
+        try:
+            yield
+        finally:
+            _held.depth = 0
+            conn.execute("ROLLBACK")
+    finally:
+        conn.close()
+
+
+def _databases():
+    """{file name: path} of the SQLite files to back up."""
+    files = [Path(settings.DATABASES[alias]["NAME"]) for alias in ("default", "archive")]
+    files.append(Path(settings.DATA_DIR) / "lic_state.sqlite3")
+    return {path.name: path for path in files}
+
+
+def _snapshots_dir():
+    return Path(settings.BACKUP_DIR) / "snapshots"
+
+
+def _media_store():
+    return Path(settings.BACKUP_DIR) / "media"
+
+
+def _blob_path(digest):
+    return _media_store() / digest[:2] / digest
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _integrity_check(path):
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise BackupError(f"{path.name}: integrity check failed ({result})")
+
+
+def online_copy(source, target, pages=None, pause=None):
+    """
+    Copy a live SQLite database with the backup API, `pages` pages per step.
+    The source is only read-locked during a step; the pause between steps
+    lets writers in. A write from another connection restarts the copy, so
+    the result is always a consistent snapshot.
+    """
+    pages = settings.BACKUP_PAGES_PER_STEP if pages is None else pages
+    pause = settings.BACKUP_STEP_PAUSE if pause is None else pause
+
+    def progress(status, remaining, total):
+        if remaining and pause:
+            time.sleep(pause)
+
+    src = sqlite3.connect(f"file:{quote(str(source))}?mode=ro", uri=True, timeout=CONNECT_TIMEOUT)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _gzip_file(source, target):
+    """Gzip `source` into `target`; returns (sha256 of source, sha256 of target)."""
+    raw = hashlib.sha256()
+    with open(source, "rb") as f, open(target, "wb") as out:
+        packed = _HashingWriter(out)
+        with gzip.GzipFile(filename=source.name, mode="wb", fileobj=packed, compresslevel=6, mtime=0) as gz:
+            for chunk in iter(lambda: f.read(CHUNK), b""):
+                raw.update(chunk)
+                gz.write(chunk)
+    return raw.hexdigest(), packed.hash.hexdigest()
+
+
+class _HashingWriter:
+    """File wrapper that hashes what is written through it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def _latest_manifest():
+    snapshots = list_snapshots()
+    return read_manifest(snapshots[0].path) if snapshots else None
+
+
+def _backup_media(previous):
+    """
+    {relative path: {sha256, size, mtime_ns}} for MEDIA_ROOT. Files whose size
+    and mtime match the previous snapshot reuse its hash; only new or changed
+    files are read, and a blob is written only if the store lacks it.
+    """
+    known = (previous or {}).get("media", {})
+    root = Path(settings.MEDIA_ROOT)
+    media, new_files = {}, 0
+    if not root.is_dir():
+        return media, new_files
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        rel = path.relative_to(root).as_posix()
+        stat = path.stat()
+        entry = known.get(rel)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns \
+                and _blob_path(entry["sha256"]).is_file():
+            media[rel] = entry
+            continue
+        digest = _sha256_file(path)
+        blob = _blob_path(digest)
+        if not blob.is_file():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(f"{digest}.{uuid.uuid4().hex}.tmp")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, blob)
+            new_files += 1
+        media[rel] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return media, new_files
+
+
+def create_snapshot(label="", rotate=True):
+    """Take a snapshot of the databases and media, rotate old ones; returns a Snapshot."""
+    with _exclusive():
+        previous = _latest_manifest()
+        name = time.strftime("%Y%m%d-%H%M%S") + (f"-{label}" if label else "")
+        final = _snapshots_dir() / name
+        if final.exists():
+            name = f"{name}-{uuid.uuid4().hex[:4]}"
+            final = _snapshots_dir() / name
+        work = _snapshots_dir() / f".{name}.partial"
+        work.mkdir(parents=True)
+        try:
+            databases = {}
+            for filename, source in _databases().items():
+                if not source.is_file():
+                    continue
+                copy = work / filename
+                online_copy(source, copy)
+                _integrity_check(copy)
+                raw_sha, gz_sha = _gzip_file(copy, work / f"{filename}.gz")
+                databases[filename] = {
+                    "file": f"{filename}.gz",
+                    "size": copy.stat().st_size,
+                    "sha256": raw_sha,
+                    "gz_sha256": gz_sha,
+                }
+                copy.unlink()
+            media, new_media = _backup_media(previous)
+            manifest = {"name": name, "created": time.time(), "databases": databases, "media": media}
+            with open(work / MANIFEST, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+            os.replace(work, final)
+        except BaseException:
+            shutil.rmtree(work, ignore_errors=True)
+            raise
+        if rotate:
+            prune()
+        return _snapshot(final, manifest, new_media)
+
+
+def _snapshot(path, manifest, new_media=None):
+    media = manifest.get("media", {})
+    return Snapshot(
+        manifest["name"], path, manifest["created"], manifest["databases"],
+        len(media), sum(m["size"] for m in media.values()), new_media,
+    )
+
+
+def read_manifest(path):
+    with open(Path(path) / MANIFEST, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_snapshots():
+    """Complete snapshots, newest first."""
+    directory = _snapshots_dir()
+    if not directory.is_dir():
+        return []
+    snapshots = []
+    for path in directory.iterdir():
+        if path.name.startswith(".") or not (path / MANIFEST).is_file():
+            continue
+        try:
+            snapshots.append(_snapshot(path, read_manifest(path)))
+        except (OSError, ValueError, KeyError):
+            continue
+    snapshots.sort(key=lambda s: s.created, reverse=True)
+    return snapshots
+
+
+def get_snapshot(name):
+    for snapshot in list_snapshots():
+        if snapshot.name == name:
+            return snapshot
+    raise BackupError(f"No snapshot named {name!r}")
+
+
+def prune(keep=None):
+    """Keep the newest BACKUP_KEEP snapshots and the media blobs they use."""
+    keep = settings.BACKUP_KEEP if keep is None else keep
+    with _exclusive():
+        snapshots = list_snapshots()
+        for snapshot in snapshots[keep:]:
+            shutil.rmtree(snapshot.path, ignore_errors=True)
+        # With the lock held no snapshot is being written: these are from a crash
+        for leftover in _snapshots_dir().glob(".*.partial") if _snapshots_dir().is_dir() else ():
+            shutil.rmtree(leftover, ignore_errors=True)
+
+        used = set()
+        for snapshot in snapshots[:keep]:
+            used.update(m["sha256"] for m in read_manifest(snapshot.path).get("media", {}).values())
+        store = _media_store()
+        if store.is_dir():
+            for blob in store.glob("*/*"):
+                if blob.name not in used:
+                    blob.unlink()
+
+
+def verify_snapshot(snapshot, extract_to=None):
+    """
+    Check every checksum of a snapshot and run integrity_check on its
+    databases. With `extract_to`, the verified databases are left there;
+    returns {file name: extracted path}.
+    """
+    with _exclusive():
+        manifest = read_manifest(snapshot.path)
+        target = Path(extract_to) if extract_to else snapshot.path / f".verify-{uuid.uuid4().hex[:6]}"
+        target.mkdir(parents=True, exist_ok=True)
+        extracted = {}
+        try:
+            for filename, info in manifest["databases"].items():
+                packed = snapshot.path / info["file"]
+                if _sha256_file(packed) != info["gz_sha256"]:
+                    raise BackupError(f"{info['file']}: checksum mismatch")
+                out = target / filename
+                with gzip.open(packed, "rb") as gz, open(out, "wb") as f:
+                    shutil.copyfileobj(gz, f, CHUNK)
+                if _sha256_file(out) != info["sha256"]:
+                    raise BackupError(f"{filename}: checksum mismatch after decompression")
+                _integrity_check(out)
+                extracted[filename] = out
+            for rel, info in manifest.get("media", {}).items():
+                blob = _blob_path(info["sha256"])
+                if not blob.is_file() or _sha256_file(blob) != info["sha256"]:
+                    raise BackupError(f"media/{rel}: missing or damaged in the backup store")
+        finally:
+            if not extract_to:
+                shutil.rmtree(target, ignore_errors=True)
+        return extracted
+
+
+def restore_snapshot(snapshot, media=True):
+    """
+    Verify a snapshot, then copy its databases over the live ones through the
+    backup API (open connections see the restored data) and put back media
+    files that are missing or differ. A "pre-restore" snapshot is taken first,
+    without rotation: pruning could delete the very snapshot being restored
+    (the oldest one kept) and the media blobs it needs.
+    """
+    with _exclusive():
+        work = Path(settings.BACKUP_DIR) / f".restore-{uuid.uuid4().hex[:6]}"
+        try:
+            extracted = verify_snapshot(snapshot, extract_to=work)
+            restored_media = read_manifest(snapshot.path).get("media", {})
+            create_snapshot("pre-restore", rotate=False)
+            live = _databases()
+            for filename, path in extracted.items():
+                if filename not in live:
+                    continue
+                src = sqlite3.connect(path)
+                dst = sqlite3.connect(live[filename], timeout=CONNECT_TIMEOUT)
+                try:
+                    src.backup(dst)
+                finally:
+                    dst.close()
+                    src.close()
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+        restored = 0
+        if media:
+            root = Path(settings.MEDIA_ROOT)
+            for rel, info in restored_media.items():
+                path = root / rel
+                if path.is_file() and path.stat().st_size == info["size"] and _sha256_file(path) == info["sha256"]:
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(_blob_path(info["sha256"]), path)
+                restored += 1
+        return restored
+
+
+def start_backup_scheduler():
+    """
+    Daemon thread taking a snapshot whenever the newest one is older than
+    BACKUP_INTERVAL_HOURS. Returns the thread, or None when disabled.
+    """
+    interval = settings.BACKUP_INTERVAL_HOURS * 3600
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            snapshots = list_snapshots()
+            due = snapshots[0].created + interval if snapshots else 0
+            wait = due - time.time()
+            if wait > 0:
+                time.sleep(min(wait, 3600))
+                continue
+            try:
+                create_snapshot()
+            except Exception as e:  # keep the schedule alive; retry in an hour
+                print(f"Backup failed: {e}")
+                time.sleep(3600)
+
+    thread = threading.Thread(target=run, name="backup-scheduler", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,169 @@
+# calculator/cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+# --------------------------------------------------------------------------------------
+# Data version
+# Every watched model has an in-process generation counter that is bumped on
+# save/delete. The receivers are connected per model (watch()): a post_delete
+# receiver without a sender would turn off Django's fast delete for every model.
+# Writes made by *other* processes (a second terminal on the same DB file) are
+# caught by the stat() of the SQLite file and its WAL, so building an ETag never
+# touches the ORM.
+# --------------------------------------------------------------------------------------
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def bump_generation(sender, **kwargs):
+    with _generations_lock:
+        _generations[sender._meta.label] = _generations.get(sender._meta.label, 0) + 1
+
+
+def generation(model):
+    return _generations.get(model._meta.label, 0)
+
+
+def watch(*models):
+    """Bump the generation of `models` whenever one of their rows is saved or deleted."""
+    for model in models:
+        label = model._meta.label
+        post_save.connect(bump_generation, sender=model, dispatch_uid=f"calculator.cache.post_save.{label}")
+        post_delete.connect(bump_generation, sender=model, dispatch_uid=f"calculator.cache.post_delete.{label}")
+
+
+def db_file_stamp():
+    name = str(settings.DATABASES["default"]["NAME"])
+    stamp = []
+    for path in (name, name + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+# --------------------------------------------------------------------------------------
+# Size-bounded LRU of rendered bodies
+# --------------------------------------------------------------------------------------
+class ResponseCache:
+    """In-process LRU of rendered responses, evicted by total body size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (etag, content, content_type)
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key, etag):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def set(self, key, etag, content, content_type):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (etag, content, content_type)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(getattr(settings, "RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+
+def cached_view(*models, time_bucket=None):
+    """
+    Conditional GET + body cache for views that are a pure function of their
+    URL, query string and the given models' data.
+
+    time_bucket (seconds) is for views whose output also drifts with the clock
+    (e.g. "last 30 days" windows in reports).
+    """
+    watch(*models)
+
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            # Pending flash messages are rendered into the page; never cache those.
+            if request.method not in ("GET", "HEAD") or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            key = (view.__name__, request.path, tuple(sorted((k, tuple(v)) for k, v in request.GET.lists())))
+            version = (
+                tuple(generation(m) for m in models),
+                db_file_stamp(),
+                int(time.time() // time_bucket) if time_bucket else None,
+            )
+            etag = '"%s"' % hashlib.blake2b(repr((key, version)).encode(), digest_size=12).hexdigest()
+
+            if etag in parse_etags(request.headers.get("If-None-Match", "")):
+                response_cache.count_not_modified()
+                response = HttpResponseNotModified()
+            else:
+                entry = response_cache.get(key, etag)
+                if entry is not None:
+                    response = HttpResponse(entry[1], content_type=entry[2])
+                else:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code != 200 or response.streaming:
+                        return response
+                    response_cache.set(key, etag, response.content, response["Content-Type"])
+
+            response["ETag"] = etag
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        return inner
+
+    return decorator
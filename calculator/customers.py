@@ -0,0 +1,188 @@
+# calculator/customers.py
+# Customers are keyed by their normalized phone number (Customer.phone,
+# unique). New sales and orders add to the customer's stored totals with one
+# UPDATE (Customer.add_purchase); edits and deletes, which are rare, recount
+# the customer from its hot and archived sales instead. Sales without a phone
+# have no customer.
+import os
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.signals import post_delete
+
+# Persian and Arabic-Indic digits -> ASCII
+DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+ASCII_DIGITS = frozenset('0123456789')
+
+
+class _Pending(threading.local):
+    # Customers waiting for a recount at the end of the current transaction,
+    # per database alias: {alias: (ids, callback registered with on_commit)}
+    def __init__(self):
+        self.by_alias = {}
+
+
+_pending = _Pending()
+
+
+def normalize_phone(value):
+    """
+    '+98 912 345 6789', '۰۹۱۲۳۴۵۶۷۸۹' and '0912-345-6789' all become
+    '09123456789': digits folded to ASCII, separators dropped and the
+    Iranian country code replaced by the trunk 0. Returns '' when no digits.
+    """
+    digits = ''.join(ch for ch in str(value or '').translate(DIGITS) if ch in ASCII_DIGITS)
+    if digits.startswith('0098'):
+        digits = '0' + digits[4:]
+    elif digits.startswith('98') and len(digits) == 12:
+        digits = '0' + digits[2:]
+    elif digits.startswith('9') and len(digits) == 10:
+        digits = '0' + digits
+    return digits
+
+
+def _sums(model):
+    """Aggregates per customer over a Sale or ArchivedSale queryset (same definitions as the reports)."""
+    if model._meta.model_name == 'archivedsale':
+        profit = F('unit_price') * F('quantity') - F('production_cost')
+    else:
+        profit = (F('unit_price') - F('project__total_cost')) * F('quantity')
+    return {
+        'loose': Count('id', filter=Q(order_id__isnull=True)),
+        'orders': Count('order_id', distinct=True),
+        'revenue': Sum('total_price'),
+        'profit': Sum(ExpressionWrapper(profit, output_field=BigIntegerField())),
+        'first': Min('sale_date'),
+        'last': Max('sale_date'),
+    }
+
+
+def link_sales(sales, customer_model):
+    """
+    Give the rows of `sales` (a Sale or ArchivedSale queryset) that have a
+    phone but no customer their Customer, creating one per normalized phone.
+    Returns the ids of the customers linked.
+    """
+    groups = defaultdict(list)
+    raw_phones = (sales.filter(customer_id__isnull=True).exclude(customer_phone='')
+                  .values_list('customer_phone', flat=True).distinct().order_by())
+    for raw in raw_phones:
+        phone = normalize_phone(raw)
+        if phone:
+            groups[phone].append(raw)
+
+    existing = customer_model.objects.in_bulk(list(groups), field_name='phone')
+    linked = set()
+    for phone, raws in groups.items():
+        customer = existing.get(phone)
+        if customer is None:
+            # The most recent spelling of the name
+            name = (sales.filter(customer_phone__in=raws).exclude(customer_name='')
+                    .order_by('-sale_date').values_list('customer_name', flat=True).first())
+            customer = customer_model.objects.create(phone=phone, name=name or '')
+        sales.filter(customer_id__isnull=True, customer_phone__in=raws).update(customer_id=customer.pk)
+        linked.add(customer.pk)
+    return linked
+
+
+def link_orders(order_model, sale_model):
+    """Orders without a customer take the customer of their lines."""
+    lines = sale_model.objects.filter(order_id=OuterRef('pk'), customer_id__isnull=False)
+    order_model.objects.filter(customer_id__isnull=True).exclude(customer_phone='').update(
+        customer_id=Subquery(lines.values('customer_id')[:1])
+    )
+
+
+def recount_customers(ids, customer_model, sources, batch_size=500):
+    """Recompute the stored totals of customers `ids` from the sale querysets in `sources`."""
+    ids = sorted(set(ids) - {None})
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        totals = defaultdict(lambda: {'orders': 0, 'revenue': 0, 'profit': 0, 'first': None, 'last': None})
+        for sales in sources:
+            rows = (sales.filter(customer_id__in=chunk).values('customer_id')
+                    .annotate(**_sums(sales.model)).order_by())
+            for row in rows:
+                t = totals[row['customer_id']]
+                t['orders'] += row['loose'] + row['orders']
+                t['revenue'] += row['revenue'] or 0
+                t['profit'] += row['profit'] or 0
+                t['first'] = min(filter(None, (t['first'], row['first'])), default=None)
+                t['last'] = max(filter(None, (t['last'], row['last'])), default=None)
+
+        customers = list(customer_model.objects.filter(pk__in=chunk))
+        for customer in customers:
+            t = totals[customer.pk]
+            customer.order_count = t['orders']
+            customer.revenue = t['revenue']
+            customer.profit = t['profit']
+            customer.first_purchase = t['first']
+            customer.last_purchase = t['last']
+        customer_model.objects.bulk_update(
+            customers, ['order_count', 'revenue', 'profit', 'first_purchase', 'last_purchase']
+        )
+
+
+def _sources():
+    from django.conf import settings
+    from .dbrouting import ARCHIVE_DB
+    from .models import ArchivedSale, Sale
+
+    sources = [Sale.objects.all()]
+    if os.path.exists(settings.DATABASES[ARCHIVE_DB]['NAME']):
+        sources.append(ArchivedSale.objects.all())
+    return sources
+
+
+def refresh_customers(ids):
+    """Recount customers `ids` from their hot and archived sales."""
+    from .models import Customer
+
+    recount_customers(ids, Customer, _sources())
+
+
+def rebuild_customers():
+    """Link every sale with a phone to its customer, then recount all customers; returns (linked, total)."""
+    from .models import Customer, Order, Sale
+
+    sources = _sources()
+    linked = set()
+    for sales in sources:
+        linked |= link_sales(sales, Customer)
+    link_orders(Order, Sale)
+    ids = list(Customer.objects.values_list('pk', flat=True))
+    recount_customers(ids, Customer, sources)
+    return len(linked), len(ids)
+
+
+def _purchase_deleted(sender, instance, using, **kwargs):
+    # Deleting a project or an order sends this once per sale: collect the
+    # customers and recount each of them once, when the transaction commits
+    if not instance.customer_id:
+        return
+    pending = _pending.by_alias
+    ids, flush = pending.get(using, (None, None))
+    # A rollback drops the registered callback, and the ids collected with it
+    if flush is not None and any(entry[1] is flush for entry in transaction.get_connection(using).run_on_commit):
+        ids.add(instance.customer_id)
+        return
+
+    ids = {instance.customer_id}
+
+    def flush():
+        if pending.get(using, (None,))[0] is ids:
+            del pending[using]
+        refresh_customers(ids)
+
+    pending[using] = (ids, flush)
+    # Outside a transaction this runs at once
+    transaction.on_commit(flush, using=using)
+
+
+def connect_signals():
+    from .models import Order, Sale
+
+    post_delete.connect(_purchase_deleted, sender=Sale, dispatch_uid="calculator.customers.sale_deleted")
+    post_delete.connect(_purchase_deleted, sender=Order, dispatch_uid="calculator.customers.order_deleted")
@@ -0,0 +1,86 @@
+# calculator/dbrouting.py
+# Reads of report and analytics views go to the read-only "reporting" alias;
+# everything else, and every write, stays on "default". The "default"
+# connection runs in WAL mode so a long aggregation on "reporting" reads its
+# snapshot while Sale inserts keep committing. The sales archive models live
+# only in the "archive" database.
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+DEFAULT_DB = "default"
+REPORTING_DB = "reporting"
+ARCHIVE_DB = "archive"
+ARCHIVE_MODELS = {"archivedsale", "salerollup", "archivedfiscalyear"}
+
+_reporting = contextvars.ContextVar("reporting_reads", default=False)
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver: journal and cache pragmas per alias."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        if connection.alias == REPORTING_DB:
+            cursor.execute("PRAGMA query_only = ON")
+            cursor.execute(f"PRAGMA cache_size = -{int(settings.REPORTING_CACHE_KIB)}")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+        else:
+            # Persistent in the file; a no-op once set
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+
+
+def connect_signals():
+    connection_created.connect(configure_connection, dispatch_uid="calculator.dbrouting.configure_connection")
+
+
+def reporting_reads(view):
+    """View decorator: ORM reads inside the view use the "reporting" alias."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            token = _reporting.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _reporting.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _reporting.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _reporting.reset(token)
+    return wrapper
+
+
+def _archived(model):
+    return model._meta.app_label == "calculator" and model._meta.model_name in ARCHIVE_MODELS
+
+
+class ReportingRouter:
+    def db_for_read(self, model, **hints):
+        if _archived(model):
+            return ARCHIVE_DB
+        if _reporting.get() and REPORTING_DB in settings.DATABASES:
+            return REPORTING_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        return ARCHIVE_DB if _archived(model) else DEFAULT_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # default and reporting are the same file; archive models hold no relations
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPORTING_DB:
+            return False
+        archived = app_label == "calculator" and model_name in ARCHIVE_MODELS
+        return archived == (db == ARCHIVE_DB)
@@ -0,0 +1,23 @@
+# calculator/dbstats.py
+# SQLite planner statistics, also used as cheap row-count estimates.
+from django.db import DatabaseError, connections
+
+
+def refresh_table_stats(using='default'):
+    """Run ANALYZE (fills sqlite_stat1). Tens of milliseconds per 100k rows."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Row count of the model's table as of the last ANALYZE, or None when no
+    statistics exist. The first number of sqlite_stat1.stat is the row count.
+    """
+    with connections[using].cursor() as cursor:
+        try:
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [model._meta.db_table])
+        except DatabaseError:  # no ANALYZE yet: sqlite_stat1 does not exist
+            return None
+        counts = [int(row[0].split()[0]) for row in cursor.fetchall() if row[0]]
+    return max(counts) if counts else None
@@ -0,0 +1,126 @@
+# calculator/forecasting.py
+# Filament consumption forecast: daily usage per spool from sales (each sale
+# prints quantity x Project.filament_used_mm of the project's spool) and from
+# newly added models, smoothed with an exponential decay, then depletion
+# dates and a reorder list per material. One grouped query per source, one
+# NumPy pass over all spools; cached until the next stock movement.
+import threading
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import db_file_stamp, generation, watch
+from .models import Filament, Project, Sale
+
+HISTORY_DAYS = 90
+# Usage from HALF_LIFE_DAYS ago weighs half as much as today's
+HALF_LIFE_DAYS = 21
+# Depletion further out than this is "not in sight" (no date); a trickle of
+# usage would otherwise put the date past datetime.date's range
+HORIZON_DAYS = 5 * 365
+
+# get_forecast() is keyed on these models' generations
+watch(Filament, Project, Sale)
+
+SpoolForecast = namedtuple('SpoolForecast', 'filament_id daily_m days_left depletion_date')
+MaterialForecast = namedtuple(
+    'MaterialForecast', 'material spools remaining_m daily_m days_left depletion_date reorder_spools',
+)
+Forecast = namedtuple('Forecast', 'spools materials reorder as_of')
+
+_cache = {'key': None, 'value': None}
+_cache_lock = threading.Lock()
+
+
+def _usage_rows(since):
+    """(filament_id, local date, metres) from sales and from models added since `since`."""
+    sold = (Sale.objects.filter(calendar_day__gte=since)
+            .values_list('project__filament_id', 'calendar_day')
+            .annotate(mm=Sum(F('project__filament_used_mm') * F('quantity'), output_field=FloatField()))
+            .order_by())
+    added = (Project.objects.filter(created_date__date__gte=since)
+             .annotate(day=TruncDate('created_date'))
+             .values_list('filament_id', 'day')
+             .annotate(mm=Sum('filament_used_mm'))
+             .order_by())
+    for filament_id, day, mm in [*sold, *added]:
+        if filament_id is not None and mm:
+            yield filament_id, day, mm / 1000
+
+
+def _days_until(today, days):
+    return today + timedelta(days=int(days)) if days <= HORIZON_DAYS else None
+
+
+def compute_forecast(today=None):
+    """Forecast for every spool and material as of `today` (local date)."""
+    today = today or timezone.localdate()
+    since = today - timedelta(days=HISTORY_DAYS - 1)
+    lead_days = settings.FILAMENT_REORDER_LEAD_DAYS
+    cover_days = settings.FILAMENT_REORDER_COVER_DAYS
+
+    spools = list(Filament.objects.order_by('pk').values_list('pk', 'material', 'remaining_amount', 'initial_amount'))
+    if not spools:
+        return Forecast({}, [], [], today)
+    ids = np.array([s[0] for s in spools])
+    materials, material_index = np.unique([s[1] for s in spools], return_inverse=True)
+    remaining = np.array([max(s[2], 0.0) for s in spools])
+    spool_length = np.array([s[3] for s in spools])
+
+    # spools x days usage matrix, newest day last
+    rows = list(_usage_rows(since))
+    usage = np.zeros((len(spools), HISTORY_DAYS))
+    if rows:
+        fid = np.array([r[0] for r in rows])
+        age = np.array([(today - r[1]).days for r in rows])
+        metres = np.array([r[2] for r in rows])
+        pos = np.searchsorted(ids, fid)
+        known = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == fid) & (age >= 0) & (age < HISTORY_DAYS)
+        np.add.at(usage, (pos[known], HISTORY_DAYS - 1 - age[known]), metres[known])
+
+    weights = 0.5 ** (np.arange(HISTORY_DAYS)[::-1] / HALF_LIFE_DAYS)
+    daily = usage @ weights / weights.sum()
+
+    with np.errstate(divide='ignore'):
+        days_left = np.where(daily > 0, remaining / daily, np.inf)
+    spool_forecasts = {
+        int(pk): SpoolForecast(int(pk), float(rate), float(left), _days_until(today, left))
+        for pk, rate, left in zip(ids, daily, days_left)
+    }
+
+    # Per material: pooled stock against pooled usage; reorder whole spools
+    # (of the material's usual size) to cover lead time plus cover_days
+    m_remaining = np.bincount(material_index, weights=remaining, minlength=len(materials))
+    m_daily = np.bincount(material_index, weights=daily, minlength=len(materials))
+    m_spools = np.bincount(material_index, minlength=len(materials))
+    m_length = np.bincount(material_index, weights=spool_length, minlength=len(materials)) / np.maximum(m_spools, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m_days_left = np.where(m_daily > 0, m_remaining / m_daily, np.inf)
+        shortfall = m_daily * (lead_days + cover_days) - m_remaining
+        m_reorder = np.where((m_days_left <= lead_days + cover_days) & (m_length > 0),
+                             np.ceil(np.maximum(shortfall, 0) / m_length), 0)
+
+    material_forecasts = [
+        MaterialForecast(str(m), int(n), float(rem), float(rate), float(left), _days_until(today, left), int(order))
+        for m, n, rem, rate, left, order in zip(materials, m_spools, m_remaining, m_daily, m_days_left, m_reorder)
+    ]
+    material_forecasts.sort(key=lambda m: m.days_left)
+    reorder = [m for m in material_forecasts if m.reorder_spools > 0]
+    return Forecast(spool_forecasts, material_forecasts, reorder, today)
+
+
+def get_forecast():
+    """compute_forecast(), recomputed only after a stock movement (or a new day)."""
+    key = (generation(Filament), generation(Project), generation(Sale), db_file_stamp(), timezone.localdate())
+    with _cache_lock:
+        if _cache['key'] == key:
+            return _cache['value']
+    value = compute_forecast(key[-1])
+    with _cache_lock:
+        _cache['key'], _cache['value'] = key, value
+    return value
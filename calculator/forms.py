@@ -1,7 +1,9 @@
 # forms.py
 
+import re
+
 from django import forms
-from .models import Filament, PricingSettings, Project, Sale
+from .models import Filament, Order, PricingSettings, Printer, PrintJob, Project, Sale
 
 class FilamentForm(forms.ModelForm):
     remaining_amount = forms.FloatField(
@@ -58,8 +60,8 @@ class FilamentForm(forms.ModelForm):
 class ProjectForm(forms.ModelForm):
     class Meta:
         model = Project
-        fields = ['model_name', 'picture', 'filament_used_mm', 'print_time_hours', 
-                 'size_x', 'size_y', 'size_z', 'post_processing_enabled', 'painting_enabled']
+        fields = ['model_name', 'picture', 'printer', 'filament_used_mm', 'print_time_hours', 'mesh_file',
+                 'gcode_file', 'size_x', 'size_y', 'size_z', 'post_processing_enabled', 'painting_enabled']
         widgets = {
             'model_name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -69,6 +71,15 @@ class ProjectForm(forms.ModelForm):
                 'class': 'form-control',
                 'accept': 'image/*'
             }),
+            'printer': forms.Select(attrs={'class': 'form-select'}),
+            'mesh_file': forms.ClearableFileInput(attrs={
+                'class': 'form-control',
+                'accept': '.stl,.3mf'
+            }),
+            'gcode_file': forms.ClearableFileInput(attrs={
+                'class': 'form-control',
+                'accept': '.gcode,.gco,.g'
+            }),
             'filament_used_mm': forms.NumberInput(attrs={
                 'class': 'form-control calc-input',
                 'step': '0.1',
@@ -104,6 +115,87 @@ class ProjectForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Dimensions come from the mesh when one is uploaded
+        if self.files.get('mesh_file'):
+            for name in ('size_x', 'size_y', 'size_z'):
+                self.fields[name].required = False
+        # ...and the print time (plus filament, when left blank) from the G-code
+        if self.files.get('gcode_file'):
+            for name in ('print_time_hours', 'filament_used_mm'):
+                self.fields[name].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        self._clean_gcode(cleaned_data)
+        upload = self.files.get('mesh_file')
+        if upload and 'mesh_file' not in self.errors:
+            from .mesh import MeshError, analyze_mesh
+
+            # Large uploads are already on disk; small ones are analysed in memory
+            if hasattr(upload, 'temporary_file_path'):
+                source = upload.temporary_file_path()
+            else:
+                upload.seek(0)
+                source = upload
+            try:
+                stats = analyze_mesh(source, name=upload.name)
+            except MeshError as e:
+                self.add_error('mesh_file', str(e))
+                return cleaned_data
+            finally:
+                upload.seek(0)
+            cleaned_data['size_x'] = round(stats.size_x, 1)
+            cleaned_data['size_y'] = round(stats.size_y, 1)
+            cleaned_data['size_z'] = round(stats.size_z, 1)
+            self.instance.mesh_volume_cm3 = stats.volume_mm3 / 1000
+            self.instance.mesh_surface_cm2 = stats.surface_mm2 / 100
+        elif cleaned_data.get('mesh_file') is False:  # "clear" ticked
+            self.instance.mesh_volume_cm3 = None
+            self.instance.mesh_surface_cm2 = None
+        return cleaned_data
+
+    def _clean_gcode(self, cleaned_data):
+        upload = self.files.get('gcode_file')
+        if cleaned_data.get('gcode_file') is False:  # "clear" ticked
+            self.instance.gcode_print_hours = None
+            return
+        if upload:
+            if 'gcode_file' in self.errors:
+                return
+            name = upload.name
+            if hasattr(upload, 'temporary_file_path'):
+                source = upload.temporary_file_path()
+            else:
+                upload.seek(0)
+                source = upload
+        elif self.instance.gcode_file and 'printer' in self.changed_data:
+            # Same file, other printer: its motion limits change the time
+            name = self.instance.gcode_file.name
+            source = self.instance.gcode_file.path
+        else:
+            return
+
+        from .gcode import GcodeError, default_profile, estimate_print_time
+
+        printer = cleaned_data.get('printer')
+        try:
+            stats = estimate_print_time(source, printer.motion_profile() if printer else default_profile(), name=name)
+        except GcodeError as e:
+            # A stored file that no longer reads keeps its last estimate
+            if upload:
+                self.add_error('gcode_file', str(e))
+            return
+        finally:
+            if upload:
+                upload.seek(0)
+        hours = stats.seconds / 3600
+        cleaned_data['print_time_hours'] = round(hours, 2)
+        self.instance.gcode_print_hours = hours
+        if not cleaned_data.get('filament_used_mm'):
+            cleaned_data['filament_used_mm'] = round(stats.filament_mm, 1)
+
 
 class SaleForm(forms.ModelForm):
     project_code = forms.IntegerField(
@@ -167,6 +259,92 @@ class SaleForm(forms.ModelForm):
         return cleaned_data
 
 
+ORDER_MAX_LINES = 200
+
+
+class OrderForm(forms.ModelForm):
+    """
+    Order header; the cart lines arrive as parallel line_code / line_quantity /
+    line_unit_price lists and are validated against one code__in query.
+    clean() leaves them in cleaned_data['lines'] as (project, quantity,
+    unit_price) for Order.place().
+    """
+    class Meta:
+        model = Order
+        fields = ['customer_name', 'customer_phone', 'packaging_cost', 'notes']
+        widgets = {
+            'customer_name': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'نام و نام خانوادگی'
+            }),
+            'customer_phone': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': '09123456789'
+            }),
+            'packaging_cost': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': '0',
+                'min': '0',
+                'step': '100'
+            }),
+            'notes': forms.Textarea(attrs={
+                'class': 'form-control',
+                'rows': 2,
+                'placeholder': 'توضیحات اضافی در مورد سفارش...'
+            }),
+        }
+
+    def clean_packaging_cost(self):
+        value = self.cleaned_data.get('packaging_cost') or 0
+        if value < 0:
+            raise forms.ValidationError('هزینه بسته‌بندی نمی‌تواند منفی باشد')
+        return value
+
+    def _raw_lines(self):
+        codes = self.data.getlist('line_code')
+        quantities = self.data.getlist('line_quantity')
+        prices = self.data.getlist('line_unit_price')
+        if not (len(codes) == len(quantities) == len(prices)):
+            raise forms.ValidationError('اقلام سفارش ناقص ارسال شده‌اند')
+        lines = []
+        for row, (code, quantity, price) in enumerate(zip(codes, quantities, prices), start=1):
+            try:
+                code = int(code)
+                quantity = int(quantity)
+                price = int(price) if str(price).strip() else None
+            except (TypeError, ValueError):
+                raise forms.ValidationError(f'ردیف {row}: کد، تعداد و قیمت باید عدد باشند')
+            if quantity < 1:
+                raise forms.ValidationError(f'ردیف {row}: تعداد باید حداقل ۱ باشد')
+            if price is not None and price < 0:
+                raise forms.ValidationError(f'ردیف {row}: قیمت نمی‌تواند منفی باشد')
+            lines.append((code, quantity, price))
+        return lines
+
+    def clean(self):
+        cleaned_data = super().clean()
+        lines = self._raw_lines()
+        if not lines:
+            raise forms.ValidationError('حداقل یک قلم به سفارش اضافه کنید')
+        if len(lines) > ORDER_MAX_LINES:
+            raise forms.ValidationError(f'هر سفارش حداکثر {ORDER_MAX_LINES} قلم می‌تواند داشته باشد')
+
+        # One query for every code in the cart
+        projects = Project.objects.select_related('filament').in_bulk(
+            {code for code, _, _ in lines}, field_name='code'
+        )
+        missing = sorted({code for code, _, _ in lines if code not in projects})
+        if missing:
+            raise forms.ValidationError(
+                'کد(های) زیر یافت نشد: ' + '، '.join(str(code) for code in missing)
+            )
+        cleaned_data['lines'] = [
+            (projects[code], quantity, projects[code].selling_price if price is None else price)
+            for code, quantity, price in lines
+        ]
+        return cleaned_data
+
+
 class PricingSettingsForm(forms.ModelForm):
     class Meta:
         model = PricingSettings
@@ -195,4 +373,109 @@ class PricingSettingsForm(forms.ModelForm):
         v = self.cleaned_data['round_to_nearest']
         if v and v < 1:
             raise forms.ValidationError('مقدار گرد کردن باید حداقل 1 باشد.')
-        return v
\ No newline at end of file
+        return v
+
+class NestingForm(forms.Form):
+    """Order lines ("code quantity", one per line) and plate settings for the nesting planner."""
+    order = forms.CharField(
+        label='سفارش',
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 8,
+            'dir': 'ltr',
+            'placeholder': '12 x 40\n7 x 15\n3'
+        }),
+        help_text='در هر خط: کد مدل و تعداد (مثال: 12 x 40)'
+    )
+    bed_x = forms.FloatField(min_value=1, label='طول بستر (میلی‌متر)',
+                             widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}))
+    bed_y = forms.FloatField(min_value=1, label='عرض بستر (میلی‌متر)',
+                             widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}))
+    spacing = forms.FloatField(min_value=0, label='فاصله بین قطعات (میلی‌متر)',
+                               widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.5'}))
+    warmup_minutes = forms.FloatField(min_value=0, label='زمان گرم شدن هر چاپ (دقیقه)',
+                                      widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}))
+
+    ORDER_LINE_RE = re.compile(r'^\s*(\d+)\s*(?:[x×*,:\-]\s*|\s+)?(\d+)?\s*$')
+
+    def clean_order(self):
+        quantities = {}
+        for number, line in enumerate(self.cleaned_data['order'].splitlines(), 1):
+            if not line.strip():
+                continue
+            match = self.ORDER_LINE_RE.match(line)
+            if not match:
+                raise forms.ValidationError(f'خط {number} نامعتبر است: «{line.strip()}»')
+            code, quantity = int(match.group(1)), int(match.group(2) or 1)
+            quantities[code] = quantities.get(code, 0) + quantity
+
+        projects = {p.code: p for p in Project.objects.filter(code__in=quantities)}
+        missing = sorted(set(quantities) - set(projects))
+        if missing:
+            raise forms.ValidationError('کد مدل یافت نشد: ' + '، '.join(map(str, missing)))
+        if not quantities:
+            raise forms.ValidationError('سفارش خالی است')
+        return [(projects[code], quantity) for code, quantity in quantities.items()]
+
+
+class PrinterForm(forms.ModelForm):
+    supported_materials = forms.MultipleChoiceField(
+        choices=Filament.MATERIAL_CHOICES,
+        required=False,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
+        label='مواد قابل چاپ',
+        help_text='هیچ‌کدام = همه مواد'
+    )
+
+    class Meta:
+        model = Printer
+        fields = ['name', 'bed_x', 'bed_y', 'bed_z', 'power_kw', 'depreciation_per_hour',
+                  'supported_materials', 'loaded_filament', 'max_speed_x', 'max_speed_y', 'max_speed_z',
+                  'max_speed_e', 'acceleration', 'travel_acceleration', 'junction_deviation', 'is_active']
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'مثال: Ender 3 شماره 1'}),
+            'bed_x': forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}),
+            'bed_y': forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}),
+            'bed_z': forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}),
+            'power_kw': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            'depreciation_per_hour': forms.NumberInput(attrs={'class': 'form-control'}),
+            'loaded_filament': forms.Select(attrs={'class': 'form-select'}),
+            'max_speed_x': forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}),
+            'max_speed_y': forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}),
+            'max_speed_z': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1'}),
+            'max_speed_e': forms.NumberInput(attrs={'class': 'form-control', 'step': '1'}),
+            'acceleration': forms.NumberInput(attrs={'class': 'form-control', 'step': '10'}),
+            'travel_acceleration': forms.NumberInput(attrs={'class': 'form-control', 'step': '10'}),
+            'junction_deviation': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.001'}),
+            'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initial['supported_materials'] = self.instance.materials
+
+    def clean_supported_materials(self):
+        return ','.join(self.cleaned_data['supported_materials'])
+
+
+class PrintJobForm(forms.ModelForm):
+    project_code = forms.IntegerField(
+        min_value=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'کد مدل'}),
+        label='کد مدل'
+    )
+
+    class Meta:
+        model = PrintJob
+        fields = ['quantity']
+        widgets = {
+            'quantity': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
+        }
+
+    def clean_project_code(self):
+        code = self.cleaned_data['project_code']
+        try:
+            self.instance.project = Project.objects.select_related('filament').get(code=code)
+        except Project.DoesNotExist:
+            raise forms.ValidationError('کد وارد شده یافت نشد!')
+        return code
@@ -0,0 +1,363 @@
+# calculator/gcode.py
+# Print-time estimate of a G-code file by replaying the firmware's motion
+# planner with NumPy: trapezoidal acceleration, junction deviation cornering
+# and per-axis maximum feedrates (Marlin's planner, minus stepper rounding).
+# The file is read in chunks and every chunk is tokenised with array
+# operations on its bytes, so a 1M-move file takes a few seconds. Heating
+# waits (M109/M190) are not simulated; PLATE_WARMUP_MINUTES covers them.
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+GCODE_SUFFIXES = ('.gcode', '.gco', '.g')
+# Bytes per parsed chunk (cut at a line end); bounds the temporaries to ~150 MB
+CHUNK_BYTES = 8 * 1024 * 1024
+
+# Command codes: G<n> -> n, M<n> -> 1000 + n
+G0, G1, G2, G3, G4, G28, G90, G91, G92 = 0, 1, 2, 3, 4, 28, 90, 91, 92
+M82, M83, M203, M204 = 1082, 1083, 1203, 1204
+COMMANDS = np.array([G0, G1, G2, G3, G4, G28, G90, G91, G92, M82, M83, M203, M204])
+
+# Parameter words kept per line: the move columns for every command, the
+# extra ones only for the (few) lines that are not plain G0/G1 moves
+MOVE_WORDS = b'XYZEF'
+EXTRA_WORDS = b'IJPST'
+X, Y, Z, E, F = range(5)
+I, J, P, S, T = range(5)
+
+# Marlin's power-on feedrate, used until the file sets one (mm/min)
+DEFAULT_FEEDRATE = 1500
+MIN_SPEED = 0.1  # mm/s; keeps F0 from dividing by zero
+# Junctions after short segments bending less than 45 degrees are limited as
+# an arc through them (Marlin's JD_HANDLE_SMALL_SEGMENTS)
+SMALL_SEGMENT_MM = 1.0
+SMALL_SEGMENT_COS = 0.7071067812
+EPS = 1e-9
+
+_UPPER = np.zeros(256, dtype=bool)
+_UPPER[ord('A'):ord('Z') + 1] = True
+_NUMERIC = np.zeros(256, dtype=bool)
+_NUMERIC[list(b'0123456789.-+')] = True
+_BLANK = np.zeros(256, dtype=bool)
+_BLANK[list(b' \t\r\n')] = True
+_WORD_COLUMN = np.full(256, -1, dtype=np.int8)
+for _i, _c in enumerate(MOVE_WORDS + EXTRA_WORDS):
+    _WORD_COLUMN[_c] = _i
+_POW10_OFFSET = 32
+_POW10 = 10.0 ** np.arange(-_POW10_OFFSET, _POW10_OFFSET + 1)
+
+# Units: mm/s, mm/s^2 and mm (junction deviation)
+MotionProfile = namedtuple(
+    'MotionProfile',
+    'max_speed_x max_speed_y max_speed_z max_speed_e acceleration travel_acceleration junction_deviation',
+)
+GcodeStats = namedtuple('GcodeStats', 'moves seconds filament_mm')
+
+
+class GcodeError(ValueError):
+    pass
+
+
+def default_profile():
+    """Motion limits used for projects without a printer (settings.GCODE_MOTION_DEFAULTS)."""
+    from django.conf import settings
+
+    return MotionProfile(**settings.GCODE_MOTION_DEFAULTS)
+
+
+# --------------------------------------------------------------------------------------
+# Parsing
+# --------------------------------------------------------------------------------------
+def _numbers(buf, starts):
+    """Values of the numbers starting at byte offsets `starts` (NaN where a word has none)."""
+    count = len(starts)
+    sign = buf[starts]
+    negative = sign == ord('-')
+    starts = starts + (negative | (sign == ord('+')))
+    # A number runs until the first byte that cannot be part of one (the
+    # chunk ends with a newline, so there always is one)
+    size = len(buf)
+    stop = np.where(_NUMERIC[buf], size, np.arange(size, dtype=np.int32))
+    ends = np.minimum.accumulate(stop[::-1])[::-1][starts]
+    lengths = np.maximum(ends - starts, 0)
+
+    # One entry per number byte: which number, where
+    owner = np.repeat(np.arange(count, dtype=np.int32), lengths)
+    pos = np.arange(len(owner), dtype=np.int32) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    ch = buf[pos]
+    point = ends.copy()
+    is_point = ch == ord('.')
+    point[owner[is_point][::-1]] = pos[is_point][::-1]  # the first '.' of each number
+    digit = (ch >= ord('0')) & (ch <= ord('9'))
+    owner, pos, ch = owner[digit], pos[digit], ch[digit]
+    at = point[owner]
+    exponent = at - pos - (pos < at) + _POW10_OFFSET
+    weights = (ch - ord('0')) * _POW10[np.clip(exponent, 0, 2 * _POW10_OFFSET)]
+    values = np.bincount(owner, weights=weights, minlength=count)
+    values[negative] *= -1
+    values[np.bincount(owner, minlength=count) == 0] = np.nan
+    return values
+
+
+def _parse_chunk(chunk):
+    """
+    (commands, move columns, extra rows, extra columns) of the lines of
+    `chunk` whose command the planner needs; `chunk` ends with a newline.
+    """
+    buf = np.frombuffer(chunk, dtype=np.uint8)
+    # A word is an upper-case letter at a line start, after a blank or right
+    # after a number ('G1X10Y5')
+    before = np.empty_like(buf)
+    before[0] = ord('\n')
+    before[1:] = buf[:-1]
+    letters = np.flatnonzero(_UPPER[buf] & (_BLANK[before] | _NUMERIC[before]))
+
+    # Drop words in ';' comments: a ';' between the line start and the word
+    newlines = np.flatnonzero(buf == ord('\n'))
+    line_of = np.cumsum(buf == ord('\n'), dtype=np.int32)
+    line = line_of[letters]
+    line_start = np.concatenate(([0], newlines[:-1] + 1))[line]
+    semicolons = np.cumsum(buf == ord(';'), dtype=np.int32)
+    code = semicolons[letters] == semicolons[line_start] - (buf[line_start] == ord(';'))
+    letters, line = letters[code], line[code]
+    empty = np.empty(0, dtype=np.int64)
+    if not len(letters):
+        return empty.astype(np.int16), np.empty((0, len(MOVE_WORDS))), empty, np.empty((0, len(EXTRA_WORDS)))
+
+    values = _numbers(buf, letters + 1)
+    letter = buf[letters]
+    first = np.empty(len(letters), dtype=bool)
+    first[0] = True
+    first[1:] = line[1:] != line[:-1]
+
+    # The first word of a line is its command
+    number = values[first]
+    whole = ~np.isnan(number) & (number == np.round(number))
+    kind = letter[first]
+    command = np.full(len(number), -1, dtype=np.int64)
+    command[whole & (kind == ord('G'))] = number[whole & (kind == ord('G'))]
+    command[whole & (kind == ord('M'))] = number[whole & (kind == ord('M'))] + 1000
+    keep = np.isin(command, COMMANDS)
+    row = np.cumsum(keep) - 1
+    word_line = np.cumsum(first) - 1
+
+    # 'G28 X' homes X just like 'G28 X0'
+    values = np.where(np.isnan(values) & (command[word_line] == G28), 0.0, values)
+    column = _WORD_COLUMN[letter]
+    param = ~first & keep[word_line] & (column >= 0)
+    table = np.full((int(keep.sum()), len(MOVE_WORDS) + len(EXTRA_WORDS)), np.nan)
+    table[row[word_line[param]], column[param]] = values[param]
+
+    commands = command[keep].astype(np.int16)
+    extra_rows = np.flatnonzero(commands > G1)
+    return commands, table[:, :len(MOVE_WORDS)], extra_rows, table[extra_rows, len(MOVE_WORDS):]
+
+
+def _chunks(f):
+    rest = b''
+    while True:
+        block = f.read(CHUNK_BYTES)
+        if not block:
+            break
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        rest = block[cut:]
+        if cut:
+            yield block[:cut]
+    if rest:
+        yield rest + b'\n'
+
+
+def parse_gcode(f):
+    """Commands (int16) and their word columns, from a binary file object, chunk by chunk."""
+    parts = []
+    offset = 0
+    for chunk in _chunks(f):
+        commands, moves, extra_rows, extra = _parse_chunk(chunk)
+        parts.append((commands, moves, extra_rows + offset, extra))
+        offset += len(commands)
+    if not parts:
+        raise GcodeError('فایل G-code خالی است')
+    commands, moves, extra_rows, extra = (np.concatenate(p) for p in zip(*parts))
+    return commands, moves, extra_rows, extra
+
+
+# --------------------------------------------------------------------------------------
+# Planner
+# --------------------------------------------------------------------------------------
+def _ffill(values, initial):
+    """Each NaN replaced by the last value before it; `initial` before the first."""
+    index = np.where(np.isnan(values), -1, np.arange(len(values)))
+    np.maximum.accumulate(index, out=index)
+    return np.where(index >= 0, values[np.maximum(index, 0)], initial)
+
+
+def _state(commands, on, off, initial=0.0):
+    """Per row: 1.0 after the last `on` command, 0.0 after the last `off` one."""
+    flags = np.full(len(commands), np.nan)
+    flags[np.isin(commands, off)] = 0.0
+    flags[np.isin(commands, on)] = 1.0
+    return _ffill(flags, initial) > 0
+
+
+def _positions(commands, moves):
+    """
+    Absolute X/Y/Z/E after each row. Rows that pin a coordinate (absolute
+    moves, G92, G28) anchor it; relative moves add to the last anchor.
+    """
+    count = len(commands)
+    is_move = commands <= G3
+    relative_xyz = _state(commands, on=[G91], off=[G90])
+    relative_e = _state(commands, on=[G91, M83], off=[G90, M82])
+    given = ~np.isnan(moves[:, :4])
+    # Bare G92 zeroes every axis, bare G28 homes X, Y and Z
+    set_all = (commands == G92) & ~given.any(axis=1)
+    home = commands == G28
+    home_all = home & ~given[:, :3].any(axis=1)
+    rows = np.arange(count)
+
+    positions = np.empty((count, 4))
+    for axis in range(4):
+        has = given[:, axis]
+        relative = relative_e if axis == E else relative_xyz
+        anchor = (is_move & has & ~relative) | ((commands == G92) & (has | set_all))
+        if axis != E:
+            anchor |= home & (has | home_all)
+        value = np.where(has, moves[:, axis], 0.0)
+        offsets = np.cumsum(np.where(is_move & has & relative, value, 0.0))
+        last = np.maximum.accumulate(np.where(anchor, rows, -1))
+        base = np.where(last >= 0, (value - offsets)[np.maximum(last, 0)], 0.0)
+        positions[:, axis] = base + offsets
+    return positions
+
+
+def _extra_column(count, extra_rows, extra, column):
+    values = np.full(count, np.nan)
+    values[extra_rows] = extra[:, column]
+    return values
+
+
+def _arc_lengths(commands, start, end, i, j):
+    """Path length of G2/G3 moves given with an I/J centre offset; NaN for everything else."""
+    lengths = np.full(len(commands), np.nan)
+    arc = np.flatnonzero(np.isin(commands, (G2, G3)) & ~np.isnan(i) & ~np.isnan(j))
+    if len(arc):
+        cx, cy = start[arc, X] + i[arc], start[arc, Y] + j[arc]
+        radius = np.hypot(i[arc], j[arc])
+        sweep = np.arctan2(end[arc, Y] - cy, end[arc, X] - cx) - np.arctan2(-j[arc], -i[arc])
+        sweep = np.where(commands[arc] == G3, sweep, -sweep) % (2 * np.pi)
+        # Same start and end point: a full circle
+        sweep = np.where(sweep < EPS, 2 * np.pi, sweep)
+        lengths[arc] = np.hypot(radius * sweep, end[arc, Z] - start[arc, Z])
+    return lengths
+
+
+def simulate(commands, moves, extra_rows, extra, profile):
+    """GcodeStats of parsed G-code (see parse_gcode) under a MotionProfile."""
+    count = len(commands)
+    positions = _positions(commands, moves)
+    before = np.vstack((np.zeros((1, 4)), positions[:-1]))
+    p_word = _extra_column(count, extra_rows, extra, P)
+    s_word = _extra_column(count, extra_rows, extra, S)
+    arcs = _arc_lengths(commands, before, positions,
+                        _extra_column(count, extra_rows, extra, I), _extra_column(count, extra_rows, extra, J))
+
+    # Modal state at every row, then only the motion rows are kept
+    feedrate = _ffill(np.where(commands <= G3, moves[:, F], np.nan), DEFAULT_FEEDRATE) / 60
+    limit = commands == M203
+    max_speed = [
+        _ffill(np.where(limit, moves[:, axis], np.nan), default)
+        for axis, default in zip((X, Y, Z, E), profile[:4])
+    ]
+    accel = commands == M204
+    t_word = _extra_column(count, extra_rows, extra, T)
+    print_accel = _ffill(np.where(accel, np.where(np.isnan(p_word), s_word, p_word), np.nan), profile.acceleration)
+    travel_accel = _ffill(np.where(accel, np.where(np.isnan(t_word), s_word, t_word), np.nan),
+                          profile.travel_acceleration)
+    dwell = commands == G4
+    dwell_seconds = np.where(np.isnan(p_word), np.nan_to_num(s_word), p_word / 1000)[dwell].sum()
+    # Dwells and homing drain the planner: the next move starts from rest
+    stops = np.cumsum(np.isin(commands, (G4, G28)))
+
+    rows = np.flatnonzero(commands <= G3)
+    delta = (positions - before)[rows]
+    filament_mm = float(delta[:, E].sum())
+    chord = np.sqrt((delta[:, :3] ** 2).sum(axis=1))
+    length = np.where(chord > EPS, chord, np.abs(delta[:, E]))
+    length = np.where(np.isnan(arcs[rows]), length, arcs[rows])
+    # Lines that only set F (or go nowhere) are not planner blocks
+    real = length > EPS
+    rows, delta, chord, length = rows[real], delta[real], chord[real], length[real]
+    if not len(rows):
+        raise GcodeError('فایل G-code هیچ حرکتی ندارد')
+
+    # Direction: XYZ, or E alone for retracts; nominal speed capped per axis.
+    # A full-circle arc ends where it starts, so its chord gives no direction:
+    # it is planned as a full stop on both sides.
+    direction = delta.copy()
+    direction[chord > EPS, E] = 0.0
+    norm = np.where(chord > EPS, chord, np.abs(delta[:, E]))
+    undirected = (norm <= EPS) | ((chord <= EPS) & ~np.isnan(arcs[rows]))
+    direction /= np.where(norm > EPS, norm, 1.0)[:, None]
+    speed = np.maximum(feedrate[rows], MIN_SPEED)
+    for axis in (X, Y, Z, E):
+        component = np.abs(delta[:, axis])
+        speed = np.minimum(speed, max_speed[axis][rows] * length / np.maximum(component, EPS))
+    speed = np.maximum(speed, MIN_SPEED)
+    extruding = np.abs(delta[:, E]) > EPS
+    accel = np.maximum(np.where(extruding, print_accel[rows], travel_accel[rows]), 1.0)
+
+    # Junction deviation: the fastest speed (squared) through each corner
+    cos = (direction[1:] * direction[:-1]).sum(axis=1)
+    sin_half = np.sqrt(np.clip(0.5 * (1 + cos), 0.0, 1.0))
+    junction = accel[1:] * profile.junction_deviation * sin_half / np.maximum(1 - sin_half, EPS)
+    theta = np.arccos(np.clip(cos, -1.0, 1.0))
+    small = (length[1:] < SMALL_SEGMENT_MM) & (cos > SMALL_SEGMENT_COS) & (theta > EPS)
+    junction[small] = np.minimum(junction[small], length[1:][small] * accel[1:][small] / theta[small])
+    nominal = speed ** 2
+    junction = np.minimum(junction, np.minimum(nominal[1:], nominal[:-1]))
+    junction[np.diff(stops[rows]) > 0] = 0.0
+    junction[undirected[1:] | undirected[:-1]] = 0.0
+    limits = np.concatenate(([0.0], junction, [0.0]))
+
+    # Backward (deceleration) and forward (acceleration) passes in v^2, with
+    # reach[k] the v^2 gained over the first k blocks at full acceleration:
+    #   entry[i] <= min over k >= i of limits[k] + reach[k] - reach[i]
+    #   entry[i] <= min over k <= i of entry[k] - reach[k] + reach[i]
+    reach = np.concatenate(([0.0], np.cumsum(2 * accel * length)))
+    backward = np.minimum.accumulate((limits + reach)[::-1])[::-1] - reach
+    v2 = np.maximum(np.minimum.accumulate(backward - reach) + reach, 0.0)
+    entry2, exit2 = v2[:-1], v2[1:]
+
+    # Trapezoid per block, or a triangle when it never reaches cruise speed
+    cruise = length - (2 * nominal - entry2 - exit2) / (2 * accel)
+    peak = np.where(cruise > 0, speed,
+                    np.sqrt(np.maximum((2 * accel * length + entry2 + exit2) / 2, np.maximum(entry2, exit2))))
+    seconds = ((2 * peak - np.sqrt(entry2) - np.sqrt(exit2)) / accel).sum() + (np.maximum(cruise, 0) / speed).sum()
+    return GcodeStats(len(rows), float(seconds + dwell_seconds), max(filament_mm, 0.0))
+
+
+def estimate_print_time(source, profile=None, name=None):
+    """
+    GcodeStats(moves, seconds, filament_mm) of a G-code file, given a path or
+    a binary file object (plus its name for the suffix check), under
+    `profile` (a MotionProfile; default_profile() when None).
+    """
+    name = (name or (str(source) if isinstance(source, (str, os.PathLike)) else '')).lower()
+    if name and not name.endswith(GCODE_SUFFIXES):
+        raise GcodeError('فقط فایل‌های G-code پشتیبانی می‌شوند')
+    profile = profile or default_profile()
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                parsed = parse_gcode(f)
+        else:
+            parsed = parse_gcode(source)
+    except OSError as e:
+        raise GcodeError('فایل G-code قابل خواندن نیست') from e
+    stats = simulate(*parsed, profile)
+    if not math.isfinite(stats.seconds):
+        raise GcodeError('زمان پرینت این فایل G-code قابل محاسبه نیست')
+    return stats
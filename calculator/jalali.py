@@ -0,0 +1,85 @@
+# calculator/jalali.py
+# Gregorian <-> Jalali (Solar Hijri) conversion, arithmetic algorithm (no dependency).
+from datetime import date
+
+JALALI_MONTHS = [
+    'فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
+    'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند',
+]
+
+_G_DAYS_BEFORE_MONTH = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+
+
+def gregorian_to_jalali(gy, gm, gd):
+    gy2 = gy + 1 if gm > 2 else gy
+    days = (355666 + 365 * gy + (gy2 + 3) // 4 - (gy2 + 99) // 100
+            + (gy2 + 399) // 400 + gd + _G_DAYS_BEFORE_MONTH[gm - 1])
+    jy = -1595 + 33 * (days // 12053)
+    days %= 12053
+    jy += 4 * (days // 1461)
+    days %= 1461
+    if days > 365:
+        jy += (days - 1) // 365
+        days = (days - 1) % 365
+    if days < 186:
+        return jy, 1 + days // 31, 1 + days % 31
+    return jy, 7 + (days - 186) // 30, 1 + (days - 186) % 30
+
+
+def jalali_to_gregorian(jy, jm, jd):
+    jy += 1595
+    days = (-355668 + 365 * jy + (jy // 33) * 8 + ((jy % 33) + 3) // 4 + jd
+            + ((jm - 1) * 31 if jm < 7 else (jm - 7) * 30 + 186))
+    gy = 400 * (days // 146097)
+    days %= 146097
+    if days > 36524:
+        days -= 1
+        gy += 100 * (days // 36524)
+        days %= 36524
+        if days >= 365:
+            days += 1
+    gy += 4 * (days // 1461)
+    days %= 1461
+    if days > 365:
+        gy += (days - 1) // 365
+        days = (days - 1) % 365
+    gd = days + 1
+    leap = (gy % 4 == 0 and gy % 100 != 0) or gy % 400 == 0
+    month_days = [0, 31, 29 if leap else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    gm = 1
+    while gm <= 12 and gd > month_days[gm]:
+        gd -= month_days[gm]
+        gm += 1
+    return gy, gm, gd
+
+
+def to_jalali(d: date):
+    return gregorian_to_jalali(d.year, d.month, d.day)
+
+
+def jalali_month_label(jy, jm):
+    return f"{JALALI_MONTHS[jm - 1]} {jy}"
+
+
+def jalali_day_of_year(jm, jd):
+    return (jm - 1) * 31 + jd if jm <= 6 else 186 + (jm - 7) * 30 + jd
+
+
+def calendar_parts(d: date, fiscal_start_month=1):
+    """Row of the CalendarDay dimension for a local date (weeks start on Saturday)."""
+    jy, jm, jd = to_jalali(d)
+    weekday = (d.weekday() + 2) % 7  # 0 = شنبه
+    doy = jalali_day_of_year(jm, jd)
+    first_weekday = (weekday - (doy - 1)) % 7
+    return {
+        'date': d,
+        'weekday': weekday,
+        'week_start': date.fromordinal(d.toordinal() - weekday),
+        'jalali_year': jy,
+        'jalali_month': jm,
+        'jalali_day': jd,
+        'jalali_quarter': (jm - 1) // 3 + 1,
+        'jalali_week': (doy - 1 + first_weekday) // 7 + 1,
+        'fiscal_year': jy if jm >= fiscal_start_month else jy - 1,
+        'fiscal_period': (jm - fiscal_start_month) % 12 + 1,
+    }
@@ -0,0 +1,264 @@
+# calculator/jobqueue.py
+# Durable background jobs for work that should not hold up a request. Jobs
+# live in their own SQLite file (JOB_QUEUE_DB, next to the data) so a busy
+# queue never contends with sales on calculator.sqlite3. A worker claims the
+# next job with one atomic UPDATE ... RETURNING, so two workers (threads or
+# processes) can never pick the same row. Failed jobs are retried with
+# exponential backoff until JOB_MAX_ATTEMPTS; higher priority runs first.
+#
+# Tasks are plain functions registered with @task("name"); calculator.tasks
+# holds them and is imported by the workers only, never on the request path.
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+from django.conf import settings
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+# Busy timeout of the queue's connections, seconds
+CONNECT_TIMEOUT = 30
+# Longest wait between two retries, seconds
+MAX_BACKOFF = 6 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    args TEXT NOT NULL DEFAULT '[]',
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    worker TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, run_after, id);
+"""
+
+CLAIM = """
+UPDATE jobs SET status = 'running', attempts = attempts + 1, started = :now, finished = NULL, worker = :worker
+WHERE id = (
+    SELECT id FROM jobs WHERE status = 'queued' AND run_after <= :now
+    ORDER BY priority DESC, run_after, id LIMIT 1
+)
+RETURNING id, task, args, attempts, max_attempts
+"""
+
+Job = namedtuple("Job", "id task args priority status attempts max_attempts run_after created started finished "
+                        "worker last_error")
+
+TASKS = {}
+
+_local = threading.local()
+# Set by enqueue() so this process's idle workers start at once instead of
+# at their next poll. Worker processes (JOB_WORKER_MODE="process") have their
+# own copy that nothing sets, so they only see new jobs every JOB_POLL_SECONDS.
+_wakeup = threading.Event()
+_workers = []
+
+
+class JobQueueError(Exception):
+    pass
+
+
+def task(name):
+    """Register the decorated function as the task `name`."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        path = settings.JOB_QUEUE_DB
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit: every statement is its own transaction, which is what
+        # makes the claim atomic without holding a lock between statements
+        conn = sqlite3.connect(path, timeout=CONNECT_TIMEOUT, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def enqueue(name, *args, priority=0, delay=0, max_attempts=None):
+    """
+    Queue task `name` with JSON-serialisable `args`; returns the job id.
+    With JOB_WORKERS = 0 there is no worker to hand it to, so the task runs
+    right here and None is returned; a failure is printed rather than raised
+    into the request that queued it.
+    """
+    if settings.JOB_WORKERS <= 0:
+        _load_tasks()
+        try:
+            TASKS[name](*args)
+        except Exception as e:
+            print(f"Job {name} failed: {e}")
+        return None
+    now = time.time()
+    job_id = _connect().execute(
+        "INSERT INTO jobs (task, args, priority, max_attempts, run_after, created) VALUES (?, ?, ?, ?, ?, ?)",
+        (name, json.dumps(list(args)), priority, max_attempts or settings.JOB_MAX_ATTEMPTS, now + delay, now),
+    ).lastrowid
+    _wakeup.set()
+    return job_id
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`: JOB_RETRY_BASE_SECONDS doubling, capped."""
+    return min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF)
+
+
+def claim(worker):
+    """Mark the next ready job running for `worker` and return (id, task, args, attempts, max_attempts)."""
+    rows = _connect().execute(CLAIM, {"now": time.time(), "worker": worker}).fetchall()
+    return rows[0] if rows else None
+
+
+def run_one(worker):
+    """Claim and run one job; False when nothing was ready."""
+    from django.db import close_old_connections
+
+    claimed = claim(worker)
+    if claimed is None:
+        return False
+    job_id, name, args, attempts, max_attempts = claimed
+    conn = _connect()
+    close_old_connections()
+    try:
+        if name not in TASKS:
+            raise JobQueueError(f"unknown task {name!r}")
+        TASKS[name](*json.loads(args))
+    except Exception as e:
+        error = traceback.format_exc(limit=5)
+        # An unknown task will not appear by retrying
+        if attempts < max_attempts and not isinstance(e, JobQueueError):
+            conn.execute("UPDATE jobs SET status = 'queued', run_after = ?, last_error = ?, worker = NULL WHERE id = ?",
+                         (time.time() + backoff(attempts), error, job_id))
+        else:
+            conn.execute("UPDATE jobs SET status = 'failed', finished = ?, last_error = ? WHERE id = ?",
+                         (time.time(), error, job_id))
+    else:
+        conn.execute("UPDATE jobs SET status = 'done', finished = ?, last_error = NULL WHERE id = ?",
+                     (time.time(), job_id))
+    finally:
+        close_old_connections()
+    return True
+
+
+def work(worker, stop=None):
+    """Worker loop: run ready jobs, otherwise sleep until woken or JOB_POLL_SECONDS pass."""
+    _load_tasks()
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            if run_one(worker):
+                continue
+        except sqlite3.Error as e:  # e.g. the queue file locked for longer than the timeout
+            print(f"Job queue error: {e}")
+        _wakeup.wait(settings.JOB_POLL_SECONDS)
+        _wakeup.clear()
+
+
+def _load_tasks():
+    from . import tasks  # noqa: F401  (registers the tasks)
+
+
+def _process_main(worker):
+    # Entry point of a worker process (spawned, so it sets Django up itself)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+    work(worker)
+
+
+def recover():
+    """
+    Requeue jobs left running by a worker that died with the app (crash,
+    closed window). Only call this while no worker is running.
+    """
+    return _connect().execute(
+        "UPDATE jobs SET status = 'queued', run_after = ?, worker = NULL WHERE status = 'running'",
+        (time.time(),),
+    ).rowcount
+
+
+def purge(days=None):
+    """Drop finished jobs older than `days` (JOB_KEEP_DAYS); failed ones stay for the status page."""
+    days = settings.JOB_KEEP_DAYS if days is None else days
+    return _connect().execute(
+        "DELETE FROM jobs WHERE status = 'done' AND finished < ?", (time.time() - days * 86400,)
+    ).rowcount
+
+
+def start_workers():
+    """
+    Start JOB_WORKERS workers: daemon threads, or processes when
+    JOB_WORKER_MODE is "process" (for CPU-heavy tasks that would hold the
+    GIL; they are not woken by enqueue() and start new jobs on their next
+    poll). Returns the threads / processes; none when disabled.
+    """
+    count = settings.JOB_WORKERS
+    if count <= 0:
+        return []
+    recover()
+    purge()
+    host = f"{socket.gethostname()}:{os.getpid()}"
+    for n in range(1, count + 1):
+        name = f"job-worker-{n}"
+        if settings.JOB_WORKER_MODE == "process":
+            worker = multiprocessing.get_context("spawn").Process(
+                target=_process_main, args=(f"{host}/{name}",), name=name, daemon=True)
+        else:
+            worker = threading.Thread(target=work, args=(f"{host}/{name}",), name=name, daemon=True)
+        worker.start()
+        _workers.append(worker)
+    return list(_workers)
+
+
+def running_workers():
+    """Workers started by this process that are still alive."""
+    return [w for w in _workers if w.is_alive()]
+
+
+def counts():
+    """{status: number of jobs} for every status."""
+    found = dict(_connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+    return {status: found.get(status, 0) for status in STATUSES}
+
+
+def recent(status=None, limit=100):
+    """Newest jobs first, optionally of one status."""
+    sql, params = "SELECT * FROM jobs", ()
+    if status:
+        sql, params = sql + " WHERE status = ?", (status,)
+    rows = _connect().execute(sql + " ORDER BY id DESC LIMIT ?", (*params, limit))
+    return [Job(*row) for row in rows]
+
+
+def retry(job_id):
+    """Queue a failed job again with a fresh attempt budget."""
+    return _connect().execute(
+        "UPDATE jobs SET status = 'queued', attempts = 0, run_after = ?, finished = NULL WHERE id = ? "
+        "AND status = 'failed'", (time.time(), job_id),
+    ).rowcount
+
+
+def cancel(job_id):
+    """Remove a job that has not started yet."""
+    return _connect().execute("DELETE FROM jobs WHERE id = ? AND status = 'queued'", (job_id,)).rowcount
@@ -1,9 +1,12 @@
 # calculator/licensing.py
+# Imported by config.settings (get_data_dir), so importing it must stay cheap:
+# jose/cryptography are imported on the first verification, and the paths and
+# public key below are resolved on first use, once settings are loaded.
 import os, time, hashlib, sqlite3, platform, uuid
-from jose import jwt, JWTError
+from functools import cache
+from asgiref.sync import sync_to_async
 from django.core.exceptions import PermissionDenied
 from pathlib import Path
-import os
 
 def get_data_dir():
     # Don't import settings at module level
@@ -13,13 +16,8 @@ def get_data_dir():
     except Exception:
         app_name = "Calculator"
     
-    data_dir = Path.home() / ".local" / "share" / app_name
-    os.makedirs(data_dir, exist_ok=True)
-    return str(data_dir)
+    return str(Path.home() / ".local" / "share" / app_name)
 
-DATA_DIR = get_data_dir()
-LICENSE_FILE_PATH = os.path.join(DATA_DIR, "license.lic")
-STATE_DB = os.path.join(DATA_DIR, "lic_state.sqlite3")
 CHECK_INTERVAL = 60  # seconds
 
 # Get public key from settings or use a default
@@ -31,7 +29,7 @@ def get_public_key():
         return None
 
 # Fallback public key (replace with your actual RSA public key)
-PUBLIC_KEY_PEM = get_public_key() or """-----BEGIN PUBLIC KEY-----
+DEFAULT_PUBLIC_KEY_PEM = """-----BEGIN PUBLIC KEY-----
 MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAmJU91mU/KwhAlRGHn3ic
 LLVgk52ptb/1hh0rz3TZvU3O67gzBNZL+fT/ffaqMEe6SqCPwOlIlSOwXTF9mJVt
 bosqAXzKA+vm0b0172kMhFi386n89RcMLiDw8FqnZvKBoLFGi7mv7TXOzp7uQe5L
@@ -41,10 +39,37 @@ DOPENK8XhU+6Vn2t7q59PTVv3QJBZHAehEY9+pXaG9Q/fHR74bq8UBdDPiJsECTj
 bwIDAQAB
 -----END PUBLIC KEY-----"""
 
+@cache
+def data_dir():
+    return get_data_dir()
+
+def license_file_path():
+    return os.path.join(data_dir(), "license.lic")
+
+def state_db_path():
+    return os.path.join(data_dir(), "lic_state.sqlite3")
+
+@cache
+def public_key_pem():
+    return get_public_key() or DEFAULT_PUBLIC_KEY_PEM
+
+_LAZY = {
+    "DATA_DIR": data_dir,
+    "LICENSE_FILE_PATH": license_file_path,
+    "STATE_DB": state_db_path,
+    "PUBLIC_KEY_PEM": public_key_pem,
+}
+
+def __getattr__(name):
+    # The old module constants, resolved on first access
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 _cached = {"payload": None, "checked_at": 0}
 
 def ensure_dirs():
-    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(data_dir(), exist_ok=True)
 
 def get_hw_fingerprint():
     parts = [
@@ -57,7 +82,7 @@ def get_hw_fingerprint():
 
 def ensure_state_db():
     ensure_dirs()
-    conn = sqlite3.connect(STATE_DB)
+    conn = sqlite3.connect(state_db_path())
     cur = conn.cursor()
     cur.execute("""
         create table if not exists t(
@@ -71,7 +96,7 @@ def ensure_state_db():
 
 def update_and_check_clock(now: int):
     ensure_state_db()
-    conn = sqlite3.connect(STATE_DB)
+    conn = sqlite3.connect(state_db_path())
     cur = conn.cursor()
     cur.execute("select last_seen_unix from t where id=1")
     row = cur.fetchone()
@@ -86,15 +111,17 @@ def update_and_check_clock(now: int):
 
 def read_license_file():
     ensure_dirs()
-    if not os.path.exists(LICENSE_FILE_PATH):
+    path = license_file_path()
+    if not os.path.exists(path):
         return None
-    with open(LICENSE_FILE_PATH, "r", encoding="utf-8") as f:
+    with open(path, "r", encoding="utf-8") as f:
         return f.read().strip()
 
 def verify_license(token: str):
+    from jose import jwt, JWTError
     try:
         # Changed from EdDSA to RS256
-        payload = jwt.decode(token, PUBLIC_KEY_PEM, algorithms=["RS256"])
+        payload = jwt.decode(token, public_key_pem(), algorithms=["RS256"])
     except JWTError as e:
         raise PermissionDenied(f"Invalid license: {e}")
     now = int(time.time())
@@ -118,6 +145,15 @@ def check_license(force=False):
     _cached.update({"payload": payload, "checked_at": now})
     return payload
 
+async def acheck_license(force=False):
+    # Async variant for ASGI requests: a cached payload is returned without
+    # leaving the event loop; a due re-check (file read + sqlite3 clock update)
+    # runs in a worker thread so it never blocks other connections.
+    now = int(time.time())
+    if not force and _cached["payload"] and now - _cached["checked_at"] < CHECK_INTERVAL:
+        return _cached["payload"]
+    return await sync_to_async(check_license, thread_sensitive=False)(force)
+
 def license_status():
     try:
         payload = check_license(force=True)
@@ -0,0 +1,42 @@
+# calculator/localtime.py
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+
+def local_day_range(start_date, end_date):
+    """Aware [start, end) datetimes covering the given local dates (end inclusive)."""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def utc_offset_segments(start, end):
+    """Split [start, end) into (start, end, utc_offset_seconds) pieces with a constant local offset."""
+    tz = timezone.get_current_timezone()
+
+    def offset(t):
+        return t.astimezone(tz).utcoffset()
+
+    # Walk in UTC: arithmetic on datetimes sharing a ZoneInfo is wall-clock arithmetic.
+    start, end = start.astimezone(dt_timezone.utc), end.astimezone(dt_timezone.utc)
+    segments = []
+    seg_start = t = start
+    while t < end:
+        step = min(t + timedelta(hours=12), end)
+        probe = step if step < end else end - timedelta(microseconds=1)
+        if offset(probe) != offset(seg_start):
+            # bisect to the transition instant
+            lo, hi = t, step
+            while hi - lo > timedelta(microseconds=1):
+                mid = lo + (hi - lo) / 2
+                if offset(mid) == offset(seg_start):
+                    lo = mid
+                else:
+                    hi = mid
+            segments.append((seg_start, hi, int(offset(seg_start).total_seconds())))
+            seg_start = hi
+        t = step
+    segments.append((seg_start, end, int(offset(seg_start).total_seconds())))
+    return segments
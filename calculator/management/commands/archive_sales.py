@@ -0,0 +1,30 @@
+# calculator/management/commands/archive_sales.py
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator.archive import ArchiveError, archivable_years, archive_sales
+
+
+class Command(BaseCommand):
+    help = "Move sales of closed fiscal years into archive.sqlite3 (reports keep counting them)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, default=None,
+                            help="fiscal years kept in the main database, the current one included "
+                                 "(default: SALES_HOT_FISCAL_YEARS)")
+        parser.add_argument("--vacuum", action="store_true",
+                            help="shrink the main database file afterwards (blocks writes while it runs)")
+        parser.add_argument("--dry-run", action="store_true", help="only list the fiscal years that would move")
+
+    def handle(self, *args, **options):
+        try:
+            years = archivable_years(options["keep"])
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        if not years:
+            self.stdout.write("Nothing to archive")
+            return
+        if options["dry_run"]:
+            self.stdout.write(f"Would archive fiscal years: {', '.join(map(str, years))}")
+            return
+        for year in archive_sales(years, vacuum=options["vacuum"]):
+            self.stdout.write(self.style.SUCCESS(f"Fiscal year {year.fiscal_year}: {year.sales} sales archived"))
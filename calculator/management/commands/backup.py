@@ -0,0 +1,39 @@
+# calculator/management/commands/backup.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import backup
+
+
+class Command(BaseCommand):
+    help = "Take an online snapshot of the databases and media (safe while the app is running)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--label", default="", help="suffix for the snapshot name")
+        parser.add_argument("--list", action="store_true", help="list snapshots instead of taking one")
+        parser.add_argument("--verify", metavar="NAME", help="check the checksums and integrity of a snapshot")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for s in backup.list_snapshots():
+                created = datetime.fromtimestamp(s.created).strftime("%Y-%m-%d %H:%M")
+                size = sum(d["size"] for d in s.databases.values())
+                self.stdout.write(f"{s.name}  {created}  db {size / 1e6:.1f} MB  media {s.media_files} files")
+            return
+        if options["verify"]:
+            try:
+                backup.verify_snapshot(backup.get_snapshot(options["verify"]))
+            except backup.BackupError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"{options['verify']} is intact"))
+            return
+
+        try:
+            snapshot = backup.create_snapshot(options["label"])
+        except (backup.BackupError, OSError) as e:
+            raise CommandError(f"Backup failed: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {snapshot.name}: {', '.join(snapshot.databases)}; "
+            f"{snapshot.media_files} media files ({snapshot.new_media} new) -> {snapshot.path}"
+        ))
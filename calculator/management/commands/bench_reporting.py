@@ -0,0 +1,119 @@
+# calculator/management/commands/bench_reporting.py
+import re
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from calculator.backup import online_copy
+from calculator.models import Sale
+
+FORMAT_QMARK_RE = re.compile(r"(?<!%)%s")
+
+
+def _report_sql():
+    """The reports page's heaviest aggregate (Jalali month totals over every sale), as raw SQL."""
+    qs = (Sale.objects.values('calendar_day__jalali_year', 'calendar_day__jalali_month')
+          .annotate(count=Count('id'), revenue=Sum('total_price'), total_quantity=Sum('quantity'))
+          .order_by('-calendar_day__jalali_year', '-calendar_day__jalali_month'))
+    sql, params = qs.query.sql_with_params()
+    return FORMAT_QMARK_RE.sub("?", sql).replace("%%", "%"), params
+
+
+class Command(BaseCommand):
+    help = ("Measure Sale insert latency while a heavy report runs concurrently: rollback journal "
+            "with reads on the writer's file (before) vs WAL with the read-only reporting connection. "
+            "Runs on a temporary copy of the database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=5.0, help="duration of each scenario")
+        parser.add_argument("--interval", type=float, default=0.01, help="pause between inserts, seconds")
+
+    def handle(self, *args, **options):
+        sql, params = _report_sql()
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "bench.sqlite3"
+            online_copy(Path(settings.DATABASES["default"]["NAME"]), db, pause=0)
+            for label, journal, reporting, with_report in (
+                ("rollback journal, no report", "DELETE", False, False),
+                ("rollback journal + report", "DELETE", False, True),
+                ("WAL, no report", "WAL", True, False),
+                ("WAL + reporting connection", "WAL", True, True),
+            ):
+                conn = sqlite3.connect(db)
+                conn.execute(f"PRAGMA journal_mode = {journal}")
+                conn.close()
+                latencies, reports = self._run(db, sql, params, reporting, with_report, options)
+                self._print(label, latencies, reports)
+
+    def _reader(self, db, reporting):
+        if reporting:
+            conn = sqlite3.connect(f"file:{db}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute(f"PRAGMA cache_size = -{int(settings.REPORTING_CACHE_KIB)}")
+        else:
+            conn = sqlite3.connect(db, timeout=30, check_same_thread=False)
+        return conn
+
+    def _run(self, db, sql, params, reporting, with_report, options):
+        stop = threading.Event()
+        report_times = []
+
+        def report_loop():
+            conn = self._reader(db, reporting)
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    conn.execute(sql, params).fetchall()
+                    report_times.append(time.perf_counter() - start)
+            finally:
+                conn.close()
+
+        reader = threading.Thread(target=report_loop, daemon=True)
+        if with_report:
+            reader.start()
+            time.sleep(0.1)
+
+        writer = sqlite3.connect(db, timeout=30, isolation_level=None)
+        if reporting:
+            writer.execute("PRAGMA synchronous = NORMAL")
+        template = writer.execute(
+            "SELECT project_id, project_code, unit_price, packaging_cost, total_price, local_date "
+            "FROM calculator_sale ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        latencies = []
+        deadline = time.perf_counter() + options["seconds"]
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                writer.execute("BEGIN IMMEDIATE")
+                writer.execute(
+                    "INSERT INTO calculator_sale (project_id, project_code, quantity, customer_name, "
+                    "customer_phone, unit_price, packaging_cost, total_price, sale_date, local_date, notes) "
+                    "VALUES (?, ?, 1, '', '', ?, ?, ?, datetime('now'), ?, 'bench')",
+                    template,
+                )
+                writer.execute("COMMIT")
+                latencies.append(time.perf_counter() - start)
+                time.sleep(options["interval"])
+        finally:
+            stop.set()
+            if with_report:
+                reader.join()
+            writer.close()
+        return latencies, report_times
+
+    def _print(self, label, latencies, reports):
+        ms = sorted(x * 1000 for x in latencies)
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        line = (f"{label:30}  {len(ms):5} inserts  p50 {statistics.median(ms):7.2f} ms  "
+                f"p95 {p95:7.2f} ms  max {ms[-1]:8.2f} ms")
+        if reports:
+            line += f"  | {len(reports)} reports, {statistics.mean(reports) * 1000:.0f} ms each"
+        self.stdout.write(line)
@@ -0,0 +1,93 @@
+# calculator/management/commands/bench_startup.py
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a server process does before it can answer: settings, app registry,
+# middleware chain and URLconf (which imports the views)
+STARTUP_SNIPPET = """
+import os, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print((time.perf_counter() - start) * 1000)
+"""
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+PROFILES = ("full", "slim")
+
+
+class Command(BaseCommand):
+    help = ("Measure startup per app profile (APP_PROFILE): time to a loaded WSGI app, where "
+            "the import time goes (python -X importtime), and time until runserver accepts "
+            "connections")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="runs per profile (the median is reported)")
+        parser.add_argument("--top", type=int, default=12, help="packages listed by import time")
+        parser.add_argument("--no-server", action="store_true", help="skip the runserver measurement")
+
+    def handle(self, *args, **options):
+        for profile in PROFILES:
+            env = {**os.environ, "CALCULATOR_APP_PROFILE": profile}
+            loads, packages = [], Counter()
+            for _ in range(options["runs"]):
+                load_ms, run_packages = self._import_run(env)
+                loads.append(load_ms)
+                packages = run_packages  # the last (warm file cache) run
+            total = sum(packages.values())
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{profile} profile"))
+            self.stdout.write(f"  app loaded      {statistics.median(loads):7.0f} ms  (median of {len(loads)})")
+            self.stdout.write(f"  import time     {total / 1000:7.0f} ms  (sum of -X importtime self times)")
+            for package, us in packages.most_common(options["top"]):
+                self.stdout.write(f"    {package:28} {us / 1000:7.1f} ms")
+            if not options["no_server"]:
+                listening = [self._server_run(env) for _ in range(options["runs"])]
+                self.stdout.write(f"  server listening{statistics.median(listening):7.0f} ms  (runserver, median)")
+
+    def _import_run(self, env):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SNIPPET],
+            cwd=settings.SOURCE_BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        packages = Counter()
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if match:
+                packages[match.group(4).split(".")[0]] += int(match.group(1))
+        return float(result.stdout.strip().splitlines()[-1]), packages
+
+    def _server_run(self, env):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, str(Path(settings.SOURCE_BASE_DIR) / "manage.py"), "runserver",
+             f"127.0.0.1:{port}", "--noreload"],
+            cwd=settings.SOURCE_BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while server.poll() is None:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=0.05).close()
+                    return (time.perf_counter() - start) * 1000
+                except OSError:
+                    time.sleep(0.005)
+            raise RuntimeError(f"runserver exited with status {server.returncode}")
+        finally:
+            server.terminate()
+            server.wait()
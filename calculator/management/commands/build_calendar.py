@@ -0,0 +1,30 @@
+# calculator/management/commands/build_calendar.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator.models import CalendarDay
+
+
+class Command(BaseCommand):
+    help = "Fill the CalendarDay (Jalali date dimension) table for a range of dates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", default="1990-01-01", help="first Gregorian date (YYYY-MM-DD)")
+        parser.add_argument("--end", default="2060-12-31", help="last Gregorian date (YYYY-MM-DD)")
+        parser.add_argument("--rebuild", action="store_true",
+                            help="delete existing rows first (e.g. after changing FISCAL_YEAR_START_MONTH)")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"])
+            end = date.fromisoformat(options["end"])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+        if start > end:
+            raise CommandError("--start is after --end")
+
+        if options["rebuild"]:
+            CalendarDay.objects.filter(date__gte=start, date__lte=end).delete()
+        days = CalendarDay.build(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Calendar covers {start} .. {end} ({days} days)"))
@@ -0,0 +1,35 @@
+# calculator/management/commands/estimate_gcode.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator.gcode import GcodeError, default_profile, estimate_print_time
+from calculator.models import Printer
+
+
+class Command(BaseCommand):
+    help = ("Simulated print time of a G-code file under a printer's motion limits (the estimate "
+            "projects use), and how long the simulation took")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="G-code file")
+        parser.add_argument("--printer", help="printer name (default: GCODE_MOTION_DEFAULTS)")
+
+    def handle(self, *args, **options):
+        profile = default_profile()
+        if options["printer"]:
+            printer = Printer.objects.filter(name=options["printer"]).first()
+            if printer is None:
+                raise CommandError(f"No printer named {options['printer']!r}")
+            profile = printer.motion_profile()
+        start = time.perf_counter()
+        try:
+            stats = estimate_print_time(options["path"], profile)
+        except GcodeError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+        hours, rest = divmod(round(stats.seconds), 3600)
+        self.stdout.write(f"moves        {stats.moves}")
+        self.stdout.write(f"print time   {hours}:{rest // 60:02d}:{rest % 60:02d}  ({stats.seconds / 3600:.2f} h)")
+        self.stdout.write(f"filament     {stats.filament_mm / 1000:.2f} m")
+        self.stdout.write(self.style.SUCCESS(f"simulated in {elapsed:.2f} s"))
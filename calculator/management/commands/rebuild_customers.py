@@ -0,0 +1,13 @@
+# calculator/management/commands/rebuild_customers.py
+from django.core.management.base import BaseCommand
+
+from calculator.customers import rebuild_customers
+
+
+class Command(BaseCommand):
+    help = ("Link hot and archived sales to customers by normalized phone and recount every "
+            "customer's stored totals")
+
+    def handle(self, *args, **options):
+        linked, total = rebuild_customers()
+        self.stdout.write(self.style.SUCCESS(f"{total} customers recounted ({linked} linked to new sales)"))
@@ -0,0 +1,39 @@
+# calculator/management/commands/restore.py
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import backup
+
+
+class Command(BaseCommand):
+    help = "Verify a backup snapshot and restore the databases (and media) from it"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", nargs="?", help="snapshot name (default: the newest)")
+        parser.add_argument("--no-media", action="store_true", help="restore the databases only")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive",
+                            help="do not ask for confirmation")
+
+    def handle(self, *args, **options):
+        try:
+            if options["name"]:
+                snapshot = backup.get_snapshot(options["name"])
+            else:
+                snapshots = backup.list_snapshots()
+                if not snapshots:
+                    raise CommandError("No snapshots found")
+                snapshot = snapshots[0]
+        except backup.BackupError as e:
+            raise CommandError(str(e))
+
+        if options["interactive"]:
+            answer = input(f"Replace the current data with snapshot {snapshot.name}? [y/N] ")
+            if answer.strip().lower() not in ("y", "yes"):
+                raise CommandError("Restore cancelled")
+        try:
+            restored = backup.restore_snapshot(snapshot, media=not options["no_media"])
+        except (backup.BackupError, OSError) as e:
+            raise CommandError(f"Restore failed: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Restored {', '.join(snapshot.databases)} from {snapshot.name}"
+            + ("" if options["no_media"] else f"; {restored} media files put back")
+        ))
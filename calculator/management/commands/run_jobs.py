@@ -0,0 +1,44 @@
+# calculator/management/commands/run_jobs.py
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from calculator import jobqueue
+
+
+class Command(BaseCommand):
+    help = ("Run background job workers in the foreground (run_app starts them itself; this is for "
+            "manage.py runserver). --drain runs what is ready and exits")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="worker threads (default JOB_WORKERS)")
+        parser.add_argument("--drain", action="store_true", help="run every ready job once, then exit")
+
+    def handle(self, *args, **options):
+        jobqueue._load_tasks()
+        if options["drain"]:
+            ran = 0
+            while jobqueue.run_one("run_jobs"):
+                ran += 1
+            self.stdout.write(self.style.SUCCESS(f"{ran} jobs run"))
+            self._summary()
+            return
+
+        count = max(options["workers"] or settings.JOB_WORKERS, 1)
+        jobqueue.recover()
+        threads = [
+            threading.Thread(target=jobqueue.work, args=(f"run_jobs/{n}",), name=f"job-worker-{n}", daemon=True)
+            for n in range(1, count + 1)
+        ]
+        for t in threads:
+            t.start()
+        self.stdout.write(f"{count} workers running; Ctrl+C to stop")
+        try:
+            for t in threads:
+                t.join()
+        except KeyboardInterrupt:
+            self._summary()
+
+    def _summary(self):
+        self.stdout.write("  ".join(f"{status} {n}" for status, n in jobqueue.counts().items()))
@@ -0,0 +1,20 @@
+# calculator/management/commands/runserver.py
+from django.contrib.staticfiles.management.commands.runserver import Command as StaticfilesRunserverCommand
+from django.core.management.commands.runserver import Command as RunserverCommand
+
+from calculator.static_handlers import CollectedStaticFilesHandler
+
+
+class Command(StaticfilesRunserverCommand):
+    help = (
+        "Starts the web server and serves collected static files "
+        "(precompressed, far-future cached when fingerprinted)."
+    )
+
+    def get_handler(self, *args, **options):
+        # The app always runs this way (DEBUG on, packaged build), so unlike the
+        # stock staticfiles command this does not depend on DEBUG/--insecure.
+        handler = RunserverCommand.get_handler(self, *args, **options)
+        if options["use_static_handler"]:
+            return CollectedStaticFilesHandler(handler)
+        return handler
@@ -0,0 +1,160 @@
+# calculator/management/commands/vendor_assets.py
+import re
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator.assets import (
+    BOOTSTRAP_CDN, FONTAWESOME_CDN, VAZIRMATN_CDN, VAZIRMATN_WEIGHTS, VENDOR_ASSETS,
+)
+
+ICON_RE = re.compile(r'\bfa-[a-z0-9-]+')
+SOURCE_MAP_RE = re.compile(rb'\n?/[*/]# sourceMappingURL=\S+(?: \*/)?\s*$')
+ICON_RULE_SELECTOR_RE = re.compile(r'^\.(fa-[a-z0-9-]+)::?before$')
+ESCAPE_RE = re.compile(r'\\([0-9a-fA-F]{1,6})')
+
+FA_SOLID_FONT = 'fa-solid-900.woff2'
+
+
+def _fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0 (vendor_assets)'})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.read()
+    except OSError as e:
+        raise CommandError(f"Download failed: {url} ({e})")
+
+
+def _strip_source_map(data):
+    # collectstatic's manifest storage would try to resolve the missing .map file
+    return SOURCE_MAP_RE.sub(b'\n', data)
+
+
+def _top_level_blocks(css):
+    """Split a stylesheet into (prelude, body) pairs of its top-level rules."""
+    blocks, depth, start, body_start = [], 0, 0, 0
+    for i, ch in enumerate(css):
+        if ch == '{':
+            if depth == 0:
+                body_start = i
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((css[start:body_start].strip(), css[body_start + 1:i]))
+                start = i + 1
+    return blocks
+
+
+def subset_fontawesome_css(css, used_icons):
+    """
+    Keep Font Awesome's base/utility rules, drop every icon rule the templates
+    never reference and replace all @font-face blocks with the local solid font.
+    Returns (css, codepoints of the kept icons).
+    """
+    out, codepoints = [], set()
+    for prelude, body in _top_level_blocks(css):
+        if prelude.startswith('@font-face'):
+            continue
+        selectors = [s.strip() for s in prelude.split(',')]
+        names = [ICON_RULE_SELECTOR_RE.match(s) for s in selectors]
+        if all(names) and body.strip().startswith('content:'):
+            kept = [s for s, m in zip(selectors, names) if m.group(1) in used_icons]
+            if not kept:
+                continue
+            codepoints.update(int(h, 16) for h in ESCAPE_RE.findall(body))
+            prelude = ','.join(kept)
+        out.append(f'{prelude}{{{body}}}')
+    out.append(
+        '@font-face{font-family:"Font Awesome 6 Free";font-style:normal;font-weight:900;'
+        f'font-display:block;src:url({FA_SOLID_FONT}) format("woff2")}}'
+    )
+    return '\n'.join(out) + '\n', codepoints
+
+
+def subset_font(data, codepoints):
+    """Glyph-subset a woff2 font with fontTools; return it unchanged if fontTools is missing."""
+    try:
+        from io import BytesIO
+        from fontTools import subset
+    except ImportError:
+        return data, False
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = subset.load_font(BytesIO(data), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    buf = BytesIO()
+    subset.save_font(font, buf, options)
+    return buf.getvalue(), True
+
+
+class Command(BaseCommand):
+    help = (
+        "Download Bootstrap, Font Awesome (subset to the icons the templates use) and "
+        "Vazirmatn into static/vendor/ so the app works offline. Run before collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dest", default=str(settings.STATICFILES_DIRS[0]),
+                            help="static directory to write vendor/ into")
+
+    def handle(self, *args, **options):
+        dest = Path(options["dest"])
+        self.vendor_bootstrap(dest)
+        self.vendor_fontawesome(dest)
+        self.vendor_vazirmatn(dest)
+
+    def _write(self, dest, path, data):
+        target = dest / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        self.stdout.write(f"  {path} ({len(data) // 1024} KB)")
+
+    def vendor_bootstrap(self, dest):
+        self.stdout.write("Bootstrap")
+        for kind, remote in (('css', 'css/bootstrap.rtl.min.css'), ('js', 'js/bootstrap.bundle.min.js')):
+            path, _ = VENDOR_ASSETS[('bootstrap', kind)]
+            self._write(dest, path, _strip_source_map(_fetch(f'{BOOTSTRAP_CDN}/{remote}')))
+
+    def used_icons(self):
+        roots = [Path(d) for t in settings.TEMPLATES for d in t.get('DIRS', [])]
+        roots += [Path(d) / 'calculator' for d in settings.STATICFILES_DIRS]
+        icons = set()
+        for root in roots:
+            for f in root.rglob('*'):
+                if f.suffix in ('.html', '.js') and f.is_file():
+                    icons.update(ICON_RE.findall(f.read_text(encoding='utf-8', errors='ignore')))
+        return icons
+
+    def vendor_fontawesome(self, dest):
+        self.stdout.write("Font Awesome")
+        css_path, _ = VENDOR_ASSETS[('fontawesome', 'css')]
+        css = _strip_source_map(_fetch(f'{FONTAWESOME_CDN}/css/all.min.css')).decode('utf-8')
+        icons = self.used_icons()
+        css, codepoints = subset_fontawesome_css(css, icons)
+        self._write(dest, css_path, css.encode('utf-8'))
+
+        font, subsetted = subset_font(_fetch(f'{FONTAWESOME_CDN}/webfonts/{FA_SOLID_FONT}'), codepoints)
+        self._write(dest, str(Path(css_path).parent / FA_SOLID_FONT), font)
+        self.stdout.write(f"  {len(icons)} icon classes, {len(codepoints)} glyphs"
+                          + ("" if subsetted else " (fontTools not installed: full font kept)"))
+
+    def vendor_vazirmatn(self, dest):
+        self.stdout.write("Vazirmatn")
+        css_path, _ = VENDOR_ASSETS[('vazirmatn', 'css')]
+        font_dir = Path(css_path).parent
+        faces = []
+        for weight, name in VAZIRMATN_WEIGHTS.items():
+            filename = f'Vazirmatn-{name}.woff2'
+            self._write(dest, str(font_dir / filename), _fetch(f'{VAZIRMATN_CDN}/{filename}'))
+            faces.append(
+                '@font-face{font-family:"Vazirmatn";font-style:normal;'
+                f'font-weight:{weight};font-display:swap;src:url({filename}) format("woff2")}}'
+            )
+        self._write(dest, css_path, ('\n'.join(faces) + '\n').encode('utf-8'))
+        self.stdout.write(self.style.SUCCESS("Vendored assets written to " + str(dest / 'vendor')))
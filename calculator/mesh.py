@@ -0,0 +1,273 @@
+# calculator/mesh.py
+# Volume / surface area / bounding box of STL and 3MF meshes with NumPy.
+import os
+import re
+import zipfile
+from collections import namedtuple
+from xml.etree import ElementTree
+
+import numpy as np
+
+# Binary STL: 80-byte header, uint32 triangle count, then 50-byte records
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attr', '<u2')])
+STL_HEADER_SIZE = 84
+# Files above this are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 16 * 1024 * 1024
+# Triangles per vectorised batch; bounds the float64 temporaries to ~200 MB
+CHUNK_TRIANGLES = 1 << 20
+
+ASCII_VERTEX_RE = re.compile(rb'vertex\s+(\S+)\s+(\S+)\s+(\S+)')
+
+CORE_NS = '{http://schemas.microsoft.com/3dmanufacturing/core/2015/02}'
+MODEL_REL_TYPE = 'http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel'
+# 3MF "unit" attribute -> millimetres
+UNIT_SCALE = {
+    'micron': 0.001, 'millimeter': 1.0, 'centimeter': 10.0,
+    'inch': 25.4, 'foot': 304.8, 'meter': 1000.0,
+}
+# Fast path for the attribute order every common slicer writes; anything else
+# falls back to ElementTree.
+VERTEX_RE = re.compile(rb'<(?:\w+:)?vertex\s+x="([^"]+)"\s+y="([^"]+)"\s+z="([^"]+)"')
+TRIANGLE_RE = re.compile(rb'<(?:\w+:)?triangle\s+v1="(\d+)"\s+v2="(\d+)"\s+v3="(\d+)"')
+OBJECT_RE = re.compile(rb'<(?:\w+:)?object\b([^>]*)>(.*?)</(?:\w+:)?object>', re.S)
+
+MESH_SUFFIXES = ('.stl', '.3mf')
+
+MeshStats = namedtuple('MeshStats', 'triangles volume_mm3 surface_mm2 size_x size_y size_z')
+
+
+class MeshError(ValueError):
+    pass
+
+
+# --------------------------------------------------------------------------------------
+# Geometry
+# --------------------------------------------------------------------------------------
+def analyze_triangles(triangles):
+    """
+    MeshStats of an (n, 3, 3) vertex array (mm). Volume is the divergence-theorem
+    sum of signed tetrahedra, exact for a closed mesh whatever its orientation.
+    """
+    n = len(triangles)
+    if n == 0:
+        raise MeshError('مدل هیچ مثلثی ندارد')
+    volume = area = 0.0
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    for start in range(0, n, CHUNK_TRIANGLES):
+        # (vertex, axis, triangle): one contiguous float64 array per coordinate
+        t = np.ascontiguousarray(np.asarray(triangles[start:start + CHUNK_TRIANGLES]).transpose(1, 2, 0),
+                                 dtype=np.float64)
+        (x0, y0, z0), (x1, y1, z1), (x2, y2, z2) = t
+        ax, ay, az = x1 - x0, y1 - y0, z1 - z0
+        bx, by, bz = x2 - x0, y2 - y0, z2 - z0
+        # cross product of the two edges
+        cx = ay * bz - az * by
+        cy = az * bx - ax * bz
+        cz = ax * by - ay * bx
+        area += 0.5 * np.sqrt(cx * cx + cy * cy + cz * cz).sum()
+        # v0 . ((v1 - v0) x (v2 - v0)) == v0 . (v1 x v2)
+        volume += (x0 * cx + y0 * cy + z0 * cz).sum() / 6.0
+        lo = np.minimum(lo, t.min(axis=(0, 2)))
+        hi = np.maximum(hi, t.max(axis=(0, 2)))
+    if not np.all(np.isfinite(hi - lo)):
+        raise MeshError('مختصات مدل نامعتبر است')
+    size = hi - lo
+    return MeshStats(n, abs(float(volume)), float(area), float(size[0]), float(size[1]), float(size[2]))
+
+
+# --------------------------------------------------------------------------------------
+# STL
+# --------------------------------------------------------------------------------------
+def _binary_stl_count(head, size):
+    if len(head) < STL_HEADER_SIZE:
+        return None
+    n = int.from_bytes(head[80:84], 'little')
+    return n if STL_HEADER_SIZE + n * STL_RECORD.itemsize == size else None
+
+
+def _ascii_stl(data):
+    coords = ASCII_VERTEX_RE.findall(data)
+    if not coords or len(coords) % 3:
+        raise MeshError('فایل STL قابل خواندن نیست')
+    return np.array(coords, dtype=np.float64).reshape(-1, 3, 3)
+
+
+def load_stl(source):
+    """(n, 3, 3) vertex array of a binary or ASCII STL, from a path or a file object."""
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        with open(source, 'rb') as f:
+            head = f.read(STL_HEADER_SIZE)
+        n = _binary_stl_count(head, size)
+        if n is not None:
+            if size > MMAP_THRESHOLD:
+                return np.memmap(source, dtype=STL_RECORD, mode='r', offset=STL_HEADER_SIZE, shape=(n,))['vertices']
+            return np.fromfile(source, dtype=STL_RECORD, count=n, offset=STL_HEADER_SIZE)['vertices']
+        with open(source, 'rb') as f:
+            return _ascii_stl(f.read())
+
+    data = source.read()
+    n = _binary_stl_count(data, len(data))
+    if n is not None:
+        return np.frombuffer(data, dtype=STL_RECORD, count=n, offset=STL_HEADER_SIZE)['vertices']
+    return _ascii_stl(data)
+
+
+# --------------------------------------------------------------------------------------
+# 3MF
+# --------------------------------------------------------------------------------------
+def _transform(value):
+    """3MF 3x4 affine transform as a 4x3 matrix for row vectors: [x y z 1] @ m."""
+    if not value:
+        return None
+    m = np.array(value.split(), dtype=np.float64)
+    if m.size != 12:
+        raise MeshError('ماتریس تبدیل 3MF نامعتبر است')
+    return m.reshape(4, 3)
+
+
+def _apply(vertices, m):
+    return vertices if m is None else vertices @ m[:3] + m[3]
+
+
+def _combine(outer, inner):
+    if outer is None:
+        return inner
+    if inner is None:
+        return outer
+    # p @ inner then @ outer
+    linear = inner[:3] @ outer[:3]
+    return np.vstack([linear, inner[3] @ outer[:3] + outer[3]])
+
+
+def _model_path(archive):
+    try:
+        rels = ElementTree.fromstring(archive.read('_rels/.rels'))
+    except KeyError:
+        rels = None
+    if rels is not None:
+        for rel in rels.iter():
+            if rel.get('Type') == MODEL_REL_TYPE and rel.get('Target'):
+                return rel.get('Target').lstrip('/')
+    return '3D/3dmodel.model'
+
+
+def _parse_objects_fast(xml):
+    """{object id: ('mesh', vertices, triangles) | ('components', [(id, transform)])} via regex."""
+    objects = {}
+    for attrs, body in OBJECT_RE.findall(xml):
+        oid = re.search(rb'\bid="([^"]+)"', attrs)
+        if oid is None:
+            continue
+        oid = oid.group(1).decode()
+        if b'<mesh' in body or b':mesh' in body:
+            vertices = VERTEX_RE.findall(body)
+            triangles = TRIANGLE_RE.findall(body)
+            if len(vertices) != body.count(b'vertex ') or len(triangles) != body.count(b'triangle '):
+                return None
+            objects[oid] = (
+                'mesh',
+                np.array(vertices, dtype=np.float64).reshape(-1, 3),
+                np.array(triangles, dtype=np.int64).reshape(-1, 3),
+            )
+        else:
+            components = []
+            for comp in re.findall(rb'<(?:\w+:)?component\b([^>]*)>', body):
+                ref = re.search(rb'\bobjectid="([^"]+)"', comp)
+                matrix = re.search(rb'\btransform="([^"]+)"', comp)
+                if ref:
+                    components.append((ref.group(1).decode(), _transform(matrix and matrix.group(1).decode())))
+            objects[oid] = ('components', components)
+    return objects
+
+
+def _parse_objects_xml(root):
+    objects = {}
+    for obj in root.iter(f'{CORE_NS}object'):
+        mesh = obj.find(f'{CORE_NS}mesh')
+        if mesh is not None:
+            vertices = [(v.get('x'), v.get('y'), v.get('z')) for v in mesh.iter(f'{CORE_NS}vertex')]
+            triangles = [(t.get('v1'), t.get('v2'), t.get('v3')) for t in mesh.iter(f'{CORE_NS}triangle')]
+            objects[obj.get('id')] = (
+                'mesh',
+                np.array(vertices, dtype=np.float64).reshape(-1, 3),
+                np.array(triangles, dtype=np.int64).reshape(-1, 3),
+            )
+        else:
+            components = [(c.get('objectid'), _transform(c.get('transform')))
+                          for c in obj.iter(f'{CORE_NS}component')]
+            objects[obj.get('id')] = ('components', components)
+    return objects
+
+
+def load_3mf(source):
+    """(n, 3, 3) vertex array (mm) of every build item of a 3MF package, transforms applied."""
+    try:
+        with zipfile.ZipFile(source) as archive:
+            xml = archive.read(_model_path(archive))
+    except (zipfile.BadZipFile, KeyError):
+        raise MeshError('فایل 3MF قابل خواندن نیست')
+
+    # Only the (rare) non-canonical attribute order needs a full DOM parse
+    unit = re.search(rb'<(?:\w+:)?model\b[^>]*?\bunit="([^"]+)"', xml)
+    scale = UNIT_SCALE.get(unit.group(1).decode() if unit else 'millimeter', 1.0)
+    objects = _parse_objects_fast(xml)
+    if objects is None:
+        objects = _parse_objects_xml(ElementTree.fromstring(xml))
+
+    items = []
+    for attrs in re.findall(rb'<(?:\w+:)?item\b([^>]*)>', xml):
+        ref = re.search(rb'\bobjectid="([^"]+)"', attrs)
+        matrix = re.search(rb'\btransform="([^"]+)"', attrs)
+        if ref:
+            items.append((ref.group(1).decode(), _transform(matrix and matrix.group(1).decode())))
+    if not items:
+        items = [(oid, None) for oid in objects]
+
+    parts = []
+
+    def collect(oid, matrix, depth=0):
+        obj = objects.get(oid)
+        if obj is None or depth > 16:
+            raise MeshError('ساختار 3MF نامعتبر است')
+        if obj[0] == 'mesh':
+            _, vertices, triangles = obj
+            if len(triangles):
+                if triangles.max() >= len(vertices):
+                    raise MeshError('ساختار 3MF نامعتبر است')
+                parts.append(_apply(vertices, matrix)[triangles])
+        else:
+            for child, child_matrix in obj[1]:
+                collect(child, _combine(matrix, child_matrix), depth + 1)
+
+    for oid, matrix in items:
+        collect(oid, matrix)
+    if not parts:
+        raise MeshError('مدل هیچ مثلثی ندارد')
+    triangles = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    return triangles * scale if scale != 1.0 else triangles
+
+
+# --------------------------------------------------------------------------------------
+# Entry point
+# --------------------------------------------------------------------------------------
+def analyze_mesh(source, name=None):
+    """
+    MeshStats of an STL or 3MF file, given a path or a file object (plus its
+    name for the format). Binary STL is read with np.frombuffer / memory-mapped;
+    a 2M-triangle file analyses in a fraction of a second.
+    """
+    name = (name or str(source)).lower()
+    try:
+        if name.endswith('.3mf'):
+            triangles = load_3mf(source)
+        elif name.endswith('.stl'):
+            triangles = load_stl(source)
+        else:
+            raise MeshError('فقط فایل‌های STL و 3MF پشتیبانی می‌شوند')
+        return analyze_triangles(triangles)
+    except (ValueError, ElementTree.ParseError, OSError) as e:
+        if isinstance(e, MeshError):
+            raise
+        raise MeshError('فایل مدل قابل خواندن نیست') from e
@@ -1,14 +1,60 @@
 # calculator/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
 from django.shortcuts import redirect
 from django.urls import reverse, NoReverseMatch
-from django.core.exceptions import PermissionDenied
-from .licenseing import check_license
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from .licenseing import acheck_license, check_license
+from .profiling import RequestProfile, wants_profile
+
+# JSON endpoints: no session, user or flash messages, so the middlewares
+# below step aside for them (no session lookup, no sync/async hop).
+API_PATH_PREFIX = "/api/"
+
+
+class SkipForAPIMixin:
+    def __call__(self, request):
+        if request.path_info.startswith(API_PATH_PREFIX):
+            # Under ASGI this is the next middleware's coroutine, awaited by the caller
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionExceptAPIMiddleware(SkipForAPIMixin, SessionMiddleware):
+    pass
+
+
+def __getattr__(name):
+    # AuthenticationExceptAPIMiddleware is built on first use: importing
+    # django.contrib.auth needs the auth and contenttypes apps, which the slim
+    # app profile (settings.APP_PROFILE) leaves out along with this middleware.
+    if name == "AuthenticationExceptAPIMiddleware":
+        from django.contrib.auth.middleware import AuthenticationMiddleware
+
+        cls = type(name, (SkipForAPIMixin, AuthenticationMiddleware), {"__module__": __name__})
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class MessageExceptAPIMiddleware(SkipForAPIMixin, MessageMiddleware):
+    pass
+
 
 class LicenseRequiredMiddleware:
+    # Runs natively under both WSGI and ASGI so async views don't pay a
+    # sync/async thread hop for every request.
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
-    def __call__(self, request):
+    def _is_exempt(self, request):
         path = request.path
         try:
             allow = {
@@ -20,15 +66,81 @@ class LicenseRequiredMiddleware:
             allow = set()
 
         if path.startswith("/static/") or path == "/favicon.ico":
-            return self.get_response(request)
-        if path in allow:
+            return True
+        return path in allow
+
+    def _denied(self):
+        try:
+            return redirect("license_page")
+        except NoReverseMatch:
+            return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self._is_exempt(request):
             return self.get_response(request)
 
         try:
             check_license()
         except PermissionDenied:
-            try:
-                return redirect("license_page")
-            except NoReverseMatch:
-                pass
-        return self.get_response(request)
\ No newline at end of file
+            response = self._denied()
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self._is_exempt(request):
+            return await self.get_response(request)
+
+        try:
+            await acheck_license()
+        except PermissionDenied:
+            response = self._denied()
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that ask for it (?_profile or an X-Profile header) when
+    settings.PROFILING_ENABLED is on; results go to PROFILES_DIR (see
+    calculator/profiling.py). With the setting off Django drops it from the
+    chain at startup, so it costs nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not wants_profile(request):
+            return self.get_response(request)
+        profile = RequestProfile()
+        profile.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+        response["X-Profile-Id"] = profile.save(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not wants_profile(request):
+            return await self.get_response(request)
+        profile = RequestProfile()
+        profile.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.stop()
+        response["X-Profile-Id"] = profile.save(request, response)
+        return response
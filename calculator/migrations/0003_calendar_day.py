@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import date, timedelta
+
+
+def populate_calendar(apps, schema_editor):
+    from django.conf import settings
+    from calculator.jalali import calendar_parts
+
+    CalendarDay = apps.get_model('calculator', 'CalendarDay')
+    fiscal_start = getattr(settings, 'FISCAL_YEAR_START_MONTH', 1)
+    start, end = date(1990, 1, 1), date(2060, 12, 31)
+    CalendarDay.objects.bulk_create(
+        [CalendarDay(**calendar_parts(start + timedelta(days=i), fiscal_start))
+         for i in range((end - start).days + 1)],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_local_date(apps, schema_editor):
+    # One UPDATE per constant-UTC-offset span, shifting in SQL with date(..., '+N seconds').
+    from django.db.models import CharField, F, Func, Max, Min, Value
+    from calculator.localtime import utc_offset_segments
+
+    Sale = apps.get_model('calculator', 'Sale')
+    bounds = Sale.objects.aggregate(first=Min('sale_date'), last=Max('sale_date'))
+    if bounds['first'] is None:
+        return
+    for seg_start, seg_end, offset in utc_offset_segments(bounds['first'], bounds['last'] + timedelta(seconds=1)):
+        Sale.objects.filter(sale_date__gte=seg_start, sale_date__lt=seg_end).update(
+            calendar_day=Func(F('sale_date'), Value(f'{offset:+d} seconds'), function='date', output_field=CharField())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0002_alter_sale_sale_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='sale_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='تاریخ فروش'),
+        ),
+        migrations.CreateModel(
+            name='CalendarDay',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False, verbose_name='تاریخ')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='روز هفته')),
+                ('week_start', models.DateField(verbose_name='شروع هفته')),
+                ('jalali_year', models.PositiveSmallIntegerField(verbose_name='سال')),
+                ('jalali_month', models.PositiveSmallIntegerField(verbose_name='ماه')),
+                ('jalali_day', models.PositiveSmallIntegerField(verbose_name='روز')),
+                ('jalali_quarter', models.PositiveSmallIntegerField(verbose_name='فصل')),
+                ('jalali_week', models.PositiveSmallIntegerField(verbose_name='هفته سال')),
+                ('fiscal_year', models.PositiveSmallIntegerField(verbose_name='سال مالی')),
+                ('fiscal_period', models.PositiveSmallIntegerField(verbose_name='دوره مالی')),
+            ],
+            options={
+                'verbose_name': 'روز تقویم',
+                'verbose_name_plural': 'تقویم',
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['jalali_year', 'jalali_month'], name='calendar_jalali_month_idx'), models.Index(fields=['jalali_year', 'jalali_quarter'], name='calendar_jalali_quarter_idx'), models.Index(fields=['fiscal_year', 'fiscal_period'], name='calendar_fiscal_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='calendar_day',
+            field=models.ForeignKey(db_column='local_date', db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='sales', to='calculator.calendarday', verbose_name='تاریخ محلی'),
+        ),
+        migrations.RunPython(populate_calendar, migrations.RunPython.noop),
+        migrations.RunPython(backfill_local_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0003_calendar_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='price_rounding',
+            field=models.FloatField(blank=True, null=True, verbose_name='گرد کردن قیمت'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='profit_margin',
+            field=models.FloatField(blank=True, null=True, verbose_name='درصد سود اختصاصی'),
+        ),
+    ]
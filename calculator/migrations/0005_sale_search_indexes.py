@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0004_project_pricing_policy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='customer_name',
+            field=models.CharField(blank=True, db_index=True, max_length=200, verbose_name='نام مشتری'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='customer_phone',
+            field=models.CharField(blank=True, db_index=True, max_length=20, verbose_name='شماره تماس'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='project_code',
+            field=models.PositiveIntegerField(db_index=True, verbose_name='کد مدل'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+# Round existing float amounts to whole Toman before the columns become
+# INTEGER; totals are rebuilt from the rounded parts so they stay consistent.
+ROUND_TO_TOMAN = [
+    "UPDATE calculator_filament SET cost_per_kg = ROUND(cost_per_kg)",
+    """UPDATE calculator_project SET
+        material_cost = ROUND(material_cost),
+        electricity_cost = ROUND(electricity_cost),
+        depreciation_cost = ROUND(depreciation_cost),
+        post_processing_cost = ROUND(post_processing_cost),
+        painting_cost = ROUND(painting_cost),
+        total_cost = ROUND(material_cost) + ROUND(electricity_cost) + ROUND(depreciation_cost)
+                     + ROUND(post_processing_cost) + ROUND(painting_cost),
+        selling_price = ROUND(selling_price),
+        price_rounding = ROUND(price_rounding)""",
+    """UPDATE calculator_sale SET
+        unit_price = ROUND(unit_price),
+        packaging_cost = ROUND(packaging_cost),
+        total_price = ROUND(unit_price) * quantity + ROUND(packaging_cost)""",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0005_sale_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(ROUND_TO_TOMAN, migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='filament',
+            name='cost_per_kg',
+            field=models.BigIntegerField(default=1500000, verbose_name='قیمت (تومان/کیلو)'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='depreciation_cost',
+            field=models.BigIntegerField(verbose_name='هزینه استهلاک'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='electricity_cost',
+            field=models.BigIntegerField(verbose_name='هزینه برق'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='material_cost',
+            field=models.BigIntegerField(verbose_name='هزینه مواد'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='painting_cost',
+            field=models.BigIntegerField(default=0, verbose_name='هزینه رنگ\u200cآمیزی'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='post_processing_cost',
+            field=models.BigIntegerField(default=0, verbose_name='هزینه پست\u200cپروسسینگ'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='price_rounding',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='گرد کردن قیمت'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='selling_price',
+            field=models.BigIntegerField(verbose_name='قیمت فروش'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='total_cost',
+            field=models.BigIntegerField(verbose_name='هزینه کل'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='packaging_cost',
+            field=models.BigIntegerField(default=0, verbose_name='هزینه بسته\u200cبندی'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='total_price',
+            field=models.BigIntegerField(verbose_name='قیمت کل'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='unit_price',
+            field=models.BigIntegerField(verbose_name='قیمت واحد'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0006_integer_toman'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='mesh_file',
+            field=models.FileField(blank=True, help_text='فایل STL یا 3MF (اختیاری)', null=True, upload_to='project_models/', verbose_name='فایل مدل سه\u200cبعدی'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='mesh_surface_cm2',
+            field=models.FloatField(blank=True, null=True, verbose_name='مساحت سطح مدل (سانتی\u200cمتر مربع)'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='mesh_volume_cm3',
+            field=models.FloatField(blank=True, null=True, verbose_name='حجم مدل (سانتی\u200cمتر مکعب)'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0007_project_mesh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Printer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='نام پرینتر')),
+                ('bed_x', models.FloatField(default=220, verbose_name='طول بستر (میلی\u200cمتر)')),
+                ('bed_y', models.FloatField(default=220, verbose_name='عرض بستر (میلی\u200cمتر)')),
+                ('bed_z', models.FloatField(default=250, verbose_name='ارتفاع چاپ (میلی\u200cمتر)')),
+                ('power_kw', models.FloatField(default=0.15, verbose_name='توان مصرفی (کیلووات)')),
+                ('depreciation_per_hour', models.BigIntegerField(default=500, verbose_name='استهلاک (تومان/ساعت)')),
+                ('supported_materials', models.CharField(blank=True, max_length=200, verbose_name='مواد قابل چاپ')),
+                ('is_active', models.BooleanField(default=True, verbose_name='فعال')),
+                ('created_date', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('loaded_filament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loaded_on', to='calculator.filament', verbose_name='فیلامنت نصب\u200cشده')),
+            ],
+            options={
+                'verbose_name': 'پرینتر',
+                'verbose_name_plural': 'پرینترها',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='printer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='calculator.printer', verbose_name='پرینتر'),
+        ),
+        migrations.CreateModel(
+            name='PrintJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='تعداد')),
+                ('status', models.CharField(choices=[('queued', 'در صف'), ('printing', 'در حال چاپ'), ('done', 'تمام\u200cشده')], default='queued', max_length=10, verbose_name='وضعیت')),
+                ('sequence', models.PositiveIntegerField(default=0, verbose_name='ترتیب')),
+                ('planned_start', models.DateTimeField(blank=True, null=True, verbose_name='شروع برنامه\u200cریزی\u200cشده')),
+                ('planned_end', models.DateTimeField(blank=True, null=True, verbose_name='پایان برنامه\u200cریزی\u200cشده')),
+                ('created_date', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('printer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='calculator.printer', verbose_name='پرینتر')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calculator.project', verbose_name='مدل')),
+            ],
+            options={
+                'verbose_name': 'کار چاپ',
+                'verbose_name_plural': 'صف چاپ',
+                'ordering': ['printer', 'sequence', 'created_date'],
+                'indexes': [models.Index(fields=['status', 'printer', 'sequence'], name='printjob_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0008_printer_farm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedFiscalYear',
+            fields=[
+                ('fiscal_year', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='سال مالی')),
+                ('first_date', models.DateField(verbose_name='از تاریخ')),
+                ('last_date', models.DateField(verbose_name='تا تاریخ')),
+                ('sales', models.PositiveIntegerField(verbose_name='تعداد فروش')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان بایگانی')),
+            ],
+            options={
+                'verbose_name': 'سال مالی بایگانی\u200cشده',
+                'verbose_name_plural': 'سال\u200cهای مالی بایگانی\u200cشده',
+                'ordering': ['fiscal_year'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('project_id', models.BigIntegerField(db_index=True, verbose_name='شناسه مدل')),
+                ('project_code', models.PositiveIntegerField(db_index=True, verbose_name='کد مدل')),
+                ('model_name', models.CharField(max_length=200, verbose_name='نام مدل')),
+                ('filament_id', models.BigIntegerField(null=True, verbose_name='شناسه فیلامنت')),
+                ('material', models.CharField(blank=True, max_length=50, verbose_name='جنس')),
+                ('quantity', models.PositiveIntegerField(verbose_name='تعداد')),
+                ('customer_name', models.CharField(blank=True, max_length=200, verbose_name='نام مشتری')),
+                ('customer_phone', models.CharField(blank=True, max_length=20, verbose_name='شماره تماس')),
+                ('unit_price', models.BigIntegerField(verbose_name='قیمت واحد')),
+                ('packaging_cost', models.BigIntegerField(verbose_name='هزینه بسته\u200cبندی')),
+                ('total_price', models.BigIntegerField(verbose_name='قیمت کل')),
+                ('production_cost', models.BigIntegerField(verbose_name='هزینه تولید')),
+                ('sale_date', models.DateTimeField(db_index=True, verbose_name='تاریخ فروش')),
+                ('local_date', models.DateField(db_index=True, verbose_name='تاریخ محلی')),
+                ('notes', models.TextField(blank=True, verbose_name='یادداشت')),
+            ],
+            options={
+                'verbose_name': 'فروش بایگانی\u200cشده',
+                'verbose_name_plural': 'فروش\u200cهای بایگانی\u200cشده',
+                'ordering': ['-sale_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('local_date', models.DateField(verbose_name='تاریخ محلی')),
+                ('week_start', models.DateField(verbose_name='شروع هفته')),
+                ('jalali_year', models.PositiveSmallIntegerField(verbose_name='سال')),
+                ('jalali_month', models.PositiveSmallIntegerField(verbose_name='ماه')),
+                ('jalali_day', models.PositiveSmallIntegerField(verbose_name='روز')),
+                ('jalali_quarter', models.PositiveSmallIntegerField(verbose_name='فصل')),
+                ('fiscal_year', models.PositiveSmallIntegerField(verbose_name='سال مالی')),
+                ('project_id', models.BigIntegerField(verbose_name='شناسه مدل')),
+                ('project_code', models.PositiveIntegerField(verbose_name='کد مدل')),
+                ('model_name', models.CharField(max_length=200, verbose_name='نام مدل')),
+                ('filament_id', models.BigIntegerField(null=True, verbose_name='شناسه فیلامنت')),
+                ('material', models.CharField(blank=True, max_length=50, verbose_name='جنس')),
+                ('count', models.PositiveIntegerField(verbose_name='تعداد فروش')),
+                ('quantity', models.PositiveIntegerField(verbose_name='تعداد')),
+                ('revenue', models.BigIntegerField(verbose_name='درآمد')),
+                ('packaging_cost', models.BigIntegerField(verbose_name='هزینه بسته\u200cبندی')),
+                ('production_cost', models.BigIntegerField(verbose_name='هزینه تولید')),
+                ('profit', models.BigIntegerField(verbose_name='سود')),
+            ],
+            options={
+                'verbose_name': 'خلاصه فروش بایگانی',
+                'verbose_name_plural': 'خلاصه فروش\u200cهای بایگانی',
+                'indexes': [models.Index(fields=['project_id', 'local_date'], name='salerollup_project_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='salerollup',
+            constraint=models.UniqueConstraint(fields=('local_date', 'project_id'), name='salerollup_day_project_uniq'),
+        ),
+    ]
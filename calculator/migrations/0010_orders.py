@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0009_sales_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsale',
+            name='order_id',
+            field=models.BigIntegerField(null=True, verbose_name='شناسه سفارش'),
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_name', models.CharField(blank=True, db_index=True, max_length=200, verbose_name='نام مشتری')),
+                ('customer_phone', models.CharField(blank=True, db_index=True, max_length=20, verbose_name='شماره تماس')),
+                ('packaging_cost', models.BigIntegerField(default=0, verbose_name='هزینه بسته\u200cبندی')),
+                ('notes', models.TextField(blank=True, verbose_name='یادداشت')),
+                ('order_date', models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='تاریخ سفارش')),
+                ('line_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد اقلام')),
+                ('total_quantity', models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد کل')),
+                ('subtotal', models.BigIntegerField(default=0, editable=False, verbose_name='جمع اقلام')),
+                ('production_cost', models.BigIntegerField(default=0, editable=False, verbose_name='هزینه تولید')),
+                ('total_price', models.BigIntegerField(default=0, editable=False, verbose_name='مبلغ کل')),
+                ('calendar_day', models.ForeignKey(db_column='local_date', db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='orders', to='calculator.calendarday', verbose_name='تاریخ محلی')),
+            ],
+            options={
+                'verbose_name': 'سفارش',
+                'verbose_name_plural': 'سفارش\u200cها',
+                'ordering': ['-order_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='calculator.order', verbose_name='سفارش'),
+        ),
+    ]
@@ -0,0 +1,147 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from collections import defaultdict
+
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, F, Max, Min, OuterRef, Q, Subquery, Sum
+
+# Copies of the calculator.customers helpers as they were when this migration
+# was written, so later changes to the app code cannot change the backfill
+
+# Persian and Arabic-Indic digits -> ASCII
+DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+ASCII_DIGITS = frozenset('0123456789')
+
+
+def normalize_phone(value):
+    digits = ''.join(ch for ch in str(value or '').translate(DIGITS) if ch in ASCII_DIGITS)
+    if digits.startswith('0098'):
+        digits = '0' + digits[4:]
+    elif digits.startswith('98') and len(digits) == 12:
+        digits = '0' + digits[2:]
+    elif digits.startswith('9') and len(digits) == 10:
+        digits = '0' + digits
+    return digits
+
+
+def link_sales(Sale, Customer):
+    """Give every sale with a phone its Customer, one per normalized phone; returns the customer ids."""
+    groups = defaultdict(list)
+    raw_phones = (Sale.objects.filter(customer_id__isnull=True).exclude(customer_phone='')
+                  .values_list('customer_phone', flat=True).distinct().order_by())
+    for raw in raw_phones:
+        phone = normalize_phone(raw)
+        if phone:
+            groups[phone].append(raw)
+
+    existing = Customer.objects.in_bulk(list(groups), field_name='phone')
+    linked = set()
+    for phone, raws in groups.items():
+        customer = existing.get(phone)
+        if customer is None:
+            # The most recent spelling of the name
+            name = (Sale.objects.filter(customer_phone__in=raws).exclude(customer_name='')
+                    .order_by('-sale_date').values_list('customer_name', flat=True).first())
+            customer = Customer.objects.create(phone=phone, name=name or '')
+        Sale.objects.filter(customer_id__isnull=True, customer_phone__in=raws).update(customer_id=customer.pk)
+        linked.add(customer.pk)
+    return linked
+
+
+def link_orders(Order, Sale):
+    """Orders without a customer take the customer of their lines."""
+    lines = Sale.objects.filter(order_id=OuterRef('pk'), customer_id__isnull=False)
+    Order.objects.filter(customer_id__isnull=True).exclude(customer_phone='').update(
+        customer_id=Subquery(lines.values('customer_id')[:1])
+    )
+
+
+def recount_customers(ids, Customer, Sale, batch_size=500):
+    """Store the purchase totals of customers `ids` from their sales."""
+    profit = ExpressionWrapper((F('unit_price') - F('project__total_cost')) * F('quantity'),
+                               output_field=BigIntegerField())
+    ids = sorted(ids)
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        rows = Sale.objects.filter(customer_id__in=chunk).values('customer_id').annotate(
+            loose=Count('id', filter=Q(order_id__isnull=True)),
+            orders=Count('order_id', distinct=True),
+            revenue=Sum('total_price'),
+            profit=Sum(profit),
+            first=Min('sale_date'),
+            last=Max('sale_date'),
+        ).order_by()
+        totals = {row['customer_id']: row for row in rows}
+
+        customers = list(Customer.objects.filter(pk__in=chunk))
+        for customer in customers:
+            t = totals.get(customer.pk, {})
+            customer.order_count = t.get('loose', 0) + t.get('orders', 0)
+            customer.revenue = t.get('revenue') or 0
+            customer.profit = t.get('profit') or 0
+            customer.first_purchase = t.get('first')
+            customer.last_purchase = t.get('last')
+        Customer.objects.bulk_update(
+            customers, ['order_count', 'revenue', 'profit', 'first_purchase', 'last_purchase']
+        )
+
+
+def backfill_customers(apps, schema_editor):
+    """One Customer per normalized phone in the existing sales, with its totals.
+
+    Archived sales live in another database; manage.py rebuild_customers
+    links and counts those too.
+    """
+    Customer = apps.get_model('calculator', 'Customer')
+    Order = apps.get_model('calculator', 'Order')
+    Sale = apps.get_model('calculator', 'Sale')
+    ids = link_sales(Sale, Customer)
+    link_orders(Order, Sale)
+    recount_customers(ids, Customer, Sale)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0010_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsale',
+            name='customer_id',
+            field=models.BigIntegerField(db_index=True, null=True, verbose_name='شناسه مشتری'),
+        ),
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(max_length=20, unique=True, verbose_name='شماره تماس')),
+                ('name', models.CharField(blank=True, db_index=True, max_length=200, verbose_name='نام')),
+                ('order_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد خرید')),
+                ('revenue', models.BigIntegerField(default=0, editable=False, verbose_name='مجموع خرید')),
+                ('profit', models.BigIntegerField(default=0, editable=False, verbose_name='سود')),
+                ('first_purchase', models.DateTimeField(editable=False, null=True, verbose_name='اولین خرید')),
+                ('last_purchase', models.DateTimeField(editable=False, null=True, verbose_name='آخرین خرید')),
+            ],
+            options={
+                'verbose_name': 'مشتری',
+                'verbose_name_plural': 'مشتریان',
+                'ordering': ['-revenue'],
+                'indexes': [models.Index(fields=['-revenue'], name='customer_revenue_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='calculator.customer', verbose_name='مشتری'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='customer',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='calculator.customer', verbose_name='مشتری'),
+        ),
+        migrations.RunPython(backfill_customers, migrations.RunPython.noop),
+    ]
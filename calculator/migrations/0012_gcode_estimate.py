@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0011_customers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printer',
+            name='acceleration',
+            field=models.FloatField(default=1000, verbose_name='شتاب چاپ (میلی\u200cمتر/ثانیه²)'),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='junction_deviation',
+            field=models.FloatField(default=0.013, verbose_name='انحراف گوشه (میلی\u200cمتر)'),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='max_speed_e',
+            field=models.FloatField(default=120, verbose_name='حداکثر سرعت اکسترودر (میلی\u200cمتر/ثانیه)'),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='max_speed_x',
+            field=models.FloatField(default=200, verbose_name='حداکثر سرعت X (میلی\u200cمتر/ثانیه)'),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='max_speed_y',
+            field=models.FloatField(default=200, verbose_name='حداکثر سرعت Y (میلی\u200cمتر/ثانیه)'),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='max_speed_z',
+            field=models.FloatField(default=12, verbose_name='حداکثر سرعت Z (میلی\u200cمتر/ثانیه)'),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='travel_acceleration',
+            field=models.FloatField(default=1000, verbose_name='شتاب جابجایی (میلی\u200cمتر/ثانیه²)'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='gcode_file',
+            field=models.FileField(blank=True, help_text='خروجی اسلایسر (اختیاری)', null=True, upload_to='project_gcode/', verbose_name='فایل G-code'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='gcode_print_hours',
+            field=models.FloatField(blank=True, null=True, verbose_name='زمان پرینت از G-code (ساعت)'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:17
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0012_gcode_estimate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='filament',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='filament_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filament',
+            index=models.Index(django.db.models.functions.text.Lower('color'), name='filament_color_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(django.db.models.functions.text.Lower('model_name'), name='project_model_name_lower_idx'),
+        ),
+    ]
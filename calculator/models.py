@@ -1,13 +1,84 @@
 # models.py
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Coalesce, Greatest, Least, Lower
 from django.urls import reverse
-from PIL import Image
+from django.utils import timezone
 import math
 import os
 
+from .money import allocate, round_to_step, toman, with_margin
 
-class Filament(models.Model):
+
+class TrackedFieldsMixin:
+    """
+    Remembers the column values a row was loaded (or last saved) with, so
+    save() can tell what changed: derived fields are recomputed only when
+    their inputs moved, and an existing row is written with an UPDATE of the
+    changed columns only (update_fields). Put it before models.Model.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def _tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(value, FieldFile):
+            # A fresh upload is a change even under the stored file's name
+            return value.name if value._committed else object()
+        return value
+
+    def _snapshot_fields(self, fields=None):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or fields is None:
+            loaded = self._loaded_values = {}
+        for f in self._meta.concrete_fields:
+            # Deferred fields are not loaded; reading them here would query
+            if f.attname in self.__dict__ and (fields is None or f.attname in fields or f.name in fields):
+                loaded[f.attname] = self._tracked_value(f)
+
+    def changed_fields(self):
+        """Attnames changed since the row was loaded; None for a row never loaded or saved."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or self._state.adding:
+            return None
+        return {
+            f.attname for f in self._meta.concrete_fields
+            if not f.primary_key and f.attname in self.__dict__
+            and (f.attname not in loaded or self._tracked_value(f) != loaded[f.attname])
+        }
+
+    def has_changed(self, *names):
+        """True when any of the fields `names` changed (always for a new row)."""
+        changed = self.changed_fields()
+        return changed is None or any(self._meta.get_field(n).attname in changed for n in names)
+
+    def loaded_value(self, name):
+        """The value field `name` was loaded with; read from the database when not in the snapshot."""
+        attname = self._meta.get_field(name).attname
+        loaded = getattr(self, '_loaded_values', None) or {}
+        if attname in loaded and not self._state.adding:
+            return loaded[attname]
+        return type(self)._base_manager.filter(pk=self.pk).values_list(attname, flat=True).first()
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        if update_fields is None and not force_insert and using in (None, self._state.db):
+            # None (a new row) keeps the full INSERT; an empty set writes nothing
+            update_fields = self.changed_fields()
+        super().save(force_insert=force_insert, force_update=force_update, using=using,
+                     update_fields=update_fields)
+        self._snapshot_fields()
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot_fields(fields)
+
+
+class Filament(TrackedFieldsMixin, models.Model):
     MATERIAL_CHOICES = [
         ('PLA', 'PLA - پلی لاکتیک اسید'),
         ('PLA+', 'PLA+ - پلی لاکتیک اسید بهبود یافته'),
@@ -24,13 +95,18 @@ class Filament(models.Model):
     material = models.CharField(max_length=20, choices=MATERIAL_CHOICES, default='PLA+', verbose_name='نوع ماده')
     initial_amount = models.FloatField(verbose_name='مقدار اولیه (متر)')
     remaining_amount = models.FloatField(verbose_name='مقدار باقی‌مانده (متر)')
-    cost_per_kg = models.FloatField(default=1500000, verbose_name='قیمت (تومان/کیلو)')
+    cost_per_kg = models.BigIntegerField(default=1500000, verbose_name='قیمت (تومان/کیلو)')
     created_date = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
     
     class Meta:
         verbose_name = 'فیلامنت'
         verbose_name_plural = 'فیلامنت‌ها'
         ordering = ['-created_date']
+        # LOWER() so admin prefix searches are case-insensitive for Latin names
+        indexes = [
+            models.Index(Lower('name'), name='filament_name_lower_idx'),
+            models.Index(Lower('color'), name='filament_color_lower_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.color}"
@@ -38,6 +114,12 @@ class Filament(models.Model):
     def get_absolute_url(self):
         return reverse('calculator:view_filament', kwargs={'pk': self.pk})
     
+    def save(self, *args, **kwargs):
+        repriced = not self._state.adding and self.has_changed('cost_per_kg')
+        super().save(*args, **kwargs)
+        if repriced:
+            Project.queue_cost_recalculation('filament', self.pk)
+    
     @property
     def usage_percentage(self):
         if self.initial_amount > 0:
@@ -46,11 +128,75 @@ class Filament(models.Model):
     
     @property
     def remaining_value(self):
-        return (self.remaining_amount * self.cost_per_kg / 330)
+        return toman(self.remaining_amount * self.cost_per_kg / 330)
+
+
+class Printer(TrackedFieldsMixin, models.Model):
+    name = models.CharField(max_length=100, unique=True, verbose_name='نام پرینتر')
+    bed_x = models.FloatField(default=220, verbose_name='طول بستر (میلی‌متر)')
+    bed_y = models.FloatField(default=220, verbose_name='عرض بستر (میلی‌متر)')
+    bed_z = models.FloatField(default=250, verbose_name='ارتفاع چاپ (میلی‌متر)')
+    power_kw = models.FloatField(default=0.15, verbose_name='توان مصرفی (کیلووات)')
+    depreciation_per_hour = models.BigIntegerField(default=500, verbose_name='استهلاک (تومان/ساعت)')
+    # Comma-separated Filament.material codes; empty = every material
+    supported_materials = models.CharField(max_length=200, blank=True, verbose_name='مواد قابل چاپ')
+    loaded_filament = models.ForeignKey(
+        Filament, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='loaded_on', verbose_name='فیلامنت نصب‌شده'
+    )
+    # Firmware motion limits for G-code print-time estimates (calculator/gcode.py)
+    max_speed_x = models.FloatField(default=200, verbose_name='حداکثر سرعت X (میلی‌متر/ثانیه)')
+    max_speed_y = models.FloatField(default=200, verbose_name='حداکثر سرعت Y (میلی‌متر/ثانیه)')
+    max_speed_z = models.FloatField(default=12, verbose_name='حداکثر سرعت Z (میلی‌متر/ثانیه)')
+    max_speed_e = models.FloatField(default=120, verbose_name='حداکثر سرعت اکسترودر (میلی‌متر/ثانیه)')
+    acceleration = models.FloatField(default=1000, verbose_name='شتاب چاپ (میلی‌متر/ثانیه²)')
+    travel_acceleration = models.FloatField(default=1000, verbose_name='شتاب جابجایی (میلی‌متر/ثانیه²)')
+    junction_deviation = models.FloatField(default=0.013, verbose_name='انحراف گوشه (میلی‌متر)')
+    is_active = models.BooleanField(default=True, verbose_name='فعال')
+    created_date = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
+
+    class Meta:
+        verbose_name = 'پرینتر'
+        verbose_name_plural = 'پرینترها'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        repriced = not self._state.adding and self.has_changed('power_kw', 'depreciation_per_hour')
+        super().save(*args, **kwargs)
+        if repriced:
+            Project.queue_cost_recalculation('printer', self.pk)
+
+    @property
+    def materials(self):
+        return [m for m in self.supported_materials.split(',') if m]
+
+    def supports(self, material):
+        return not self.supported_materials or material in self.materials
+
+    def fits(self, project):
+        """Whether the project's bounding box fits this bed (either way round on X/Y)."""
+        if project.size_z > self.bed_z:
+            return False
+        return ((project.size_x <= self.bed_x and project.size_y <= self.bed_y) or
+                (project.size_y <= self.bed_x and project.size_x <= self.bed_y))
 
+    def can_print(self, project):
+        return self.fits(project) and self.supports(project.filament.material)
 
-class Project(models.Model):
+    def motion_profile(self):
+        from .gcode import MotionProfile
+
+        return MotionProfile(self.max_speed_x, self.max_speed_y, self.max_speed_z, self.max_speed_e,
+                             self.acceleration, self.travel_acceleration, self.junction_deviation)
+
+
+class Project(TrackedFieldsMixin, models.Model):
     filament = models.ForeignKey(Filament, on_delete=models.CASCADE, verbose_name='فیلامنت')
+    # Printer whose power draw / depreciation the costs use; empty = global defaults
+    printer = models.ForeignKey(Printer, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='پرینتر')
     model_name = models.CharField(max_length=200, verbose_name='نام مدل')
     code = models.PositiveIntegerField(unique=True, verbose_name='کد مدل')
     picture = models.ImageField(
@@ -65,25 +211,63 @@ class Project(models.Model):
     size_x = models.FloatField(verbose_name='ابعاد X (میلی‌متر)')
     size_y = models.FloatField(verbose_name='ابعاد Y (میلی‌متر)')
     size_z = models.FloatField(verbose_name='ابعاد Z (میلی‌متر)')
+    # Optional STL/3MF; its measured volume/area replace the bounding-box estimates
+    mesh_file = models.FileField(
+        upload_to='project_models/',
+        blank=True,
+        null=True,
+        verbose_name='فایل مدل سه‌بعدی',
+        help_text='فایل STL یا 3MF (اختیاری)'
+    )
+    mesh_volume_cm3 = models.FloatField(null=True, blank=True, verbose_name='حجم مدل (سانتی‌متر مکعب)')
+    mesh_surface_cm2 = models.FloatField(null=True, blank=True, verbose_name='مساحت سطح مدل (سانتی‌متر مربع)')
+    # Optional G-code; its simulated print time replaces print_time_hours
+    gcode_file = models.FileField(
+        upload_to='project_gcode/',
+        blank=True,
+        null=True,
+        verbose_name='فایل G-code',
+        help_text='خروجی اسلایسر (اختیاری)'
+    )
+    gcode_print_hours = models.FloatField(null=True, blank=True, verbose_name='زمان پرینت از G-code (ساعت)')
     filament_weight_used = models.FloatField(verbose_name='وزن فیلامنت (گرم)')
-    electricity_cost = models.FloatField(verbose_name='هزینه برق')
-    depreciation_cost = models.FloatField(verbose_name='هزینه استهلاک')
+    # Money fields are whole Toman (see calculator/money.py)
+    electricity_cost = models.BigIntegerField(verbose_name='هزینه برق')
+    depreciation_cost = models.BigIntegerField(verbose_name='هزینه استهلاک')
     
     # Optional services
     post_processing_enabled = models.BooleanField(default=False, verbose_name='پست‌پروسسینگ')
-    post_processing_cost = models.FloatField(default=0, verbose_name='هزینه پست‌پروسسینگ')
+    post_processing_cost = models.BigIntegerField(default=0, verbose_name='هزینه پست‌پروسسینگ')
     painting_enabled = models.BooleanField(default=False, verbose_name='رنگ‌آمیزی')
-    painting_cost = models.FloatField(default=0, verbose_name='هزینه رنگ‌آمیزی')
+    painting_cost = models.BigIntegerField(default=0, verbose_name='هزینه رنگ‌آمیزی')
     
-    material_cost = models.FloatField(verbose_name='هزینه مواد')
-    total_cost = models.FloatField(verbose_name='هزینه کل')
-    selling_price = models.FloatField(verbose_name='قیمت فروش')
+    material_cost = models.BigIntegerField(verbose_name='هزینه مواد')
+    total_cost = models.BigIntegerField(verbose_name='هزینه کل')
+    selling_price = models.BigIntegerField(verbose_name='قیمت فروش')
+    # Per-model pricing policy (set by the repricing tool); empty = global defaults
+    profit_margin = models.FloatField(null=True, blank=True, verbose_name='درصد سود اختصاصی')
+    price_rounding = models.BigIntegerField(null=True, blank=True, verbose_name='گرد کردن قیمت')
     created_date = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
     
+    # Fields calculate_costs() reads from the row itself. It also reads the
+    # filament's price and the printer's power and depreciation; changing
+    # those recalculates the projects using them (queue_cost_recalculation).
+    COST_INPUTS = (
+        'filament', 'printer', 'filament_used_mm', 'print_time_hours', 'size_x', 'size_y', 'size_z',
+        'mesh_volume_cm3', 'gcode_file', 'gcode_print_hours', 'post_processing_enabled', 'painting_enabled',
+        'profit_margin', 'price_rounding',
+    )
+    # Fields calculate_costs() writes
+    COST_OUTPUTS = (
+        'filament_weight_used', 'print_time_hours', 'material_cost', 'electricity_cost', 'depreciation_cost',
+        'post_processing_cost', 'painting_cost', 'total_cost', 'selling_price',
+    )
+    
     class Meta:
         verbose_name = 'مدل'
         verbose_name_plural = 'مدل‌ها'
         ordering = ['-created_date']
+        indexes = [models.Index(Lower('model_name'), name='project_model_name_lower_idx')]
     
     def __str__(self):
         return f"{self.code} - {self.model_name}"
@@ -93,37 +277,43 @@ class Project(models.Model):
             last_project = Project.objects.order_by('-code').first()
             self.code = (last_project.code + 1) if last_project else 1
         
-        # Calculate costs
-        self.calculate_costs()
+        # Costs only move with their inputs; renaming a model leaves them be
+        if self.has_changed(*self.COST_INPUTS):
+            self.calculate_costs()
+        picture_changed = self.has_changed('picture')
         super().save(*args, **kwargs)
         
-        # Resize image after saving
-        if self.picture:
-            self.resize_image()
+        # Resize a new image in the background once the row is committed
+        if picture_changed and self.picture:
+            from .jobqueue import enqueue
+            transaction.on_commit(lambda: enqueue('resize_project_image', self.pk))
     
     def resize_image(self):
-        """Resize uploaded image to optimize storage"""
+        """
+        Resize uploaded image to optimize storage. Runs as a background job
+        (calculator.tasks), so errors propagate: the queue retries the job
+        and shows it as failed.
+        """
         if self.picture:
-            try:
-                img = Image.open(self.picture.path)
-                
-                # Convert to RGB if necessary
-                if img.mode in ("RGBA", "P"):
-                    img = img.convert("RGB")
-                
-                # Resize if too large
-                max_size = (800, 600)
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                    img.save(self.picture.path, optimize=True, quality=85)
-            except Exception as e:
-                print(f"Error resizing image: {e}")
+            # Pillow is only needed here; keep it off the startup import path
+            from PIL import Image
+            img = Image.open(self.picture.path)
+            
+            # Convert to RGB if necessary
+            if img.mode in ("RGBA", "P"):
+                img = img.convert("RGB")
+            
+            # Resize if too large
+            max_size = (800, 600)
+            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
+                img.thumbnail(max_size, Image.Resampling.LANCZOS)
+                img.save(self.picture.path, optimize=True, quality=85)
     
     def delete(self, *args, **kwargs):
-        # Delete image file when project is deleted
-        if self.picture:
-            if os.path.isfile(self.picture.path):
-                os.remove(self.picture.path)
+        # Delete image / mesh / G-code files when project is deleted
+        for f in (self.picture, self.mesh_file, self.gcode_file):
+            if f and os.path.isfile(f.path):
+                os.remove(f.path)
         super().delete(*args, **kwargs)
     
     @property
@@ -139,27 +329,40 @@ class Project(models.Model):
         volume_cm3 = volume_mm3 / 1000
         self.filament_weight_used = volume_cm3 * settings.DEFAULT_SETTINGS['filament_density']
         
-        # Calculate basic costs
+        # The simulated time of an attached G-code is authoritative
+        if self.gcode_file and self.gcode_print_hours is not None:
+            self.print_time_hours = self.gcode_print_hours
+        
+        # Calculate basic costs (each rounded to whole Toman)
         price_per_gram = self.filament.cost_per_kg / 1000
-        self.material_cost = self.filament_weight_used * price_per_gram
-        self.electricity_cost = (self.print_time_hours * 
-                               settings.DEFAULT_SETTINGS['electricity_cost_per_kwh'] * 
-                               settings.DEFAULT_SETTINGS['printer_power'])
-        self.depreciation_cost = (self.print_time_hours * 
-                                settings.DEFAULT_SETTINGS['printer_depreciation_per_hour'])
+        self.material_cost = toman(self.filament_weight_used * price_per_gram)
+        if self.printer_id:
+            power = self.printer.power_kw
+            depreciation_per_hour = self.printer.depreciation_per_hour
+        else:
+            power = settings.DEFAULT_SETTINGS['printer_power']
+            depreciation_per_hour = settings.DEFAULT_SETTINGS['printer_depreciation_per_hour']
+        self.electricity_cost = toman(self.print_time_hours *
+                                      settings.DEFAULT_SETTINGS['electricity_cost_per_kwh'] *
+                                      power)
+        self.depreciation_cost = toman(self.print_time_hours * depreciation_per_hour)
         
-        # Calculate volume for painting
-        volume_cm3 = (self.size_x/10) * (self.size_y/10) * (self.size_z/10)
+        # Calculate volume for painting: the mesh's true volume when one was
+        # analysed, otherwise the bounding box
+        if self.mesh_volume_cm3 is not None:
+            volume_cm3 = self.mesh_volume_cm3
+        else:
+            volume_cm3 = (self.size_x/10) * (self.size_y/10) * (self.size_z/10)
         
         # Optional post-processing cost
         if self.post_processing_enabled:
-            self.post_processing_cost = settings.DEFAULT_SETTINGS['post_processing_base_cost']
+            self.post_processing_cost = toman(settings.DEFAULT_SETTINGS['post_processing_base_cost'])
         else:
             self.post_processing_cost = 0
         
         # Optional painting cost
         if self.painting_enabled:
-            self.painting_cost = volume_cm3 * settings.DEFAULT_SETTINGS['painting_cost_per_cm3']
+            self.painting_cost = toman(volume_cm3 * settings.DEFAULT_SETTINGS['painting_cost_per_cm3'])
         else:
             self.painting_cost = 0
         
@@ -169,25 +372,300 @@ class Project(models.Model):
                           self.painting_cost)
         
         # Selling price
-        self.selling_price = self.total_cost * (1 + settings.DEFAULT_SETTINGS['profit_margin'] / 100)
+        self.selling_price = self.policy_price(self.total_cost, self.profit_margin, self.price_rounding)
+
+    @classmethod
+    def recalculate_costs(cls, queryset):
+        """Rerun calculate_costs() for the projects in `queryset` and store the results in bulk."""
+        projects = list(queryset.select_related('filament', 'printer'))
+        for project in projects:
+            project.calculate_costs()
+        with transaction.atomic():
+            cls.objects.bulk_update(projects, cls.COST_OUTPUTS, batch_size=500)
+        return len(projects)
+
+    @staticmethod
+    def queue_cost_recalculation(relation, pk):
+        """After the commit, queue recalculate_costs() for the projects of a filament or printer."""
+        from .jobqueue import enqueue
+        transaction.on_commit(lambda: enqueue('recalculate_project_costs', relation, pk))
+
+    @staticmethod
+    def policy_price(total_cost, profit_margin=None, price_rounding=None):
+        from django.conf import settings
+
+        if profit_margin is None:
+            profit_margin = settings.DEFAULT_SETTINGS['profit_margin']
+        return round_to_step(with_margin(total_cost, profit_margin), price_rounding)
+
+    @staticmethod
+    def policy_price_expression(total_cost=models.F('total_cost')):
+        """policy_price() as an SQL expression, for set-based repricing with QuerySet.update()."""
+        from django.conf import settings
+        from django.db.models.functions import Cast, Coalesce, Floor
+
+        margin = Coalesce('profit_margin', models.Value(float(settings.DEFAULT_SETTINGS['profit_margin'])))
+        price = Floor(total_cost * (margin / 100.0 + 1) + 0.5, output_field=models.FloatField())
+        step = models.F('price_rounding')
+        rounded = models.Case(
+            models.When(price_rounding__gt=0, then=Floor(price / step + 0.5) * step),
+            default=price,
+            output_field=models.FloatField(),
+        )
+        return Cast(rounded, models.BigIntegerField())
     
     @property
     def profit(self):
         return self.selling_price - self.total_cost
 
 
-# models.py - Update the Sale model
+class PrintJob(models.Model):
+    """A queued print of `quantity` copies of a project; placed on a printer by calculator/scheduler.py."""
+    STATUS_QUEUED = 'queued'
+    STATUS_PRINTING = 'printing'
+    STATUS_DONE = 'done'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'در صف'),
+        (STATUS_PRINTING, 'در حال چاپ'),
+        (STATUS_DONE, 'تمام‌شده'),
+    ]
 
-class Sale(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, verbose_name='مدل')
-    project_code = models.PositiveIntegerField(verbose_name='کد مدل')
     quantity = models.PositiveIntegerField(default=1, verbose_name='تعداد')
-    customer_name = models.CharField(max_length=200, blank=True, verbose_name='نام مشتری')
-    customer_phone = models.CharField(max_length=20, blank=True, verbose_name='شماره تماس')
-    unit_price = models.FloatField(verbose_name='قیمت واحد')
-    packaging_cost = models.FloatField(default=0, verbose_name='هزینه بسته‌بندی')
-    total_price = models.FloatField(verbose_name='قیمت کل')
-    sale_date = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ فروش')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, verbose_name='وضعیت')
+    printer = models.ForeignKey(
+        Printer, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='jobs', verbose_name='پرینتر'
+    )
+    sequence = models.PositiveIntegerField(default=0, verbose_name='ترتیب')
+    planned_start = models.DateTimeField(null=True, blank=True, verbose_name='شروع برنامه‌ریزی‌شده')
+    planned_end = models.DateTimeField(null=True, blank=True, verbose_name='پایان برنامه‌ریزی‌شده')
+    created_date = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
+
+    class Meta:
+        verbose_name = 'کار چاپ'
+        verbose_name_plural = 'صف چاپ'
+        ordering = ['printer', 'sequence', 'created_date']
+        indexes = [models.Index(fields=['status', 'printer', 'sequence'], name='printjob_queue_idx')]
+
+    def __str__(self):
+        return f"{self.project.code} × {self.quantity}"
+
+    @property
+    def duration_hours(self):
+        return self.project.print_time_hours * self.quantity
+
+
+class CalendarDay(models.Model):
+    """Date dimension: one row per local date with its Jalali calendar and fiscal parts."""
+    date = models.DateField(primary_key=True, verbose_name='تاریخ')
+    weekday = models.PositiveSmallIntegerField(verbose_name='روز هفته')  # 0 = شنبه
+    week_start = models.DateField(verbose_name='شروع هفته')
+    jalali_year = models.PositiveSmallIntegerField(verbose_name='سال')
+    jalali_month = models.PositiveSmallIntegerField(verbose_name='ماه')
+    jalali_day = models.PositiveSmallIntegerField(verbose_name='روز')
+    jalali_quarter = models.PositiveSmallIntegerField(verbose_name='فصل')
+    jalali_week = models.PositiveSmallIntegerField(verbose_name='هفته سال')
+    fiscal_year = models.PositiveSmallIntegerField(verbose_name='سال مالی')
+    fiscal_period = models.PositiveSmallIntegerField(verbose_name='دوره مالی')
+
+    class Meta:
+        verbose_name = 'روز تقویم'
+        verbose_name_plural = 'تقویم'
+        ordering = ['date']
+        indexes = [
+            models.Index(fields=['jalali_year', 'jalali_month'], name='calendar_jalali_month_idx'),
+            models.Index(fields=['jalali_year', 'jalali_quarter'], name='calendar_jalali_quarter_idx'),
+            models.Index(fields=['fiscal_year', 'fiscal_period'], name='calendar_fiscal_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.jalali_year}/{self.jalali_month:02d}/{self.jalali_day:02d}"
+
+    @classmethod
+    def build(cls, start, end):
+        """Insert missing rows for start..end (inclusive); returns the number of days covered."""
+        from django.conf import settings
+        from datetime import timedelta
+        from .jalali import calendar_parts
+
+        fiscal_start = getattr(settings, 'FISCAL_YEAR_START_MONTH', 1)
+        days = (end - start).days + 1
+        cls.objects.bulk_create(
+            [cls(**calendar_parts(start + timedelta(days=i), fiscal_start)) for i in range(days)],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+        return days
+
+
+class Customer(models.Model):
+    """
+    A customer, keyed by the normalized phone number (calculator/customers.py).
+    The purchase totals are stored so the top-customers list and the lookup at
+    the sales counter are index reads; archived sales stay counted.
+    """
+    phone = models.CharField(max_length=20, unique=True, verbose_name='شماره تماس')
+    name = models.CharField(max_length=200, blank=True, db_index=True, verbose_name='نام')
+    # A multi-line order counts as one order
+    order_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد خرید')
+    # Whole Toman
+    revenue = models.BigIntegerField(default=0, editable=False, verbose_name='مجموع خرید')
+    profit = models.BigIntegerField(default=0, editable=False, verbose_name='سود')
+    first_purchase = models.DateTimeField(null=True, editable=False, verbose_name='اولین خرید')
+    last_purchase = models.DateTimeField(null=True, editable=False, verbose_name='آخرین خرید')
+
+    class Meta:
+        verbose_name = 'مشتری'
+        verbose_name_plural = 'مشتریان'
+        ordering = ['-revenue']
+        indexes = [models.Index(fields=['-revenue'], name='customer_revenue_idx')]
+
+    def __str__(self):
+        return f"{self.name or 'ناشناس'} - {self.phone}"
+
+    def save(self, *args, **kwargs):
+        from .customers import normalize_phone
+
+        self.phone = normalize_phone(self.phone)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def for_contact(cls, phone, name=''):
+        """The customer of a phone number, created on first use; the latest non-empty name wins."""
+        from .customers import normalize_phone
+
+        phone = normalize_phone(phone)
+        if not phone:
+            return None
+        customer, created = cls.objects.get_or_create(phone=phone, defaults={'name': name or ''})
+        if name and not created and customer.name != name:
+            cls.objects.filter(pk=customer.pk).update(name=name)
+            customer.name = name
+        return customer
+
+    @classmethod
+    def add_purchase(cls, pk, orders, revenue, profit, when):
+        """Add one purchase to the stored totals in a single UPDATE."""
+        when = models.Value(when, output_field=models.DateTimeField())
+        cls.objects.filter(pk=pk).update(
+            order_count=models.F('order_count') + orders,
+            revenue=models.F('revenue') + revenue,
+            profit=models.F('profit') + profit,
+            first_purchase=Coalesce(Least('first_purchase', when), when),
+            last_purchase=Coalesce(Greatest('last_purchase', when), when),
+        )
+
+
+class Order(models.Model):
+    """
+    A multi-line sale. Its lines are Sale rows (Sale.order), so every report
+    keeps working off Sale; the order's packaging is split over its lines and
+    the order totals are stored when it is placed.
+    """
+    customer = models.ForeignKey(
+        Customer, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='orders', verbose_name='مشتری'
+    )
+    customer_name = models.CharField(max_length=200, blank=True, db_index=True, verbose_name='نام مشتری')
+    customer_phone = models.CharField(max_length=20, blank=True, db_index=True, verbose_name='شماره تماس')
+    # Whole Toman
+    packaging_cost = models.BigIntegerField(default=0, verbose_name='هزینه بسته‌بندی')
+    notes = models.TextField(blank=True, verbose_name='یادداشت')
+    order_date = models.DateTimeField(default=timezone.now, editable=False, db_index=True, verbose_name='تاریخ سفارش')
+    calendar_day = models.ForeignKey(
+        CalendarDay, on_delete=models.DO_NOTHING, db_constraint=False, db_column='local_date',
+        null=True, editable=False, related_name='orders', verbose_name='تاریخ محلی'
+    )
+    # Stored totals, written with the lines
+    line_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد اقلام')
+    total_quantity = models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد کل')
+    subtotal = models.BigIntegerField(default=0, editable=False, verbose_name='جمع اقلام')
+    production_cost = models.BigIntegerField(default=0, editable=False, verbose_name='هزینه تولید')
+    total_price = models.BigIntegerField(default=0, editable=False, verbose_name='مبلغ کل')
+
+    class Meta:
+        verbose_name = 'سفارش'
+        verbose_name_plural = 'سفارش‌ها'
+        ordering = ['-order_date']
+
+    def __str__(self):
+        return f"سفارش {self.pk} - {self.customer_name or 'ناشناس'} - {self.line_count} قلم"
+
+    def get_absolute_url(self):
+        return reverse('calculator:order_detail', kwargs={'pk': self.pk})
+
+    @property
+    def profit(self):
+        # Packaging is a pass-through cost, as in Sale.total_profit
+        return self.subtotal - self.production_cost
+
+    @classmethod
+    def place(cls, lines, **fields):
+        """
+        Create an order from (project, quantity, unit_price) lines in one
+        transaction: one INSERT for the order and one bulk INSERT for its
+        Sale lines. bulk_create skips Sale.save() and post_save, so the
+        lines get their computed fields here and the Sale cache generation
+        is bumped by hand.
+        """
+        from .cache import bump_generation
+
+        order = cls(**fields)
+        order.packaging_cost = toman(order.packaging_cost)
+        order.calendar_day_id = timezone.localdate(order.order_date)
+        sales = [
+            Sale(order=order, project=project, quantity=quantity, unit_price=toman(unit_price),
+                 customer_name=order.customer_name, customer_phone=order.customer_phone,
+                 sale_date=order.order_date)
+            for project, quantity, unit_price in lines
+        ]
+        shares = allocate(order.packaging_cost, [s.unit_price * s.quantity for s in sales])
+        for sale, share in zip(sales, shares):
+            sale.packaging_cost = share
+            sale.compute_totals()
+
+        order.line_count = len(sales)
+        order.total_quantity = sum(s.quantity for s in sales)
+        order.subtotal = sum(s.unit_price * s.quantity for s in sales)
+        order.production_cost = sum(s.project.total_cost * s.quantity for s in sales)
+        order.total_price = order.subtotal + order.packaging_cost
+        with transaction.atomic():
+            order.customer = Customer.for_contact(order.customer_phone, order.customer_name)
+            order.save()
+            for sale in sales:
+                sale.customer = order.customer
+            Sale.objects.bulk_create(sales, batch_size=500)
+            if order.customer:
+                Customer.add_purchase(order.customer.pk, 1, order.total_price, order.profit, order.order_date)
+        bump_generation(Sale)
+        return order
+
+
+class Sale(TrackedFieldsMixin, models.Model):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, verbose_name='مدل')
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, null=True, blank=True, related_name='lines', verbose_name='سفارش'
+    )
+    customer = models.ForeignKey(
+        Customer, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='sales', verbose_name='مشتری'
+    )
+    project_code = models.PositiveIntegerField(db_index=True, verbose_name='کد مدل')
+    quantity = models.PositiveIntegerField(default=1, verbose_name='تعداد')
+    customer_name = models.CharField(max_length=200, blank=True, db_index=True, verbose_name='نام مشتری')
+    customer_phone = models.CharField(max_length=20, blank=True, db_index=True, verbose_name='شماره تماس')
+    # Whole Toman
+    unit_price = models.BigIntegerField(verbose_name='قیمت واحد')
+    packaging_cost = models.BigIntegerField(default=0, verbose_name='هزینه بسته‌بندی')
+    total_price = models.BigIntegerField(verbose_name='قیمت کل')
+    sale_date = models.DateTimeField(default=timezone.now, editable=False, db_index=True, verbose_name='تاریخ فروش')
+    # Local (TIME_ZONE) date of sale_date, stored so reports can join the calendar
+    # dimension and group by Jalali periods in SQL.
+    calendar_day = models.ForeignKey(
+        CalendarDay, on_delete=models.DO_NOTHING, db_constraint=False, db_column='local_date',
+        null=True, editable=False, related_name='sales', verbose_name='تاریخ محلی'
+    )
     notes = models.TextField(blank=True, verbose_name='یادداشت')
     
     class Meta:
@@ -198,13 +676,37 @@ class Sale(models.Model):
     def __str__(self):
         return f"فروش {self.project_code} - {self.customer_name or 'ناشناس'} - {self.quantity} عدد"
     
-    def save(self, *args, **kwargs):
-        if self.project:
+    # Fields the customer's stored purchase totals depend on
+    CUSTOMER_TOTALS = ('customer', 'order', 'project', 'quantity', 'unit_price', 'total_price', 'sale_date')
+
+    def compute_totals(self):
+        """Fields derived on save (also called for bulk-created order lines)."""
+        if self.project_id and self.has_changed('project'):
             self.project_code = self.project.code
+        self.calendar_day_id = timezone.localdate(self.sale_date)
         
-        # Calculate total price including packaging
+        # Calculate total price including packaging (whole Toman)
+        self.unit_price = toman(self.unit_price)
+        self.packaging_cost = toman(self.packaging_cost)
         self.total_price = (self.unit_price * self.quantity) + self.packaging_cost
-        super().save(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        self.compute_totals()
+        adding = self._state.adding
+        with transaction.atomic():
+            if self.has_changed('customer_phone', 'customer_name'):
+                self.customer = Customer.for_contact(self.customer_phone, self.customer_name)
+            previous = None if adding else self.loaded_value('customer')
+            totals_changed = self.has_changed(*self.CUSTOMER_TOTALS)
+            super().save(*args, **kwargs)
+            if adding:
+                if self.customer_id:
+                    # An order line adds to its order, which Order.place counted
+                    Customer.add_purchase(self.customer_id, 0 if self.order_id else 1,
+                                          self.total_price, self.total_profit, self.sale_date)
+            elif totals_changed and (previous or self.customer_id):
+                from .customers import refresh_customers
+                refresh_customers([previous, self.customer_id])
     
     @property
     def unit_profit(self):
@@ -221,7 +723,91 @@ class Sale(models.Model):
     def sale_revenue(self):
         # Revenue from actual sale (excluding packaging which is cost pass-through)
         return self.unit_price * self.quantity
-    
+
+
+# Archive of closed fiscal years, stored in the "archive" database
+# (archive.sqlite3, see calculator/archive.py). Project details and costs are
+# copied at archive time, so archived figures do not move with later edits.
+
+class ArchivedSale(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order_id = models.BigIntegerField(null=True, verbose_name='شناسه سفارش')
+    customer_id = models.BigIntegerField(null=True, db_index=True, verbose_name='شناسه مشتری')
+    project_id = models.BigIntegerField(db_index=True, verbose_name='شناسه مدل')
+    project_code = models.PositiveIntegerField(db_index=True, verbose_name='کد مدل')
+    model_name = models.CharField(max_length=200, verbose_name='نام مدل')
+    filament_id = models.BigIntegerField(null=True, verbose_name='شناسه فیلامنت')
+    material = models.CharField(max_length=50, blank=True, verbose_name='جنس')
+    quantity = models.PositiveIntegerField(verbose_name='تعداد')
+    customer_name = models.CharField(max_length=200, blank=True, verbose_name='نام مشتری')
+    customer_phone = models.CharField(max_length=20, blank=True, verbose_name='شماره تماس')
+    unit_price = models.BigIntegerField(verbose_name='قیمت واحد')
+    packaging_cost = models.BigIntegerField(verbose_name='هزینه بسته‌بندی')
+    total_price = models.BigIntegerField(verbose_name='قیمت کل')
+    production_cost = models.BigIntegerField(verbose_name='هزینه تولید')
+    sale_date = models.DateTimeField(db_index=True, verbose_name='تاریخ فروش')
+    local_date = models.DateField(db_index=True, verbose_name='تاریخ محلی')
+    notes = models.TextField(blank=True, verbose_name='یادداشت')
+
+    class Meta:
+        verbose_name = 'فروش بایگانی‌شده'
+        verbose_name_plural = 'فروش‌های بایگانی‌شده'
+        ordering = ['-sale_date']
+
+    def __str__(self):
+        return f"فروش {self.project_code} - {self.customer_name or 'ناشناس'} - {self.quantity} عدد"
+
+    @property
+    def profit(self):
+        # Sale.total_profit: packaging is a pass-through cost
+        return self.unit_price * self.quantity - self.production_cost
+
+
+class SaleRollup(models.Model):
+    """Archived sales summed per local day and project, with the day's calendar parts."""
+    local_date = models.DateField(verbose_name='تاریخ محلی')
+    week_start = models.DateField(verbose_name='شروع هفته')
+    jalali_year = models.PositiveSmallIntegerField(verbose_name='سال')
+    jalali_month = models.PositiveSmallIntegerField(verbose_name='ماه')
+    jalali_day = models.PositiveSmallIntegerField(verbose_name='روز')
+    jalali_quarter = models.PositiveSmallIntegerField(verbose_name='فصل')
+    fiscal_year = models.PositiveSmallIntegerField(verbose_name='سال مالی')
+    project_id = models.BigIntegerField(verbose_name='شناسه مدل')
+    project_code = models.PositiveIntegerField(verbose_name='کد مدل')
+    model_name = models.CharField(max_length=200, verbose_name='نام مدل')
+    filament_id = models.BigIntegerField(null=True, verbose_name='شناسه فیلامنت')
+    material = models.CharField(max_length=50, blank=True, verbose_name='جنس')
+    count = models.PositiveIntegerField(verbose_name='تعداد فروش')
+    quantity = models.PositiveIntegerField(verbose_name='تعداد')
+    revenue = models.BigIntegerField(verbose_name='درآمد')
+    packaging_cost = models.BigIntegerField(verbose_name='هزینه بسته‌بندی')
+    production_cost = models.BigIntegerField(verbose_name='هزینه تولید')
+    profit = models.BigIntegerField(verbose_name='سود')
+
+    class Meta:
+        verbose_name = 'خلاصه فروش بایگانی'
+        verbose_name_plural = 'خلاصه فروش‌های بایگانی'
+        constraints = [
+            models.UniqueConstraint(fields=['local_date', 'project_id'], name='salerollup_day_project_uniq'),
+        ]
+        indexes = [models.Index(fields=['project_id', 'local_date'], name='salerollup_project_idx')]
+
+
+class ArchivedFiscalYear(models.Model):
+    fiscal_year = models.PositiveSmallIntegerField(primary_key=True, verbose_name='سال مالی')
+    first_date = models.DateField(verbose_name='از تاریخ')
+    last_date = models.DateField(verbose_name='تا تاریخ')
+    sales = models.PositiveIntegerField(verbose_name='تعداد فروش')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='زمان بایگانی')
+
+    class Meta:
+        verbose_name = 'سال مالی بایگانی‌شده'
+        verbose_name_plural = 'سال‌های مالی بایگانی‌شده'
+        ordering = ['fiscal_year']
+
+    def __str__(self):
+        return str(self.fiscal_year)
+
 
 class PricingSettings(models.Model):
     singleton_id = models.PositiveSmallIntegerField(default=1, unique=True, editable=False)
@@ -251,6 +837,11 @@ class PricingSettings(models.Model):
         obj, _ = cls.objects.get_or_create(singleton_id=1)
         return obj
 
+    @classmethod
+    async def aget_solo(cls):
+        obj, _ = await cls.objects.aget_or_create(singleton_id=1)
+        return obj
+
     def __str__(self):
         return "Pricing Settings"
 
@@ -0,0 +1,56 @@
+# calculator/money.py
+# Money is stored, summed and compared as integer Toman (SQLite INTEGER, exact
+# SUM). Pricing math multiplies amounts by float rates and rounds each result
+# half-up to a whole Toman once, instead of carrying Decimal through every step.
+import math
+
+
+def toman(value):
+    """Whole Toman, rounded half-up. None / '' / unparsable input is 0."""
+    if isinstance(value, int):
+        return value
+    try:
+        return math.floor(float(value) + 0.5)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def rate(value, default=0.0):
+    """A float rate/quantity (price per kWh, percent, mm ...) from form/JSON/Decimal input."""
+    if value is None or value == '':
+        return default
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return default
+    return result if math.isfinite(result) else default
+
+
+def with_margin(amount, percent):
+    """amount * (1 + percent / 100), in whole Toman."""
+    return toman(amount * (1 + percent / 100))
+
+
+def round_to_step(amount, step):
+    """Nearest multiple of step (half-up); amount unchanged for an empty/zero step."""
+    if not step or step <= 0:
+        return toman(amount)
+    return toman(math.floor(amount / step + 0.5) * step)
+
+
+def allocate(total, weights):
+    """
+    Split a whole-Toman total over weights (largest remainder), so the parts
+    are whole Toman and add up to the total exactly. Zero weights share equally.
+    """
+    if not weights:
+        return []
+    if not any(weights):
+        weights = [1] * len(weights)
+    scale = sum(weights)
+    exact = [total * w / scale for w in weights]
+    parts = [math.floor(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - parts[i], reverse=True)
+    for i in by_remainder[:total - sum(parts)]:
+        parts[i] += 1
+    return parts
@@ -0,0 +1,217 @@
+# calculator/nesting.py
+# Build-plate nesting: pack many copies of small models onto as few plates as
+# possible (2D skyline bottom-left packing on the X/Y footprint, 90° rotation),
+# then amortise each plate's warm-up over the parts printed on it.
+from collections import namedtuple
+
+EPS = 1e-6
+
+Placement = namedtuple('Placement', 'project_id x y width depth rotated')
+ProjectNesting = namedtuple(
+    'ProjectNesting',
+    'project quantity plates single_unit_cost nested_unit_cost saving_per_part saving_percent',
+)
+NestingPlan = namedtuple(
+    'NestingPlan', 'plates layouts projects unplaced total_parts print_hours filament_g total_saving',
+)
+
+
+class Plate:
+    """
+    One build plate. The skyline is a list of [x, y, width] segments covering
+    the plate's X range; each part is put where its top edge ends lowest
+    (then leftmost), which keeps rows tight without tracking every free
+    rectangle.
+    """
+
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.skyline = [[0.0, 0.0, width]]
+        self.placements = []
+        self.free_area = width * depth
+        # Normalised (long, short) sizes that did not fit; anything at least as
+        # large in both dimensions cannot fit either, since the skyline only rises
+        self.failed = []
+
+    def _best_position(self, w, d):
+        best = None
+        sky = self.skyline
+        for i, (x, _, _) in enumerate(sky):
+            if x + w > self.width + EPS:
+                break
+            y = 0.0
+            remaining = w
+            j = i
+            while remaining > EPS:
+                seg = sky[j]
+                if seg[1] > y:
+                    y = seg[1]
+                remaining -= seg[2]
+                j += 1
+            if y + d > self.depth + EPS:
+                continue
+            if best is None or y + d < best[0] - EPS or (abs(y + d - best[0]) <= EPS and x < best[1]):
+                best = (y + d, x, y, i)
+        return best
+
+    def _raise_skyline(self, i, x, top, w):
+        sky = self.skyline
+        sky.insert(i, [x, top, w])
+        end = x + w
+        j = i + 1
+        while j < len(sky) and sky[j][0] < end - EPS:
+            seg = sky[j]
+            seg_end = seg[0] + seg[2]
+            if seg_end <= end + EPS:
+                del sky[j]
+            else:
+                seg[0], seg[2] = end, seg_end - end
+                break
+        # Merge neighbours of equal height so the scan stays short
+        k = max(i - 1, 0)
+        while k < len(sky) - 1 and k <= i + 1:
+            if abs(sky[k][1] - sky[k + 1][1]) <= EPS:
+                sky[k][2] += sky[k + 1][2]
+                del sky[k + 1]
+            else:
+                k += 1
+
+    def place(self, project_id, w, d, spacing):
+        """Place a w x d part (plus spacing) if it fits, trying both orientations."""
+        if (w + spacing) * (d + spacing) > self.free_area + EPS:
+            return False
+        long_side, short_side = (w, d) if w >= d else (d, w)
+        for fl, fs in self.failed:
+            if fl <= long_side + EPS and fs <= short_side + EPS:
+                return False
+
+        options = [(w, d, False)]
+        if abs(w - d) > EPS:
+            options.append((d, w, True))
+        best = None
+        for ow, od, rotated in options:
+            position = self._best_position(ow + spacing, od + spacing)
+            if position is not None and (best is None or position[:2] < best[0][:2]):
+                best = (position, ow, od, rotated)
+        if best is None:
+            # Keep only the minimal failures so the check above stays short
+            self.failed = [(fl, fs) for fl, fs in self.failed if fl < long_side or fs < short_side]
+            self.failed.append((long_side, short_side))
+            return False
+
+        (top, x, y, i), ow, od, rotated = best
+        self._raise_skyline(i, x, top, ow + spacing)
+        # Space under the skyline is never reused, so only what is above it counts
+        self.free_area = sum((self.depth - seg_y) * seg_w for _, seg_y, seg_w in self.skyline)
+        self.placements.append(Placement(project_id, x, y, ow, od, rotated))
+        return True
+
+    def signature(self):
+        return tuple((p.project_id, round(p.x, 3), round(p.y, 3), p.rotated) for p in self.placements)
+
+
+def pack_parts(parts, bed_x, bed_y, spacing=0.0):
+    """
+    Pack (project_id, size_x, size_y) parts onto bed_x x bed_y plates.
+    Returns (plates, unplaced parts). Parts keep `spacing` mm between each
+    other; the plate edge needs none.
+    """
+    # Largest first: big parts define the rows, small ones fill the gaps
+    order = sorted(parts, key=lambda p: (max(p[1], p[2]), p[1] * p[2]), reverse=True)
+    plates = []
+    unplaced = []
+    for project_id, w, d in order:
+        fits_bed = ((w <= bed_x + EPS and d <= bed_y + EPS) or
+                    (d <= bed_x + EPS and w <= bed_y + EPS))
+        if w <= 0 or d <= 0 or not fits_bed:
+            unplaced.append((project_id, w, d))
+            continue
+        for plate in plates:
+            if plate.place(project_id, w, d, spacing):
+                break
+        else:
+            plate = Plate(bed_x + spacing, bed_y + spacing)
+            plate.place(project_id, w, d, spacing)
+            plates.append(plate)
+    return plates, unplaced
+
+
+def plan_plates(items, bed_x, bed_y, spacing, warmup_hours, hourly_cost):
+    """
+    Nest (project, quantity) items and summarise each plate and each project.
+
+    Every print pays `warmup_hours` (heating, homing, purge) once; printed
+    alone each part carries all of it, nested it is split equally among the
+    parts on its plate. `hourly_cost` is electricity plus depreciation per
+    printer hour, in Toman.
+    """
+    from .money import toman
+
+    projects = {}
+    parts = []
+    for project, quantity in items:
+        if quantity <= 0:
+            continue
+        if project.pk in projects:
+            projects[project.pk][1] += quantity
+        else:
+            projects[project.pk] = [project, quantity]
+        parts.extend([(project.pk, project.size_x, project.size_y)] * quantity)
+
+    packed, unplaced = pack_parts(parts, bed_x, bed_y, spacing)
+
+    warmup_cost = warmup_hours * hourly_cost
+    share = {pk: 0.0 for pk in projects}
+    spans = {pk: 0 for pk in projects}
+    plates = []
+    for index, plate in enumerate(packed, 1):
+        counts = {}
+        for p in plate.placements:
+            counts[p.project_id] = counts.get(p.project_id, 0) + 1
+        n = len(plate.placements)
+        for pk, count in counts.items():
+            share[pk] += warmup_cost * count / n
+            spans[pk] += 1
+        plates.append({
+            'number': index,
+            'placements': plate.placements,
+            'signature': plate.signature(),
+            'parts': n,
+            'counts': [(projects[pk][0], count) for pk, count in counts.items()],
+            'print_hours': warmup_hours + sum(projects[pk][0].print_time_hours * c for pk, c in counts.items()),
+            'filament_g': sum(projects[pk][0].filament_weight_used * c for pk, c in counts.items()),
+            'filament_m': sum(projects[pk][0].filament_used_mm * c for pk, c in counts.items()) / 1000,
+            'utilization': 100 * sum(p.width * p.depth for p in plate.placements) / (bed_x * bed_y),
+        })
+
+    missing = {}
+    for pk, _, _ in unplaced:
+        missing[pk] = missing.get(pk, 0) + 1
+    summary = []
+    for pk, (project, quantity) in projects.items():
+        placed = quantity - missing.get(pk, 0)
+        if not placed:
+            continue
+        single = project.total_cost + toman(warmup_cost)
+        nested = project.total_cost + toman(share[pk] / placed)
+        summary.append(ProjectNesting(
+            project, placed, spans[pk], single, nested, single - nested,
+            100 * (single - nested) / single if single else 0.0,
+        ))
+
+    # Plates with the same arrangement are printed as one job N times
+    layouts = {}
+    for plate in plates:
+        layouts.setdefault(plate['signature'], [plate, 0])[1] += 1
+
+    return NestingPlan(
+        plates=plates,
+        layouts=[tuple(layout) for layout in layouts.values()],
+        projects=summary,
+        unplaced=[(projects[pk][0], count) for pk, count in missing.items()],
+        total_parts=len(parts),
+        print_hours=sum(plate['print_hours'] for plate in plates),
+        filament_g=sum(plate['filament_g'] for plate in plates),
+        total_saving=sum(row.saving_per_part * row.quantity for row in summary),
+    )
@@ -0,0 +1,170 @@
+# calculator/profiling.py
+# Opt-in per-request profiling (see ProfilingMiddleware): cProfile stats, a
+# sampled collapsed-stack file for flame graphs (flamegraph.pl, speedscope)
+# and SQL timings, saved under PROFILES_DIR as <stem>.pstats / .collapsed / .json.
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "X-Profile"
+# Stack sampling period for the flame graph, seconds
+SAMPLE_INTERVAL = 0.001
+SLOW_QUERIES_KEPT = 25
+
+STEM_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}-[\w-]*$")
+
+
+def wants_profile(request):
+    return PROFILE_PARAM in request.GET or PROFILE_HEADER in request.headers
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack into collapsed "outer;...;inner" counts."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack and self.thread_id != own:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class RequestProfile:
+    """
+    Profiles whatever runs in the current thread between start() and stop().
+    For async views that is the event loop thread; ORM work handed to
+    sync_to_async threads is not seen by cProfile or the SQL wrapper.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident())
+        self.queries = []
+        self._stack = ExitStack()
+        self.wall = 0.0
+
+    def _time_sql(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - start, sql, context["connection"].alias))
+
+    def start(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._time_sql))
+        self.sampler.start()
+        self._started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.wall = time.perf_counter() - self._started
+        self.sampler.stop()
+        self._stack.close()
+
+    def save(self, request, response):
+        directory = settings.PROFILES_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^\w]+", "-", request.path).strip("-")[:60]
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}-{slug}"
+
+        self.profiler.dump_stats(directory / f"{stem}.pstats")
+        with open(directory / f"{stem}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in self.sampler.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+        slowest = sorted(self.queries, reverse=True)[:SLOW_QUERIES_KEPT]
+        meta = {
+            "stem": stem,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": getattr(response, "status_code", None),
+            "created": time.time(),
+            "wall_ms": self.wall * 1000,
+            "sql_count": len(self.queries),
+            "sql_ms": sum(q[0] for q in self.queries) * 1000,
+            "samples": sum(self.sampler.counts.values()),
+            "slow_queries": [{"ms": d * 1000, "sql": sql, "alias": alias} for d, sql, alias in slowest],
+        }
+        with open(directory / f"{stem}.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        prune()
+        return stem
+
+
+def prune(keep=None):
+    """Keep only the newest PROFILES_KEEP profiles."""
+    keep = settings.PROFILES_KEEP if keep is None else keep
+    directory = settings.PROFILES_DIR
+    stems = sorted(p.stem for p in directory.glob("*.json"))
+    for stem in stems[:-keep] if keep else stems:
+        for suffix in (".json", ".pstats", ".collapsed"):
+            try:
+                (directory / f"{stem}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Saved profile summaries, slowest first."""
+    profiles = []
+    directory = settings.PROFILES_DIR
+    if not directory.is_dir():
+        return profiles
+    for path in directory.glob("*.json"):
+        try:
+            with open(path, encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda p: p.get("wall_ms", 0), reverse=True)
+    return profiles
+
+
+def profile_path(stem, suffix):
+    """Path of a saved profile file, or None for anything that is not one."""
+    if not STEM_RE.match(stem) or suffix not in (".json", ".pstats", ".collapsed"):
+        return None
+    path = settings.PROFILES_DIR / f"{stem}{suffix}"
+    return path if path.is_file() else None
+
+
+def top_functions(stem, limit=40, sort="cumulative"):
+    """pstats report text of a saved profile."""
+    import io
+    import pstats
+
+    path = profile_path(stem, ".pstats")
+    if path is None:
+        return ""
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
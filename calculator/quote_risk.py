@@ -0,0 +1,139 @@
+# calculator/quote_risk.py
+# Monte Carlo of a quote's cost: per draw, the print-failure rate, filament
+# waste, print-time error and energy price are sampled from the requested
+# distributions and pushed through the pricing engine's own formula
+# (quotes.cost_breakdown) as NumPy arrays. 100k draws take milliseconds.
+import math
+
+import numpy as np
+from django.conf import settings
+
+from .money import rate
+from .quotes import cost_breakdown, preview_costs, quote_inputs
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# Candidate margins (%) for the target probability of profit, 0.1% apart
+MARGIN_GRID = np.arange(0, 10001) / 10
+# Beyond this a print "never" succeeds; keeps the geometric draws finite
+MAX_FAILURE_RATE = 0.95
+
+# Simulated inputs: JSON key -> label in error messages
+UNCERTAIN = {
+    'failure_percent': 'درصد خرابی پرینت',
+    'waste_percent': 'درصد ضایعات فیلامنت',
+    'time_error_percent': 'خطای زمان پرینت',
+    'power_price_per_kwh': 'قیمت برق',
+}
+
+
+class QuoteRiskError(ValueError):
+    pass
+
+
+def _round(values):
+    """money.toman() for arrays: half-up to whole Toman."""
+    return np.floor(values + 0.5)
+
+
+def _price(total_cost, margin_percent, step):
+    """money.with_margin() then money.round_to_step(), element-wise."""
+    price = _round(total_cost * (1 + margin_percent / 100))
+    if not step or step <= 0:
+        return price
+    return _round(np.floor(price / step + 0.5) * step)
+
+
+def _sample(spec, default, size, rng, label):
+    """
+    Draws for one uncertain input. `spec` is a number (fixed), or
+    {"dist": "fixed", "value"}, {"dist": "uniform", "low", "high"},
+    {"dist": "triangular", "low", "mode", "high"} or {"dist": "normal", "mean", "sd"};
+    missing means `default`.
+    """
+    if spec is None or spec == '':
+        return np.full(size, float(default))
+    if not isinstance(spec, dict):
+        value = rate(spec, default=None)
+        if value is None:
+            raise QuoteRiskError(f'مقدار «{label}» نامعتبر است')
+        return np.full(size, value)
+
+    kind = spec.get('dist', 'fixed')
+    p = {key: rate(spec.get(key), default=None) for key in ('value', 'low', 'mode', 'high', 'mean', 'sd')}
+    if kind == 'fixed' and p['value'] is not None:
+        return np.full(size, p['value'])
+    if kind == 'uniform' and None not in (p['low'], p['high']) and p['low'] <= p['high']:
+        return rng.uniform(p['low'], p['high'], size)
+    if (kind == 'triangular' and None not in (p['low'], p['mode'], p['high'])
+            and p['low'] <= p['mode'] <= p['high'] and p['low'] < p['high']):
+        return rng.triangular(p['low'], p['mode'], p['high'], size)
+    if kind == 'normal' and None not in (p['mean'], p['sd']) and p['sd'] >= 0:
+        return rng.normal(p['mean'], p['sd'], size)
+    raise QuoteRiskError(f'توزیع «{label}» نامعتبر است')
+
+
+def simulate_quote(data, s, printer=None):
+    """
+    Cost / price distribution of the quote in `data` (calculate_preview's
+    inputs plus the distributions named in UNCERTAIN, 'target_probability',
+    'draws' and 'seed') under PricingSettings `s`.
+
+    A failed print is restarted: the failures before the good print are
+    geometric in the failure rate and each one stops at a uniform point of
+    the print, wasting that fraction of its filament, energy and machine time.
+    """
+    draws = int(rate(data.get('draws'), default=settings.QUOTE_SIMULATION_DRAWS))
+    draws = min(max(draws, 1), settings.QUOTE_SIMULATION_MAX_DRAWS)
+    target = rate(data.get('target_probability'), default=0.9)
+    if not 0 < target < 1:
+        raise QuoteRiskError('احتمال هدف باید بین ۰ و ۱ باشد')
+    seed = data.get('seed')
+    rng = np.random.default_rng(seed if isinstance(seed, int) and seed >= 0 else None)
+
+    sampled = {
+        key: _sample(data.get(key), default, draws, rng, UNCERTAIN[key])
+        for key, default in (
+            ('failure_percent', 0),
+            ('waste_percent', rate(s.filament_waste_percent)),
+            ('time_error_percent', 0),
+            ('power_price_per_kwh', rate(s.power_price_per_kwh)),
+        )
+    }
+    q = quote_inputs(data, s, printer)
+    failure = np.clip(sampled['failure_percent'] / 100, 0.0, MAX_FAILURE_RATE)
+    failed = rng.geometric(1 - failure) - 1
+    wasted = np.bincount(np.repeat(np.arange(draws), failed), weights=rng.random(int(failed.sum())),
+                         minlength=draws)
+    costs = cost_breakdown(
+        q,
+        np.maximum(sampled['waste_percent'], 0.0),
+        q.print_time_hours * np.maximum(1 + sampled['time_error_percent'] / 100, 0.0),
+        np.maximum(sampled['power_price_per_kwh'], 0.0),
+        prints=1 + wasted,
+        round_money=_round,
+    )
+    total = costs['total_cost']
+    profit_percent, step = rate(s.profit_percent), rate(s.round_to_nearest)
+
+    # The quote as priced today, and the margin whose price beats the cost in
+    # at least `target` of the draws
+    quote = preview_costs(data, s, printer)
+    needed = math.ceil(target * draws)
+    threshold = np.partition(total, needed - 1)[needed - 1]
+    prices = _price(quote['total_cost'], MARGIN_GRID, step)
+    enough = np.flatnonzero(prices > threshold)
+
+    return {
+        'draws': draws,
+        'quote': quote,
+        'mean_cost': float(total.mean()),
+        'failed_prints': float(failed.mean()),
+        'cost_percentiles': dict(zip((f'p{p}' for p in PERCENTILES), np.percentile(total, PERCENTILES).tolist())),
+        'price_percentiles': dict(zip((f'p{p}' for p in PERCENTILES),
+                                      np.percentile(_price(total, profit_percent, step), PERCENTILES).tolist())),
+        'profit_probability': float((total < quote['selling_price']).mean()),
+        'expected_profit': float(quote['selling_price'] - total.mean()),
+        'target_probability': target,
+        'required_margin_percent': float(MARGIN_GRID[enough[0]]) if len(enough) else None,
+        'required_price': int(prices[enough[0]]) if len(enough) else None,
+    }
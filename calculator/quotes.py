@@ -0,0 +1,96 @@
+# calculator/quotes.py
+# The quote pricing engine behind /api/calculate_preview/: request inputs ->
+# cost breakdown -> selling price. cost_breakdown() is plain arithmetic, so
+# the Monte Carlo in calculator/quote_risk.py runs the very same formula over
+# NumPy arrays of sampled waste / print time / energy price.
+from collections import namedtuple
+
+from .money import rate, round_to_step, toman, with_margin
+
+# Robust default grams-per-meter for 1.75 mm filament: PLA is ~2.98 g/m in
+# theory; 3.0 g/m for practicality.
+G_PER_M = 3.0
+
+# Per-quote inputs that no simulated uncertainty touches; money in Toman
+QuoteInputs = namedtuple(
+    'QuoteInputs',
+    'filament_used_mm print_time_hours filament_cost_per_kg average_watts depreciation_per_hour '
+    'post_processing_cost painting_cost packaging_cost',
+)
+
+
+def quote_inputs(data, s, printer=None):
+    """
+    QuoteInputs from calculate_preview's JSON body, PricingSettings `s` and
+    the optional printer (its power draw and depreciation):
+    {
+      filament_used_mm: number,
+      print_time_hours: number,
+      size_x: number, size_y: number, size_z: number,
+      filament_cost_per_kg: number,
+      post_processing_enabled: bool,
+      painting_enabled: bool,
+      packaging_cost: number (optional)
+      surface_cm2: number (optional, measured by /api/mesh/analyze/)
+    }
+    """
+    size_x = rate(data.get('size_x'))
+    size_y = rate(data.get('size_y'))
+    size_z = rate(data.get('size_z'))
+
+    # Surface area in cm^2: the mesh's measured area when given, otherwise the
+    # bounding-box estimate 2(xy + yz + xz) (inputs are mm, so mm^2 -> cm^2 by /100)
+    surface_cm2 = rate(data.get('surface_cm2'), default=None)
+    if surface_cm2 is None or surface_cm2 <= 0:
+        surface_cm2 = (2 * ((size_x * size_y) + (size_y * size_z) + (size_x * size_z))) / 100
+
+    return QuoteInputs(
+        filament_used_mm=rate(data.get('filament_used_mm')),
+        print_time_hours=rate(data.get('print_time_hours')),
+        filament_cost_per_kg=rate(data.get('filament_cost_per_kg')),
+        # The chosen printer's draw, else a conservative default average power 120W
+        average_watts=printer.power_kw * 1000 if printer else 120,
+        depreciation_per_hour=printer.depreciation_per_hour if printer else rate(s.depreciation_per_hour),
+        post_processing_cost=toman(s.post_processing_rate) if data.get('post_processing_enabled') else 0,
+        painting_cost=toman(rate(s.painting_rate_per_cm2) * surface_cm2) if data.get('painting_enabled') else 0,
+        packaging_cost=toman(rate(data.get('packaging_cost'), default=rate(s.packaging_cost))),
+    )
+
+
+def cost_breakdown(q, waste_percent, print_time_hours, power_price_per_kwh, prints=1, round_money=toman):
+    """
+    Cost components of one delivered part. `prints` is how many prints'
+    worth of filament, energy and machine time it took (1 + failed
+    fractions); finishing and packaging are paid once. Element-wise when the
+    rates are NumPy arrays and `round_money` rounds arrays half-up.
+    """
+    filament_weight_g = q.filament_used_mm / 1000 * G_PER_M * (1 + waste_percent / 100) * prints
+    material_cost = round_money((filament_weight_g / 1000) * q.filament_cost_per_kg)
+    electricity_cost = round_money((q.average_watts * print_time_hours * prints / 1000) * power_price_per_kwh)
+    depreciation_cost = round_money(q.depreciation_per_hour * print_time_hours * prints)
+    total_cost = (material_cost + electricity_cost + depreciation_cost +
+                  q.post_processing_cost + q.painting_cost + q.packaging_cost)
+    return {
+        'filament_weight': filament_weight_g,
+        'material_cost': material_cost,
+        'electricity_cost': electricity_cost,
+        'depreciation_cost': depreciation_cost,
+        'post_processing_cost': q.post_processing_cost,
+        'painting_cost': q.painting_cost,
+        'total_cost': total_cost,
+    }
+
+
+def selling_price(total_cost, s):
+    """Selling price with the configured profit and rounding."""
+    return round_to_step(with_margin(total_cost, rate(s.profit_percent)), rate(s.round_to_nearest))
+
+
+def preview_costs(data, s, printer=None):
+    """The deterministic quote: cost breakdown and selling price at the configured rates."""
+    q = quote_inputs(data, s, printer)
+    costs = cost_breakdown(q, rate(s.filament_waste_percent), q.print_time_hours, rate(s.power_price_per_kwh))
+    costs['selling_price'] = selling_price(costs['total_cost'], s)
+    # Debug helpers
+    costs['g_per_m'] = G_PER_M
+    return costs
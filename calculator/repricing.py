@@ -0,0 +1,156 @@
+# calculator/repricing.py
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import BigIntegerField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+from .models import Project, Sale
+
+# Candidate grid: margin over total cost (%) x price rounding step (Toman)
+MARGIN_GRID = np.arange(0, 201, 5, dtype=float)
+ROUNDING_STEPS = np.array([100, 500, 1000, 5000], dtype=float)
+
+HISTORY_DAYS = 365
+DEFAULT_ELASTICITY = -1.5
+# Constant-elasticity demand only has a finite profit-maximising price for e < -1
+ELASTICITY_BOUNDS = (-5.0, -1.05)
+# Pseudo-months pulling a sparse per-model fit toward the catalog-wide elasticity
+SHRINKAGE_MONTHS = 3
+MIN_FIT_MONTHS = 3
+# Candidates stay within this fraction of the observed average price: the
+# fitted curve says nothing about prices far from those actually charged
+PRICE_BAND = 0.25
+
+
+def _monthly_history(since):
+    """(project_id, units, revenue) per model and Jalali month since the given local date."""
+    revenue = ExpressionWrapper(F('unit_price') * F('quantity'), output_field=BigIntegerField())
+    rows = list(Sale.objects
+                .filter(calendar_day__gte=since)
+                .values_list('project_id', 'calendar_day__jalali_year', 'calendar_day__jalali_month')
+                .annotate(units=Sum('quantity'), revenue=Sum(revenue))
+                .order_by())
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    arr = np.array([(r[0], r[3], r[4]) for r in rows], dtype=float)
+    return arr[:, 0].astype(np.int64), arr[:, 1], arr[:, 2]
+
+
+def estimate_demand(project_ids, history_days=HISTORY_DAYS):
+    """
+    Per model: price elasticity e, reference price p_ref and monthly units q_ref
+    of a constant-elasticity demand curve q(p) = q_ref * (p / p_ref) ** e, and
+    whether e was fitted from the model's own history.
+
+    e is the slope of log(units) on log(average price) over monthly
+    observations, shrunk toward the median slope of the catalog. Without
+    MIN_FIT_MONTHS months at more than one price there is no slope to fit
+    (the usual case: sales at the list price), so `fitted` is False and e is
+    only the catalog (or default) value.
+    """
+    n_projects = len(project_ids)
+    since = timezone.localdate() - timedelta(days=history_days)
+    pid, units, revenue = _monthly_history(since)
+
+    idx = np.searchsorted(project_ids, pid)
+    keep = (idx < n_projects) & (project_ids[np.minimum(idx, n_projects - 1)] == pid) & (units > 0)
+    idx, units, revenue = idx[keep], units[keep], revenue[keep]
+    price = revenue / units
+
+    x, y = np.log(np.maximum(price, 1e-9)), np.log(units)
+    n = np.bincount(idx, minlength=n_projects).astype(float)
+    sx = np.bincount(idx, x, n_projects)
+    sy = np.bincount(idx, y, n_projects)
+    sxx = np.bincount(idx, x * x, n_projects)
+    sxy = np.bincount(idx, x * y, n_projects)
+    denom = n * sxx - sx * sx
+    valid = (n >= MIN_FIT_MONTHS) & (denom > 1e-9)
+    slope = np.where(valid, (n * sxy - sx * sy) / np.where(valid, denom, 1.0), np.nan)
+    slope = np.clip(slope, *ELASTICITY_BOUNDS)
+
+    pooled = float(np.median(slope[valid])) if valid.any() else DEFAULT_ELASTICITY
+    elasticity = np.where(valid, (n * slope + SHRINKAGE_MONTHS * pooled) / (n + SHRINKAGE_MONTHS), pooled)
+
+    total_units = np.bincount(idx, units, n_projects)
+    total_revenue = np.bincount(idx, revenue, n_projects)
+    p_ref = np.divide(total_revenue, total_units, out=np.zeros(n_projects), where=total_units > 0)
+    q_ref = total_units / (history_days / 30.4375)
+    return elasticity, p_ref, q_ref, valid
+
+
+def _expected_profit(price, cost, elasticity, p_ref, q_ref):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        demand = q_ref * np.power(np.divide(price, p_ref, out=np.zeros_like(price), where=p_ref > 0), elasticity)
+    return (price - cost) * np.nan_to_num(demand)
+
+
+def propose_prices(queryset=None):
+    """
+    Evaluate every (margin, rounding) candidate for every model at once and
+    return (proposals, unfitted): one proposal dict per model whose best price
+    differs from the current one, and the number of models with sales but too
+    little price variation to fit a demand curve. Those, and models without
+    sales, are left alone; a default elasticity would push every one of them
+    to the same corner of the grid.
+    """
+    qs = (queryset if queryset is not None else Project.objects.all()).order_by('id')
+    rows = list(qs.values_list('id', 'code', 'model_name', 'total_cost', 'selling_price'))
+    if not rows:
+        return [], 0
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    cost = np.array([r[3] for r in rows], dtype=float)
+    current = np.array([r[4] for r in rows], dtype=float)
+
+    elasticity, p_ref, q_ref, fitted = estimate_demand(ids)
+
+    # (projects, margins, steps) -> (projects, candidates)
+    # Same rounding as Project.policy_price: whole Toman first, then the step
+    raw = np.floor(cost[:, None, None] * (1 + MARGIN_GRID[None, :, None] / 100) + 0.5)
+    candidates = (np.floor(raw / ROUNDING_STEPS + 0.5) * ROUNDING_STEPS).reshape(len(rows), -1)
+    e, pr, qr = elasticity[:, None], p_ref[:, None], q_ref[:, None]
+    profit = _expected_profit(candidates, cost[:, None], e, pr, qr)
+    in_band = np.abs(candidates - pr) <= PRICE_BAND * pr
+    profit = np.where(in_band, profit, -np.inf)
+
+    best = np.argmax(profit, axis=1)
+    best_price = candidates[np.arange(len(rows)), best]
+    best_profit = profit[np.arange(len(rows)), best]
+    best_margin = MARGIN_GRID[best // len(ROUNDING_STEPS)]
+    best_step = ROUNDING_STEPS[best % len(ROUNDING_STEPS)]
+    current_profit = _expected_profit(current, cost, elasticity, p_ref, q_ref)
+
+    changed = fitted & (q_ref > 0) & (np.abs(best_price - current) >= 1) & (best_profit > current_profit)
+    proposals = []
+    for i in np.flatnonzero(changed):
+        proposals.append({
+            'project_id': int(ids[i]),
+            'code': rows[i][1],
+            'model_name': rows[i][2],
+            'total_cost': int(cost[i]),
+            'current_price': int(current[i]),
+            'proposed_price': int(best_price[i]),
+            'change_percent': float((best_price[i] - current[i]) / current[i] * 100) if current[i] else 0.0,
+            'profit_margin': float(best_margin[i]),
+            'price_rounding': int(best_step[i]),
+            'elasticity': float(elasticity[i]),
+            'monthly_units': float(q_ref[i]),
+            'expected_profit_current': float(current_profit[i]),
+            'expected_profit_proposed': float(best_profit[i]),
+            'expected_gain': float(best_profit[i] - current_profit[i]),
+        })
+    proposals.sort(key=lambda p: p['expected_gain'], reverse=True)
+    return proposals, int(((q_ref > 0) & ~fitted).sum())
+
+
+def apply_proposals(proposals):
+    """Write proposed prices and their margin/rounding policy in one set-based update."""
+    projects = [
+        Project(pk=p['project_id'], selling_price=p['proposed_price'],
+                profit_margin=p['profit_margin'], price_rounding=p['price_rounding'])
+        for p in proposals
+    ]
+    with transaction.atomic():
+        Project.objects.bulk_update(projects, ['selling_price', 'profit_margin', 'price_rounding'], batch_size=500)
+    return len(projects)
@@ -0,0 +1,237 @@
+# calculator/scheduler.py
+# Print-farm scheduling: queued PrintJobs are placed on printers (lanes) to
+# keep the makespan short (LPT list scheduling) while respecting bed size and
+# material, and keeping same-spool jobs next to each other so spool changes
+# stay rare. Adding a job or losing a printer only re-times the lanes it
+# touches; plan_schedule() rebuilds everything.
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Printer, PrintJob
+
+PLAN_FIELDS = ['printer', 'sequence', 'planned_start', 'planned_end']
+
+
+def _change_hours():
+    return settings.SPOOL_CHANGE_MINUTES / 60
+
+
+class Lane:
+    """One printer's queue: free from `start` with `filament_id` loaded."""
+
+    def __init__(self, printer, start, filament_id):
+        self.printer = printer
+        self.start = start
+        self.filament_id = filament_id
+        self.jobs = []
+
+    def simulate(self, jobs=None):
+        """(end time, spool changes) if this lane ran `jobs` (default: its own queue)."""
+        t = self.start
+        loaded = self.filament_id
+        changes = 0
+        change = timedelta(hours=_change_hours())
+        for job in self.jobs if jobs is None else jobs:
+            if job.project.filament_id != loaded:
+                if loaded is not None:
+                    changes += 1
+                t += change
+                loaded = job.project.filament_id
+            t += timedelta(hours=job.duration_hours)
+        return t, changes
+
+    def insertion_point(self, filament_id):
+        """Right after this lane's last job on the same spool, else at the end."""
+        for index in range(len(self.jobs) - 1, -1, -1):
+            if self.jobs[index].project.filament_id == filament_id:
+                return index + 1
+        return len(self.jobs)
+
+    def retime(self):
+        """Write printer / sequence / planned times onto the lane's jobs."""
+        t = self.start
+        loaded = self.filament_id
+        change = timedelta(hours=_change_hours())
+        for sequence, job in enumerate(self.jobs, 1):
+            if job.project.filament_id != loaded:
+                t += change
+                loaded = job.project.filament_id
+            job.printer = self.printer
+            job.sequence = sequence
+            job.planned_start = t
+            t += timedelta(hours=job.duration_hours)
+            job.planned_end = t
+        return self.jobs
+
+
+def _lanes(now):
+    """Active printers as lanes, each free once its current print ends."""
+    printing = {
+        job.printer_id: job
+        for job in PrintJob.objects.filter(status=PrintJob.STATUS_PRINTING, printer__isnull=False)
+        .select_related('project')
+    }
+    lanes = []
+    for printer in Printer.objects.filter(is_active=True).select_related('loaded_filament'):
+        current = printing.get(printer.pk)
+        start = max(now, current.planned_end) if current and current.planned_end else now
+        filament_id = current.project.filament_id if current else printer.loaded_filament_id
+        lanes.append(Lane(printer, start, filament_id))
+    return lanes
+
+
+def _lpt_order(jobs):
+    """Longest job first (LPT), FIFO among equals."""
+    return sorted(jobs, key=lambda j: (-j.duration_hours, j.created_date, j.pk or 0))
+
+
+def _place(jobs, lanes):
+    """
+    List scheduling: each job goes to the printer that can take it and where
+    it finishes the lane earliest. On a lane it is slotted right after the
+    last job on the same spool, and a spool change costs SPOOL_CHANGE_MINUTES,
+    so same-spool work clusters and fewer changes win ties. Returns the jobs
+    no active printer can print (bed too small or material not supported).
+    """
+    unplaceable = []
+    for job in _lpt_order(jobs):
+        best = None
+        for i, lane in enumerate(lanes):
+            if not lane.printer.can_print(job.project):
+                continue
+            at = lane.insertion_point(job.project.filament_id)
+            candidate = lane.jobs[:at] + [job] + lane.jobs[at:]
+            end, changes = lane.simulate(candidate)
+            key = (end, changes, i)
+            if best is None or key < best[0]:
+                best = (key, lane, candidate)
+        if best is None:
+            unplaceable.append(job)
+        else:
+            best[1].jobs = best[2]
+    return unplaceable
+
+
+def _save(jobs):
+    if jobs:
+        PrintJob.objects.bulk_update(jobs, PLAN_FIELDS, batch_size=500)
+
+
+def _unassign(jobs):
+    for job in jobs:
+        job.printer = None
+        job.sequence = 0
+        job.planned_start = job.planned_end = None
+    return jobs
+
+
+def _queued():
+    return PrintJob.objects.filter(status=PrintJob.STATUS_QUEUED).select_related('project__filament')
+
+
+def plan_schedule(now=None):
+    """Rebuild the whole plan from the queued jobs; returns jobs no printer can take."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        lanes = _lanes(now)
+        jobs = list(_queued())
+        unplaceable = _place(jobs, lanes)
+        for lane in lanes:
+            lane.retime()
+        _save(jobs)
+        _save(_unassign(unplaceable))
+    return unplaceable
+
+
+def _current_lanes(now):
+    """Lanes holding the jobs already planned on them, in their planned order."""
+    lanes = _lanes(now)
+    by_printer = {lane.printer.pk: lane for lane in lanes}
+    for job in _queued().filter(printer__isnull=False).order_by('printer', 'sequence'):
+        lane = by_printer.get(job.printer_id)
+        if lane is not None:
+            lane.jobs.append(job)
+    return lanes
+
+
+def schedule_jobs(jobs, now=None):
+    """
+    Incremental re-plan: slot new (or orphaned) jobs into the existing plan
+    and re-time only the lanes that received them. Returns jobs no printer
+    can take.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        lanes = _current_lanes(now)
+        before = {id(lane): list(lane.jobs) for lane in lanes}
+        unplaceable = _place(jobs, lanes)
+        changed = []
+        for lane in lanes:
+            if lane.jobs != before[id(lane)]:
+                changed.extend(lane.retime())
+        _save(changed)
+        _save(_unassign(unplaceable))
+    return unplaceable
+
+
+def retime_printer(printer_id, now=None):
+    """Recompute the planned times of one printer's queue (after a start, finish or removal)."""
+    now = now or timezone.now()
+    for lane in _current_lanes(now):
+        if lane.printer.pk == printer_id:
+            _save(lane.retime())
+
+
+def remove_job(job, now=None):
+    """Drop a queued job from the plan and close the gap on its printer."""
+    with transaction.atomic():
+        printer_id = job.printer_id
+        job.delete()
+        if printer_id:
+            retime_printer(printer_id, now)
+
+
+def printer_down(printer, now=None):
+    """
+    Take a printer out of service: its interrupted print goes back to the
+    queue and its queued jobs move to the other printers; nothing already
+    planned elsewhere is reordered.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        printer.is_active = False
+        printer.save(update_fields=['is_active'])
+        orphans = list(printer.jobs.exclude(status=PrintJob.STATUS_DONE).select_related('project__filament'))
+        for job in orphans:
+            job.status = PrintJob.STATUS_QUEUED
+        PrintJob.objects.bulk_update(orphans, ['status'])
+        return schedule_jobs(_unassign(orphans), now)
+
+
+def printer_up(printer, now=None):
+    """Bring a printer back; the queue is re-planned so it picks up work."""
+    printer.is_active = True
+    printer.save(update_fields=['is_active'])
+    return plan_schedule(now)
+
+
+def start_job(job):
+    """Mark a job as printing; its spool is now the one loaded on the printer."""
+    with transaction.atomic():
+        job.status = PrintJob.STATUS_PRINTING
+        job.planned_start = timezone.now()
+        job.planned_end = job.planned_start + timedelta(hours=job.duration_hours)
+        job.save(update_fields=['status', 'planned_start', 'planned_end'])
+        Printer.objects.filter(pk=job.printer_id).update(loaded_filament=job.project.filament_id)
+        retime_printer(job.printer_id)
+
+
+def finish_job(job):
+    with transaction.atomic():
+        job.status = PrintJob.STATUS_DONE
+        job.planned_end = timezone.now()
+        job.save(update_fields=['status', 'planned_end'])
+        retime_printer(job.printer_id)
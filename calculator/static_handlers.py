@@ -0,0 +1,68 @@
+# calculator/static_handlers.py
+# Serving of collected static files for runserver and the ASGI app.
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler, StaticFilesHandler
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+
+# name.0123456789ab.ext as written by ManifestStaticFilesStorage
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Accept-Encoding token -> suffix of the precompressed sibling, in preference order
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def serve_collected(request, path):
+    """
+    Serve a file from STATIC_ROOT, picking a precompressed sibling the client
+    accepts. Fingerprinted names never change content, so they are cacheable forever.
+    """
+    if not settings.STATIC_ROOT:
+        raise Http404
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404
+    if not fullpath.is_file():
+        raise Http404
+
+    accepted = {token.split(';')[0].strip() for token in request.headers.get('Accept-Encoding', '').split(',')}
+    served, encoding = fullpath, None
+    for token, suffix in ENCODINGS:
+        candidate = fullpath.with_name(fullpath.name + suffix)
+        if token in accepted and candidate.is_file():
+            served, encoding = candidate, token
+            break
+
+    content_type, _ = mimetypes.guess_type(fullpath.name)
+    response = FileResponse(served.open('rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    if HASHED_NAME_RE.search(fullpath.name):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+class CollectedStaticMixin:
+    """Serve from STATIC_ROOT first; fall back to the finders (app/static dirs) before collectstatic."""
+
+    def serve(self, request):
+        try:
+            return serve_collected(request, self.file_path(request.path))
+        except Http404:
+            return super().serve(request)
+
+
+class CollectedStaticFilesHandler(CollectedStaticMixin, StaticFilesHandler):
+    pass
+
+
+class ASGICollectedStaticFilesHandler(CollectedStaticMixin, ASGIStaticFilesHandler):
+    pass
@@ -0,0 +1,52 @@
+# calculator/storage.py
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # gzip siblings only
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.ttf', '.eot', '.ico')
+MIN_COMPRESS_SIZE = 512
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hashed file names plus precompressed .gz/.br siblings, written once
+    by collectstatic so nothing is compressed per request.
+
+    The app always runs with DEBUG on, where Django would hand out unhashed
+    names; once a manifest exists its hashed names are used regardless.
+    Files missing from the manifest (not collected yet) keep their plain name.
+    """
+
+    manifest_strict = False
+
+    def url(self, name, force=False):
+        if not force and name and self.hashed_files.get(self.hash_key(self.clean_name(name))):
+            force = True
+        return super().url(name, force=force)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_SUFFIXES):
+                self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
@@ -0,0 +1,20 @@
+# calculator/tasks.py
+# Background tasks run by the job queue (calculator.jobqueue). Arguments are
+# ids rather than objects: a job may run after a restart, so each task loads
+# fresh rows and quietly does nothing when they are gone.
+from .jobqueue import task
+from .models import Project
+
+
+@task("resize_project_image")
+def resize_project_image(project_id):
+    project = Project.objects.filter(pk=project_id).first()
+    if project is not None:
+        project.resize_image()
+
+
+@task("recalculate_project_costs")
+def recalculate_project_costs(relation, pk):
+    # relation is 'filament' or 'printer', whose prices changed
+    if relation in ('filament', 'printer'):
+        Project.recalculate_costs(Project.objects.filter(**{f'{relation}_id': pk}))
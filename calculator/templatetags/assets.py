@@ -0,0 +1,11 @@
+# calculator/templatetags/assets.py
+from django import template
+
+from calculator.assets import vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(name, kind):
+    return vendor_url(name, kind)
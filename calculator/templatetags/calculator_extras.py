@@ -1,6 +1,8 @@
 # calculator/templatetags/calculator_extras.py
 from django import template
 
+from calculator.money import toman as to_toman
+
 register = template.Library()
 
 @register.filter
@@ -30,4 +32,8 @@ def div(value, arg):
 @register.filter
 def add_str(value, arg):
     """Adds string to value."""
-    return str(value) + str(arg)
\ No newline at end of file
+    return str(value) + str(arg)
+@register.filter
+def toman(value):
+    """Whole-Toman amount for display (integers pass straight through)."""
+    return str(to_toman(value))
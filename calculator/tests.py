@@ -1,3 +1,143 @@
-from django.test import TestCase
+import io
+import math
+import sqlite3
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from calculator import backup, customers
+from calculator.gcode import estimate_print_time
+from calculator.models import Sale
+
+
+class BackupRestoreTests(SimpleTestCase):
+    """Snapshot / restore round trip on scratch databases and media."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        self.db = root / "data" / "calculator.sqlite3"
+        self.db.parent.mkdir()
+        self.media = root / "media"
+        (self.media / "project_images").mkdir(parents=True)
+        self.picture = self.media / "project_images" / "part.jpg"
+
+        settings = override_settings(BACKUP_DIR=root / "backups", MEDIA_ROOT=str(self.media), BACKUP_KEEP=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.object(backup, "_databases", return_value={self.db.name: self.db})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        conn = sqlite3.connect(self.db)
+        conn.execute("CREATE TABLE stock (value INTEGER)")
+        conn.execute("INSERT INTO stock VALUES (0)")
+        conn.commit()
+        conn.close()
+
+    def _set_state(self, value):
+        conn = sqlite3.connect(self.db)
+        conn.execute("UPDATE stock SET value = ?", (value,))
+        conn.commit()
+        conn.close()
+        self.picture.write_bytes(f"picture {value}".encode())
+
+    def _value(self):
+        conn = sqlite3.connect(self.db)
+        try:
+            return conn.execute("SELECT value FROM stock").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_restore_round_trip(self):
+        self._set_state(1)
+        first = backup.create_snapshot("one")
+        self._set_state(2)
+        backup.verify_snapshot(first)
+
+        self.picture.unlink()
+        backup.restore_snapshot(backup.get_snapshot(first.name))
+        self.assertEqual(self._value(), 1)
+        self.assertEqual(self.picture.read_bytes(), b"picture 1")
+
+    def test_restore_oldest_kept_snapshot(self):
+        # With BACKUP_KEEP=2 the pre-restore snapshot would rotate the restored one away
+        self._set_state(1)
+        oldest = backup.create_snapshot("one")
+        self._set_state(2)
+        backup.create_snapshot("two")
+        self._set_state(3)
+
+        backup.restore_snapshot(backup.get_snapshot(oldest.name))
+        self.assertEqual(self._value(), 1)
+        self.assertEqual(self.picture.read_bytes(), b"picture 1")
+        names = [s.name for s in backup.list_snapshots()]
+        self.assertIn(oldest.name, names)
+        self.assertTrue(any(name.endswith("-pre-restore") for name in names))
+
+        # The next regular snapshot rotates back down to BACKUP_KEEP
+        backup.create_snapshot()
+        self.assertEqual(len(backup.list_snapshots()), 2)
+
+    def test_prune_waits_for_the_lock(self):
+        # Another process (scheduler, manage.py backup) holding the lock
+        backup.create_snapshot("one")
+        other = sqlite3.connect(self.db.parent.parent / "backups" / backup.LOCK_FILE, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute("BEGIN EXCLUSIVE")
+        with mock.patch.object(backup, "LOCK_TIMEOUT", 0.1), self.assertRaises(backup.BackupError):
+            backup.prune(keep=0)
+        self.assertEqual(len(backup.list_snapshots()), 1)
+
+        other.execute("ROLLBACK")
+        backup.prune(keep=0)
+        self.assertEqual(backup.list_snapshots(), [])
+
+
+class GcodeEstimateTests(SimpleTestCase):
+    def _estimate(self, text):
+        return estimate_print_time(io.BytesIO(text.encode()), name="part.gcode")
+
+    def test_full_circle_arc_mid_file(self):
+        # Start == end: zero chord, so the arc has no direction of its own
+        stats = self._estimate("G1 X10 F600\nG2 X10 Y0 I10 J0\nG1 X20\n")
+        self.assertEqual(stats.moves, 3)
+        self.assertTrue(math.isfinite(stats.seconds))
+        # Two 10 mm lines plus a 2*pi*10 mm circle at 10 mm/s, slowed by acceleration
+        self.assertGreater(stats.seconds, (20 + 20 * math.pi) / 10)
+        self.assertLess(stats.seconds, (20 + 20 * math.pi) / 10 + 1)
+
+
+class CustomerRecountTests(TestCase):
+    """Deleting sales recounts each affected customer once, after the commit."""
+
+    def _delete(self, *customer_ids):
+        for customer_id in customer_ids:
+            post_delete.send(Sale, instance=SimpleNamespace(customer_id=customer_id), using="default")
+
+    def test_cascade_recounts_once_on_commit(self):
+        with mock.patch.object(customers, "refresh_customers") as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self._delete(1, 2, None, 1, 2, 1)
+                    refresh.assert_not_called()
+            refresh.assert_called_once_with({1, 2})
+
+    def test_rolled_back_delete_is_forgotten(self):
+        with mock.patch.object(customers, "refresh_customers") as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    try:
+                        with transaction.atomic():
+                            self._delete(1)
+                            raise RuntimeError
+                    except RuntimeError:
+                        pass
+                    self._delete(2)
+            refresh.assert_called_once_with({2})
@@ -16,10 +16,32 @@ urlpatterns = [
     path('project/<int:pk>/edit/', views.edit_project, name='edit_project'),
     path('project/<int:pk>/delete/', views.delete_project, name='delete_project'),
     path('sales/', views.sales, name='sales'),
+    path('orders/', views.orders, name='orders'),
+    path('orders/<int:pk>/', views.order_detail, name='order_detail'),
     path('reports/', views.reports, name='reports'),
     path('projects/', views.projects, name='projects'),
     path('calculate_preview/', views.calculate_preview, name='calculate_preview'),
+    path('plates/', views.nesting_planner, name='nesting_planner'),
+    path('farm/', views.farm, name='farm'),
+    path('farm/replan/', views.farm_replan, name='farm_replan'),
+    path('farm/printer/add/', views.printer_form, name='add_printer'),
+    path('farm/printer/<int:pk>/edit/', views.printer_form, name='edit_printer'),
+    path('farm/printer/<int:pk>/status/', views.printer_status, name='printer_status'),
+    path('farm/job/<int:pk>/<str:action>/', views.print_job_action, name='print_job_action'),
+    path('profiles/', views.profiles, name='profiles'),
+    path('profiles/<str:stem>/', views.profile_detail, name='profile_detail'),
+    path('profiles/<str:stem>.<str:ext>', views.profile_file, name='profile_file'),
+    path('jobs/', views.jobs, name='jobs'),
+    path('jobs/<int:pk>/<str:action>/', views.job_action, name='job_action'),
     path('settings/pricing/', views.pricing_settings_view, name='pricing_settings'),
+    path('settings/repricing/', views.repricing, name='repricing'),
     path('api/settings/pricing.json', views.pricing_settings_json, name='pricing_settings_json'),
     path('api/calculate_preview/', views.calculate_preview, name='calculate_preview'),
+    path('api/quote/simulate/', views.quote_simulation, name='quote_simulation'),
+    path('api/mesh/analyze/', views.mesh_analyze, name='mesh_analyze'),
+    path('api/gcode/analyze/', views.gcode_analyze, name='gcode_analyze'),
+    path('api/project/<int:code>.json', views.project_lookup, name='project_lookup'),
+    path('api/customer.json', views.customer_lookup, name='customer_lookup'),
+    path('api/analytics/sales.json', views.sales_analytics, name='sales_analytics'),
+    path('api/cache/stats.json', views.response_cache_stats, name='response_cache_stats'),
 ]
@@ -1,17 +1,17 @@
 # calculator/views.py
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponseNotAllowed
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 import json
 import math
+import time
 import json
-from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 from math import pi
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
@@ -19,12 +19,28 @@ from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib import messages
 from .models import PricingSettings
 from .forms import PricingSettingsForm
-from .models import Filament, Project, Sale
-from .forms import FilamentForm, ProjectForm, SaleForm
-
-
+from .models import Customer, Filament, Order, Printer, PrintJob, Project, Sale
+from .forms import FilamentForm, OrderForm, PrinterForm, PrintJobForm, ProjectForm, SaleForm
+from .cache import cached_view, response_cache
+from .dbrouting import reporting_reads
+from .analytics import (
+    BUCKETS, GROUPS, archived_report, archived_sale_rows, archived_sale_rows_queryset, archived_through,
+    merge_stats, order_totals, sale_rows, sale_rows_queryset, sales_series, sales_totals,
+)
+from .jalali import jalali_month_label
+from .money import toman
+from .quotes import preview_costs
+
+
+@reporting_reads
 def index(request):
-    filaments = Filament.objects.all()
+    # NumPy is only needed here; keep it off the import path of every other view
+    from .forecasting import get_forecast
+
+    forecast = get_forecast()
+    filaments = list(Filament.objects.all())
+    for filament in filaments:
+        filament.forecast = forecast.spools.get(filament.pk)
     recent_projects = Project.objects.select_related('filament').all()[:10]
     
     # Project statistics
@@ -46,6 +62,7 @@ def index(request):
         'recent_projects': recent_projects,
         'project_stats': project_stats,
         'sales_stats': sales_stats,
+        'reorder': forecast.reorder,
     }
     return render(request, 'calculator/index.html', context)
 
@@ -61,6 +78,8 @@ def add_filament(request):
     
     return render(request, 'calculator/add_filament.html', {'form': form})
 
+@cached_view(Filament, Project)
+@reporting_reads
 def view_filament(request, pk):
     filament = get_object_or_404(Filament, pk=pk)
     projects = Project.objects.filter(filament=filament)
@@ -75,13 +94,13 @@ def view_filament(request, pk):
 
     # Normalize None -> 0
     stats_count = stats.get('count') or 0
-    stats_total_cost = float(stats.get('total_cost') or 0)
-    stats_total_selling = float(stats.get('total_selling') or 0)
+    stats_total_cost = stats.get('total_cost') or 0  # whole Toman, exact integer SUM
+    stats_total_selling = stats.get('total_selling') or 0
     stats_total_weight = float(stats.get('total_weight') or 0)
 
     # Profit and average profit
     profit = stats_total_selling - stats_total_cost
-    avg_profit = (profit / stats_count) if stats_count else 0
+    avg_profit = toman(profit / stats_count) if stats_count else 0
 
     stats['count'] = stats_count
     stats['total_cost'] = stats_total_cost
@@ -102,7 +121,7 @@ def view_filament(request, pk):
         remaining_amount_m = float(getattr(filament, 'remaining_amount', 0) or 0)
     except Exception:
         remaining_amount_m = 0.0
-    remaining_value = remaining_amount_m * cost_per_meter
+    remaining_value = toman(remaining_amount_m * cost_per_meter)
 
     try:
         initial_amount_m = float(getattr(filament, 'initial_amount', 0) or 0)
@@ -232,8 +251,48 @@ def sales(request):
     }
     return render(request, 'calculator/sales.html', context)
 
+
+def orders(request):
+    if request.method == 'POST':
+        form = OrderForm(request.POST)
+        if form.is_valid():
+            fields = {name: form.cleaned_data[name] for name in form.Meta.fields}
+            order = Order.place(form.cleaned_data['lines'], **fields)
+            messages.success(request, f'سفارش {order.pk} با {order.line_count} قلم و مبلغ {order.total_price} تومان ثبت شد')
+            return redirect(order)
+    else:
+        form = OrderForm()
+
+    all_projects = Project.objects.select_related('filament').order_by('code')
+    cart_projects = [
+        {'code': p.code, 'name': p.model_name, 'price': p.selling_price, 'cost': p.total_cost}
+        for p in all_projects
+    ]
+    context = {
+        'form': form,
+        'cart_projects': cart_projects,
+        'recent_orders': Order.objects.all()[:20],
+    }
+    return render(request, 'calculator/orders.html', context)
+
+
+def order_detail(request, pk):
+    order = get_object_or_404(Order, pk=pk)
+    lines = order.lines.select_related('project__filament').order_by('id')
+    context = {
+        'order': order,
+        'lines': lines,
+        'plate_order': '\n'.join(f'{line.project_code} x {line.quantity}' for line in lines),
+    }
+    return render(request, 'calculator/order_detail.html', context)
+
 # views.py - Update the reports function
 
+REPORTS_PAGE_SIZE = 50
+
+
+@cached_view(Sale, Order, Customer, Project, Filament, time_bucket=60)
+@reporting_reads
 def reports(request):
     period = request.GET.get('period', 'month')
     item_filter = request.GET.get('item_filter', '')
@@ -253,21 +312,31 @@ def reports(request):
         period_name = "همه زمان‌ها"
     
     # Base queryset
-    sales_qs = Sale.objects.select_related('project__filament')
+    sales_qs = Sale.objects.all()
     if date_filter:
         sales_qs = sales_qs.filter(sale_date__gte=date_filter)
     if item_filter:
         sales_qs = sales_qs.filter(project__model_name__icontains=item_filter)
-    
-    sales_data = sales_qs.all()
-    
-    # Calculate statistics - Updated for new field names
-    total_sales = sales_data.count()
-    total_revenue = sum(sale.total_price for sale in sales_data)  # Updated field name
-    total_production_cost = sum(sale.project.total_cost * sale.quantity for sale in sales_data if sale.project)  # Updated calculation
-    total_packaging_cost = sum(sale.packaging_cost for sale in sales_data)  # New field
-    total_cost = total_production_cost + total_packaging_cost
-    total_profit = sum(sale.total_profit for sale in sales_data)  # Use model property
+
+    # Closed fiscal years moved to the archive count through their day
+    # rollups; their sale rows are only read when drilled into (?archived=1)
+    since = timezone.localdate(date_filter) if date_filter else None
+    cutoff = archived_through()
+    archive = archived_report(since, item_filter) if cutoff and (since is None or since <= cutoff) else None
+    show_archived = bool(archive) and request.GET.get('archived') == '1'
+
+    # Totals in one aggregate query; the table shows one page of lightweight rows
+    totals = sales_totals(sales_qs)
+    if archive:
+        totals = {k: v + archive['totals'][k] for k, v in totals.items()}
+    if show_archived:
+        paginator = Paginator(archived_sale_rows_queryset(since, item_filter), REPORTS_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_obj.object_list = list(archived_sale_rows(page_obj.object_list))
+    else:
+        paginator = Paginator(sale_rows_queryset(sales_qs.order_by('-sale_date', '-id')), REPORTS_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_obj.object_list = list(sale_rows(page_obj.object_list))
     
     # Top products - Updated field name
     top_products = (sales_qs.values('project__model_name')
@@ -276,40 +345,91 @@ def reports(request):
                        revenue=Sum('total_price'),  # Updated field name
                        total_quantity=Sum('quantity')  # New aggregation
                    )
-                   .order_by('-count')[:10])
+                   .order_by('-count'))
     
-    # Daily stats - Updated field name
-    daily_stats = (sales_qs.extra({'date': "date(sale_date)"})
-                  .values('date')
+    # Daily stats by local date (Sale.calendar_day is the stored local date)
+    daily_stats = (sales_qs.values('calendar_day', 'calendar_day__jalali_year',
+                                   'calendar_day__jalali_month', 'calendar_day__jalali_day')
                   .annotate(
                       count=Count('id'), 
                       revenue=Sum('total_price'),  # Updated field name
                       total_quantity=Sum('quantity')  # New aggregation
                   )
-                  .order_by('-date')[:30])
+                  .order_by('-calendar_day')[:30])
+
+    # Jalali month stats via the calendar dimension
+    monthly_stats = (sales_qs.values('calendar_day__jalali_year', 'calendar_day__jalali_month')
+                    .annotate(
+                        count=Count('id'),
+                        revenue=Sum('total_price'),
+                        total_quantity=Sum('quantity')
+                    )
+                    .order_by('-calendar_day__jalali_year', '-calendar_day__jalali_month')[:12])
+    if archive:
+        top_products = merge_stats(top_products, archive['products'], ['project__model_name'],
+                                   order_by=lambda r: r['count'], limit=10)
+        daily_stats = merge_stats(daily_stats, archive['daily'], ['calendar_day'],
+                                  order_by=lambda r: r['calendar_day'], limit=30)
+        monthly_stats = merge_stats(monthly_stats, archive['monthly'],
+                                    ['calendar_day__jalali_year', 'calendar_day__jalali_month'],
+                                    order_by=lambda r: (r['calendar_day__jalali_year'], r['calendar_day__jalali_month']),
+                                    limit=12)
+    else:
+        top_products = top_products[:10]
+    for m in monthly_stats:
+        m['label'] = jalali_month_label(m['calendar_day__jalali_year'], m['calendar_day__jalali_month'])
     
     context = {
-        'sales_data': sales_data,
-        'total_sales': total_sales,
-        'total_revenue': total_revenue,
-        'total_cost': total_cost,
-        'total_production_cost': total_production_cost,
-        'total_packaging_cost': total_packaging_cost,
-        'total_profit': total_profit,
+        **totals,
+        'page_obj': page_obj,
         'top_products': top_products,
         'daily_stats': daily_stats,
+        'monthly_stats': monthly_stats,
         'period': period,
         'period_name': period_name,
         'item_filter': item_filter,
+        # Per-order figures come from the stored order totals; a product
+        # filter selects lines, not orders, so they are left out then
+        **(order_totals(date_filter) if not item_filter else {}),
+        # Lifetime totals, archived sales included: a read of the revenue index
+        'top_customers': Customer.objects.filter(order_count__gt=0)[:10],
+        'archived_sales': archive['totals']['total_sales'] if archive else 0,
+        'archived_through': cutoff,
+        'show_archived': show_archived,
     }
     return render(request, 'calculator/reports.html', context)
 
 
-def _D(val, default='0'):
+@reporting_reads
+def sales_analytics(request):
+    """
+    GET params:
+      bucket: hour | day | week | month | quarter | year (Jalali periods), default day
+      start, end: local dates YYYY-MM-DD, end inclusive (default: last 30 days)
+      group: project | filament | material (optional)
+    """
+    bucket = request.GET.get('bucket', 'day')
+    group = request.GET.get('group') or None
+    if bucket not in BUCKETS:
+        return JsonResponse({'error': 'بازه گروه‌بندی نامعتبر است'}, status=400)
+    if group and group not in GROUPS:
+        return JsonResponse({'error': 'نوع گروه‌بندی نامعتبر است'}, status=400)
+
+    today = timezone.localdate()
     try:
-        return Decimal(str(val))
-    except (InvalidOperation, TypeError, ValueError):
-        return Decimal(default)
+        end_date = date.fromisoformat(request.GET['end']) if request.GET.get('end') else today
+        start_date = (date.fromisoformat(request.GET['start']) if request.GET.get('start')
+                      else end_date - timedelta(days=29))
+    except ValueError:
+        return JsonResponse({'error': 'تاریخ نامعتبر است'}, status=400)
+    if start_date > end_date:
+        return JsonResponse({'error': 'تاریخ شروع بعد از تاریخ پایان است'}, status=400)
+
+    data = sales_series(start_date, end_date, bucket=bucket, group=group)
+    data['start'] = start_date.isoformat()
+    data['end'] = end_date.isoformat()
+    return JsonResponse(data)
+
 
 # ---------- Pricing Settings UI (public) ----------
 @require_http_methods(["GET", "POST"])
@@ -335,8 +455,278 @@ def pricing_settings_view(request):
         'settings_obj': settings_obj,
     })
 
-def pricing_settings_json(request):
-    s = PricingSettings.get_solo()
+@require_http_methods(["GET", "POST"])
+def repricing(request):
+    # NumPy is only needed here; keep it off the import path of every other view
+    from .repricing import apply_proposals, propose_prices
+
+    proposals, unfitted = propose_prices()
+    if request.method == 'POST':
+        selected = set(request.POST.getlist('project'))
+        chosen = [p for p in proposals if str(p['project_id']) in selected]
+        if not chosen:
+            messages.error(request, 'هیچ مدلی برای اعمال قیمت انتخاب نشده است.')
+        else:
+            count = apply_proposals(chosen)
+            messages.success(request, f'قیمت جدید برای {count} مدل اعمال شد.')
+        return redirect('calculator:repricing')
+
+    return render(request, 'calculator/repricing.html', {
+        'proposals': proposals,
+        'total_gain': sum(p['expected_gain'] for p in proposals),
+        'unfitted': unfitted,
+    })
+
+def nesting_planner(request):
+    """
+    Pack an order's parts onto build plates. The order is typed in, pre-filled
+    from today's sales (?source=today) or passed as ?order= lines, which is how
+    the order detail page links here.
+    """
+    from django.conf import settings
+    from .forms import NestingForm
+    from .nesting import plan_plates
+
+    bed_x, bed_y = settings.PRINT_BED_SIZE_MM
+    initial = {
+        'bed_x': bed_x,
+        'bed_y': bed_y,
+        'spacing': settings.NESTING_PART_SPACING_MM,
+        'warmup_minutes': settings.PLATE_WARMUP_MINUTES,
+    }
+    if request.GET.get('source') == 'today':
+        today = (Sale.objects.filter(calendar_day=timezone.localdate())
+                 .values_list('project_code').annotate(units=Sum('quantity')).order_by('project_code'))
+        initial['order'] = '\n'.join(f'{code} x {units}' for code, units in today)
+        form = NestingForm(initial=initial)
+        if not initial['order']:
+            messages.info(request, 'امروز فروشی ثبت نشده است.')
+    elif 'order' in request.GET:
+        form = NestingForm({**initial, **request.GET.dict()})
+    else:
+        form = NestingForm(initial=initial)
+
+    plan = None
+    if form.is_bound and form.is_valid():
+        d = settings.DEFAULT_SETTINGS
+        plan = plan_plates(
+            form.cleaned_data['order'],
+            form.cleaned_data['bed_x'],
+            form.cleaned_data['bed_y'],
+            form.cleaned_data['spacing'],
+            warmup_hours=form.cleaned_data['warmup_minutes'] / 60,
+            hourly_cost=d['electricity_cost_per_kwh'] * d['printer_power'] + d['printer_depreciation_per_hour'],
+        )
+
+    return render(request, 'calculator/nesting.html', {
+        'form': form,
+        'plan': plan,
+        'bed_x': form.cleaned_data['bed_x'] if plan else bed_x,
+        'bed_y': form.cleaned_data['bed_y'] if plan else bed_y,
+    })
+
+def farm(request):
+    """Printers and their planned queues; POST adds a job and slots it into the plan."""
+    from django.conf import settings
+    from . import scheduler
+
+    if request.method == 'POST':
+        form = PrintJobForm(request.POST)
+        if form.is_valid():
+            job = form.save()
+            if scheduler.schedule_jobs([job]):
+                messages.warning(request, f'هیچ پرینتر فعالی نمی‌تواند مدل {job.project.code} را چاپ کند.')
+            else:
+                messages.success(request, f'{job.quantity} عدد مدل {job.project.code} به صف چاپ اضافه شد')
+            return redirect('calculator:farm')
+    else:
+        form = PrintJobForm()
+
+    printers = list(Printer.objects.select_related('loaded_filament'))
+    jobs = (PrintJob.objects.exclude(status=PrintJob.STATUS_DONE)
+            .select_related('project__filament').order_by('sequence', 'created_date'))
+    lanes = {printer.pk: {'printer': printer, 'printing': None, 'queue': [], 'end': None} for printer in printers}
+    unassigned = []
+    for job in jobs:
+        lane = lanes.get(job.printer_id)
+        if lane is None:
+            unassigned.append(job)
+        elif job.status == PrintJob.STATUS_PRINTING:
+            lane['printing'] = job
+        else:
+            lane['queue'].append(job)
+    for lane in lanes.values():
+        planned = ([lane['printing']] if lane['printing'] else []) + lane['queue']
+        lane['end'] = max((j.planned_end for j in planned if j.planned_end), default=None)
+        lane['hours'] = sum(j.duration_hours for j in lane['queue'])
+        # Time cost of the queue on this printer (its own power draw and depreciation)
+        lane['time_cost'] = toman(lane['hours'] * (
+            lane['printer'].power_kw * settings.DEFAULT_SETTINGS['electricity_cost_per_kwh'] +
+            lane['printer'].depreciation_per_hour))
+
+    # Material check: queued demand per spool against what is left on it
+    demand = {}
+    for job in jobs:
+        filament = job.project.filament
+        needed = demand.setdefault(filament.pk, [filament, 0.0])
+        needed[1] += job.project.filament_used_mm * job.quantity / 1000
+    shortages = [(f, needed) for f, needed in demand.values() if needed > f.remaining_amount]
+
+    ends = [lane['end'] for lane in lanes.values() if lane['end']]
+    return render(request, 'calculator/farm.html', {
+        'shortages': shortages,
+        'form': form,
+        'lanes': list(lanes.values()),
+        'unassigned': unassigned,
+        'makespan_end': max(ends) if ends else None,
+    })
+
+@require_http_methods(["GET", "POST"])
+def printer_form(request, pk=None):
+    printer = get_object_or_404(Printer, pk=pk) if pk else None
+    if request.method == 'POST':
+        form = PrinterForm(request.POST, instance=printer)
+        if form.is_valid():
+            printer = form.save()
+            # Bed, material or availability may have changed what can go where
+            from .scheduler import plan_schedule
+            plan_schedule()
+            messages.success(request, f'پرینتر «{printer.name}» ذخیره شد')
+            return redirect('calculator:farm')
+    else:
+        form = PrinterForm(instance=printer)
+    return render(request, 'calculator/printer_form.html', {'form': form, 'printer': printer})
+
+@require_POST
+def printer_status(request, pk):
+    from .scheduler import printer_down, printer_up
+
+    printer = get_object_or_404(Printer, pk=pk)
+    if printer.is_active:
+        stuck = printer_down(printer)
+        messages.warning(request, f'پرینتر «{printer.name}» از مدار خارج شد و کارهایش جابه‌جا شد'
+                         + (f' ({len(stuck)} کار بدون پرینتر مناسب)' if stuck else ''))
+    else:
+        printer_up(printer)
+        messages.success(request, f'پرینتر «{printer.name}» دوباره فعال شد')
+    return redirect('calculator:farm')
+
+@require_POST
+def print_job_action(request, pk, action):
+    from . import scheduler
+
+    job = get_object_or_404(PrintJob.objects.select_related('project__filament'), pk=pk)
+    if action == 'start' and job.status == PrintJob.STATUS_QUEUED and job.printer_id:
+        if PrintJob.objects.filter(printer=job.printer_id, status=PrintJob.STATUS_PRINTING).exists():
+            messages.error(request, 'این پرینتر در حال چاپ کار دیگری است.')
+        else:
+            scheduler.start_job(job)
+    elif action == 'done' and job.status == PrintJob.STATUS_PRINTING:
+        scheduler.finish_job(job)
+    elif action == 'delete' and job.status == PrintJob.STATUS_QUEUED:
+        scheduler.remove_job(job)
+    else:
+        messages.error(request, 'این عملیات برای این کار ممکن نیست.')
+    return redirect('calculator:farm')
+
+@require_POST
+def farm_replan(request):
+    from .scheduler import plan_schedule
+
+    stuck = plan_schedule()
+    messages.success(request, 'برنامه چاپ از نو محاسبه شد'
+                     + (f' ({len(stuck)} کار بدون پرینتر مناسب)' if stuck else ''))
+    return redirect('calculator:farm')
+
+def profiles(request):
+    from django.conf import settings
+    from .profiling import list_profiles
+
+    return render(request, 'calculator/profiles.html', {
+        'profiles': list_profiles(),
+        'enabled': settings.PROFILING_ENABLED,
+    })
+
+def profile_detail(request, stem):
+    from .profiling import profile_path, top_functions
+
+    path = profile_path(stem, '.json')
+    if path is None:
+        raise Http404
+    with open(path, encoding='utf-8') as f:
+        meta = json.load(f)
+    sort = request.GET.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'ncalls'):
+        sort = 'cumulative'
+    return render(request, 'calculator/profile_detail.html', {
+        'meta': meta,
+        'report': top_functions(stem, sort=sort),
+        'sort': sort,
+    })
+
+def profile_file(request, stem, ext):
+    from .profiling import profile_path
+
+    path = profile_path(stem, f'.{ext}')
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+JOB_STATUS_LABELS = {
+    'queued': 'در صف',
+    'running': 'در حال اجرا',
+    'done': 'انجام شد',
+    'failed': 'ناموفق',
+}
+
+def jobs(request):
+    """Background job queue: counts per status, live workers and the newest jobs."""
+    from datetime import datetime, timezone as dt_timezone
+    from django.conf import settings
+    from . import jobqueue
+
+    status = request.GET.get('status')
+    if status not in JOB_STATUS_LABELS:
+        status = None
+
+    def when(ts):
+        return timezone.localtime(datetime.fromtimestamp(ts, dt_timezone.utc)) if ts else None
+
+    rows = [{
+        'job': job,
+        'status_label': JOB_STATUS_LABELS.get(job.status, job.status),
+        'created': when(job.created),
+        'run_after': when(job.run_after) if job.status == 'queued' else None,
+        'finished': when(job.finished),
+        'duration': job.finished - job.started if job.finished and job.started else None,
+    } for job in jobqueue.recent(status)]
+    counts = jobqueue.counts()
+    return render(request, 'calculator/jobs.html', {
+        'rows': rows,
+        'status': status,
+        'statuses': [(key, label, counts[key]) for key, label in JOB_STATUS_LABELS.items()],
+        'workers': len(jobqueue.running_workers()),
+        'configured_workers': settings.JOB_WORKERS,
+        'worker_mode': settings.JOB_WORKER_MODE,
+    })
+
+@require_POST
+def job_action(request, pk, action):
+    from . import jobqueue
+
+    if action == 'retry' and jobqueue.retry(pk):
+        messages.success(request, f'کار #{pk} دوباره در صف قرار گرفت')
+    elif action == 'cancel' and jobqueue.cancel(pk):
+        messages.success(request, f'کار #{pk} لغو شد')
+    else:
+        messages.error(request, 'این عملیات برای این کار ممکن نیست.')
+    return redirect('calculator:jobs')
+
+def response_cache_stats(request):
+    return JsonResponse(response_cache.stats())
+
+async def pricing_settings_json(request):
+    s = await PricingSettings.aget_solo()
     return JsonResponse({
         'power_price_per_kwh': float(s.power_price_per_kwh),
         'depreciation_per_hour': float(s.depreciation_per_hour),
@@ -349,6 +739,7 @@ def pricing_settings_json(request):
         'updated_at': s.updated_at.isoformat(),
     })
 
+@cached_view(Project, Filament)
 def projects(request):
     q = request.GET.get('q', '').strip()
     material = request.GET.get('material', '').strip()
@@ -395,13 +786,12 @@ def projects(request):
 
     # Handle profit sorting by annotation: selling_price - total_cost
     if sort in ('profit', '-profit'):
-        qs = qs.annotate(_profit=Decimal('0'))  # fallback if needed
-        # Use expression: selling_price - total_cost
-        from django.db.models import F, ExpressionWrapper, DecimalField
+        # Use expression: selling_price - total_cost (whole Toman)
+        from django.db.models import F, ExpressionWrapper, BigIntegerField
         qs = qs.annotate(
             profit_value=ExpressionWrapper(
                 F('selling_price') - F('total_cost'),
-                output_field=DecimalField(max_digits=14, decimal_places=2)
+                output_field=BigIntegerField()
             )
         )
         qs = qs.order_by('profit_value' if sort == 'profit' else '-profit_value')
@@ -432,87 +822,137 @@ def projects(request):
     return render(request, 'calculator/projects.html', context)
 
 @require_POST
-def calculate_preview(request):
+def mesh_analyze(request):
     """
-    Expected JSON:
-    {
-      filament_used_mm: number,
-      print_time_hours: number,
-      size_x: number, size_y: number, size_z: number,
-      filament_cost_per_kg: number,
-      post_processing_enabled: bool,
-      painting_enabled: bool,
-      packaging_cost: number (optional)
-      // optional:
-      // filament_id: number  -> if you later add diameter/density per spool
-    }
+    Volume / surface area / bounding box of an uploaded STL or 3MF ('file'),
+    so the project form can fill its dimensions before saving. Sync on
+    purpose: the work is NumPy number crunching, not waiting.
     """
-    try:
-        data = json.loads(request.body.decode('utf-8'))
-    except Exception:
-        return JsonResponse({'error': 'ورودی نامعتبر است'}, status=400)
-
-    s = PricingSettings.get_solo()
-
-    # Parse inputs
-    filament_used_mm      = _D(data.get('filament_used_mm'))
-    print_time_hours      = _D(data.get('print_time_hours'))
-    size_x                = _D(data.get('size_x'))
-    size_y                = _D(data.get('size_y'))
-    size_z                = _D(data.get('size_z'))
-    filament_cost_per_kg  = _D(data.get('filament_cost_per_kg'))
-    post_processing_flag  = bool(data.get('post_processing_enabled'))
-    painting_flag         = bool(data.get('painting_enabled'))
+    from .mesh import MeshError, analyze_mesh
 
-    packaging_cost = _D(
-        data.get('packaging_cost'),
-        default=str(s.packaging_cost)
-    ) if data.get('packaging_cost') is not None else s.packaging_cost
-
-    # ----- Filament weight (fixed) -----
-    # Use a robust default grams-per-meter for 1.75 mm filament
-    # 1.75 mm PLA theoretical ~2.98 g/m; we use 3.0 g/m default for practicality.
-    g_per_m = _D('3.0')
-
-    # If you want to consider material density/diameter later, see Option B/C below.
-    filament_length_m = filament_used_mm / _D('1000')
-    filament_weight_g = filament_length_m * g_per_m
-
-    # Apply waste % from settings
-    filament_weight_g *= (_D('1') + s.filament_waste_percent / _D('100'))
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'فایلی ارسال نشده است'}, status=400)
+    source = upload.temporary_file_path() if hasattr(upload, 'temporary_file_path') else upload
+    try:
+        stats = analyze_mesh(source, name=upload.name)
+    except MeshError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'triangles': stats.triangles,
+        'volume_cm3': stats.volume_mm3 / 1000,
+        'surface_cm2': stats.surface_mm2 / 100,
+        'size_x': round(stats.size_x, 1),
+        'size_y': round(stats.size_y, 1),
+        'size_z': round(stats.size_z, 1),
+    })
 
-    # ----- Costs -----
-    material_cost     = (filament_weight_g / _D('1000')) * filament_cost_per_kg
+@require_POST
+def gcode_analyze(request):
+    """
+    Simulated print time / filament of an uploaded G-code ('file') under the
+    motion limits of printer 'printer' (optional), so the project form can
+    show them before saving. Sync for the same reason as mesh_analyze.
+    """
+    from .gcode import GcodeError, default_profile, estimate_print_time
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'فایلی ارسال نشده است'}, status=400)
+    printer_id = request.POST.get('printer', '')
+    printer = Printer.objects.filter(pk=printer_id).first() if printer_id.isdigit() else None
+    source = upload.temporary_file_path() if hasattr(upload, 'temporary_file_path') else upload
+    try:
+        stats = estimate_print_time(source, printer.motion_profile() if printer else default_profile(),
+                                    name=upload.name)
+    except GcodeError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'moves': stats.moves,
+        'print_time_hours': round(stats.seconds / 3600, 2),
+        'filament_mm': round(stats.filament_mm, 1),
+    })
 
-    # Electricity: using a conservative default average power 120W
-    average_watts     = _D('120')
-    electricity_cost  = (average_watts * print_time_hours / _D('1000')) * s.power_price_per_kwh
+@require_POST
+def quote_simulation(request):
+    """
+    Monte Carlo of a quote's cost (calculator/quote_risk.py): calculate_preview's
+    JSON inputs plus distributions for failure rate, waste, print-time error
+    and energy price; returns cost / price percentiles and the margin needed
+    for the target probability of profit. Sync like mesh_analyze.
+    """
+    from .quote_risk import QuoteRiskError, simulate_quote
 
-    depreciation_cost = s.depreciation_per_hour * print_time_hours
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except Exception:
+        return JsonResponse({'error': 'ورودی نامعتبر است'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'ورودی نامعتبر است'}, status=400)
 
-    post_processing_cost = s.post_processing_rate if post_processing_flag else _D('0')
+    printer = None
+    if isinstance(data.get('printer_id'), int):
+        printer = Printer.objects.filter(pk=data['printer_id']).first()
+    start = time.perf_counter()
+    try:
+        result = simulate_quote(data, PricingSettings.get_solo(), printer)
+    except QuoteRiskError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return JsonResponse(result)
+
+# ---------- Read-only JSON endpoints (async) ----------
+# These are polled by the shop-floor tablets, so they are native async views:
+# under ASGI (see run_app.py / config/asgi.py) they don't tie up a worker thread
+# while a client keeps its connection open. Note Django 4.2's require_POST is
+# sync-only, so the method is checked inline.
+
+async def calculate_preview(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except Exception:
+        return JsonResponse({'error': 'ورودی نامعتبر است'}, status=400)
 
-    # Surface area estimate in cm^2: 2(xy + yz + xz), inputs are mm so convert mm^2 -> cm^2 by /100
-    surface_cm2 = (_D('2') * ((size_x * size_y) + (size_y * size_z) + (size_x * size_z))) / _D('100')
-    painting_cost = (s.painting_rate_per_cm2 * surface_cm2) if painting_flag else _D('0')
+    s = await PricingSettings.aget_solo()
+    printer = None
+    if isinstance(data.get('printer_id'), int):
+        printer = await Printer.objects.filter(pk=data['printer_id']).afirst()
+    return JsonResponse(preview_costs(data, s, printer))
 
-    base_total = material_cost + electricity_cost + depreciation_cost + post_processing_cost + painting_cost + packaging_cost
+async def customer_lookup(request):
+    """Sales-counter lookup by phone: one read of the unique normalized-phone index."""
+    from .customers import normalize_phone
 
-    # Selling price with profit and rounding
-    selling_price = base_total * (_D('1') + s.profit_percent / _D('100'))
-    if s.round_to_nearest and s.round_to_nearest > 0:
-        step = s.round_to_nearest
-        selling_price = (selling_price / step).to_integral_value(rounding=ROUND_HALF_UP) * step
+    phone = normalize_phone(request.GET.get('phone'))
+    customer = await Customer.objects.filter(phone=phone).afirst() if phone else None
+    if customer is None:
+        return JsonResponse({'error': 'مشتری یافت نشد'}, status=404)
+    return JsonResponse({
+        'id': customer.pk,
+        'phone': customer.phone,
+        'name': customer.name,
+        'order_count': customer.order_count,
+        'revenue': customer.revenue,
+        'profit': customer.profit,
+        'first_purchase': customer.first_purchase,
+        'last_purchase': customer.last_purchase,
+    })
 
+async def project_lookup(request, code):
+    try:
+        p = await Project.objects.select_related('filament').aget(code=code)
+    except Project.DoesNotExist:
+        return JsonResponse({'error': 'کد وارد شده یافت نشد!'}, status=404)
     return JsonResponse({
-        'filament_weight': float(filament_weight_g),
-        'material_cost': float(material_cost),
-        'electricity_cost': float(electricity_cost),
-        'depreciation_cost': float(depreciation_cost),
-        'post_processing_cost': float(post_processing_cost),
-        'painting_cost': float(painting_cost),
-        'total_cost': float(base_total),
-        'selling_price': float(selling_price),
-        # Debug helpers
-        'g_per_m': float(g_per_m),
-    })
\ No newline at end of file
+        'id': p.pk,
+        'code': p.code,
+        'model_name': p.model_name,
+        'filament': str(p.filament),
+        'material': p.filament.material,
+        'picture': p.picture.url if p.has_image else None,
+        'cost': p.total_cost,
+        'price': p.selling_price,
+        'profit': p.profit,
+    })
@@ -2,6 +2,8 @@
 ASGI config for print_calculator project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+``run_app.py`` serves it with uvicorn when ``APP_SERVER=asgi`` is set;
+static files are served from STATIC_ROOT (precompressed, fingerprinted).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,5 +13,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from calculator.static_handlers import ASGICollectedStaticFilesHandler  # noqa: E402  (needs apps loaded)
+
+application = ASGICollectedStaticFilesHandler(django_application)
 
@@ -1,6 +1,7 @@
 import os
 import sys
 from pathlib import Path
+from urllib.parse import quote
 
 # --------------------------------------------------------------------------------------
 # Paths and runtime environment
@@ -56,21 +57,41 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # Before staticfiles so calculator's runserver (collected static serving) wins
     'calculator',
+    'django.contrib.staticfiles',
 ]
 
 MIDDLEWARE = [
+    # Removed at startup unless PROFILING_ENABLED
+    'calculator.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Session / auth / messages, skipped for /api/ (see calculator/middleware.py)
+    'calculator.middleware.SessionExceptAPIMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'calculator.middleware.AuthenticationExceptAPIMiddleware',
+    'calculator.middleware.MessageExceptAPIMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "calculator.middleware.LicenseRequiredMiddleware",
 ]
 
+# APP_PROFILE (env CALCULATOR_APP_PROFILE): "full" (default) or "slim" for the
+# kiosk bundle, which leaves out the admin and the contrib apps only it needs
+# (auth, contenttypes, sessions; sessions never touch the database here), so
+# startup imports, checks and migrates less. /admin/ is routed only with the
+# admin app installed.
+APP_PROFILE = os.environ.get("CALCULATOR_APP_PROFILE", "full")
+SLIM_DROPPED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+]
+if APP_PROFILE == "slim":
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SLIM_DROPPED_APPS]
+    MIDDLEWARE.remove('calculator.middleware.AuthenticationExceptAPIMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 # --------------------------------------------------------------------------------------
@@ -85,7 +106,7 @@ TEMPLATES = [
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
+                *(['django.contrib.auth.context_processors.auth'] if APP_PROFILE != "slim" else []),
                 'django.contrib.messages.context_processors.messages',
             ],
         },
@@ -101,8 +122,98 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": str(DATA_DIR / "calculator.sqlite3"),
-    }
+    },
+    # Same file opened read-only (query_only, own page cache) for reports and
+    # analytics; see calculator.dbrouting. With the WAL journal its long
+    # aggregations read a snapshot while sales keep committing on "default".
+    "reporting": {
+        "ENGINE": "django.db.backends.sqlite3",
+        # Percent-encoded: "?", "#" or "%" in the data path would end the URI path
+        "NAME": f"file:{quote(str(DATA_DIR / 'calculator.sqlite3'))}?mode=ro",
+        "TEST": {"MIRROR": "default"},
+    },
+    # Closed fiscal years of sales (manage.py archive_sales); see calculator.archive
+    "archive": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(DATA_DIR / "archive.sqlite3"),
+    },
+}
+DATABASE_ROUTERS = ["calculator.dbrouting.ReportingRouter"]
+# Page cache of each reporting connection, KiB
+REPORTING_CACHE_KIB = 64 * 1024
+
+# --------------------------------------------------------------------------------------
+# Sessions and flash messages – kept out of the SQLite file
+# SESSION_STORE (env CALCULATOR_SESSION_STORE):
+#   "signed_cookies" – session data lives in a signed cookie (default)
+#   "memory"         – in-process LRU cache (lost on restart)
+#   "file"           – cache files under DATA_DIR/sessions, shared by all terminals
+# --------------------------------------------------------------------------------------
+SESSION_STORE = os.environ.get("CALCULATOR_SESSION_STORE", "signed_cookies")
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
 }
+if SESSION_STORE == "memory":
+    CACHES["sessions"] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",  # LRU eviction
+        "LOCATION": "calculator-sessions",
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    }
+elif SESSION_STORE == "file":
+    CACHES["sessions"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(DATA_DIR / "sessions"),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    }
+
+if "sessions" in CACHES:
+    SESSION_ENGINE = "django.contrib.sessions.backends.cache"
+    SESSION_CACHE_ALIAS = "sessions"
+else:
+    SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+
+# Flash messages ride in their own signed cookie, whatever the session store
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+# --------------------------------------------------------------------------------------
+# Request profiling (env CALCULATOR_PROFILING=1; then add ?_profile or an
+# X-Profile header to a request). Profiles are listed at /profiles/.
+# --------------------------------------------------------------------------------------
+PROFILING_ENABLED = os.environ.get("CALCULATOR_PROFILING") == "1"
+PROFILES_DIR = DATA_DIR / "profiles"
+PROFILES_KEEP = 100
+
+# --------------------------------------------------------------------------------------
+# Backups (manage.py backup / restore; run_app also snapshots every
+# BACKUP_INTERVAL_HOURS, 0 disables). The databases are copied with SQLite's
+# online backup API, BACKUP_PAGES_PER_STEP pages at a time with a
+# BACKUP_STEP_PAUSE (seconds) between steps, so writers only wait one step.
+# --------------------------------------------------------------------------------------
+BACKUP_DIR = Path(os.environ.get("CALCULATOR_BACKUP_DIR", DATA_DIR / "backups")).expanduser()
+BACKUP_KEEP = 14
+BACKUP_INTERVAL_HOURS = float(os.environ.get("CALCULATOR_BACKUP_HOURS", "24"))
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE = 0.005
+
+# --------------------------------------------------------------------------------------
+# Background jobs (calculator.jobqueue): a durable queue in its own SQLite file,
+# worked by JOB_WORKERS threads that run_app starts (env CALCULATOR_JOB_WORKERS;
+# 0 runs every job inline). JOB_WORKER_MODE "process" uses worker processes
+# instead, for CPU-bound tasks. A failed job is retried after
+# JOB_RETRY_BASE_SECONDS, doubling per attempt, up to JOB_MAX_ATTEMPTS; idle
+# workers look for due jobs every JOB_POLL_SECONDS. Finished jobs are kept for
+# JOB_KEEP_DAYS for the status page (/jobs/).
+# --------------------------------------------------------------------------------------
+JOB_QUEUE_DB = DATA_DIR / "jobs.sqlite3"
+JOB_WORKERS = int(os.environ.get("CALCULATOR_JOB_WORKERS", "2"))
+JOB_WORKER_MODE = os.environ.get("CALCULATOR_JOB_WORKER_MODE", "thread")
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 10
+JOB_POLL_SECONDS = 2.0
+JOB_KEEP_DAYS = 7
 
 # --------------------------------------------------------------------------------------
 # Password validation
@@ -143,7 +254,13 @@ except Exception:
 # --------------------------------------------------------------------------------------
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [RUNTIME_ASSETS_ROOT / 'static']
-STATIC_ROOT = SOURCE_BASE_DIR / 'static_root'  # if you ever run collectstatic
+STATIC_ROOT = RUNTIME_ASSETS_ROOT / 'static_root'  # `collectstatic` output, bundled into builds
+
+# Fingerprinted names + precompressed .gz/.br siblings (see calculator/storage.py)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "calculator.storage.CompressedManifestStaticFilesStorage"},
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = DATA_DIR / 'media'
@@ -168,6 +285,47 @@ DEFAULT_SETTINGS = {
     'profit_margin': 70
 }
 
+# Build-plate nesting planner defaults (calculator/nesting.py)
+PRINT_BED_SIZE_MM = (220, 220)
+NESTING_PART_SPACING_MM = 5
+# Heating, homing and purge paid once per print, on top of the slicer time
+PLATE_WARMUP_MINUTES = 10
+# Unload / load / purge when a printer switches spools (calculator/scheduler.py)
+SPOOL_CHANGE_MINUTES = 15
+
+# Motion limits the G-code print-time estimate (calculator/gcode.py) assumes
+# for projects without a printer: mm/s, mm/s^2 and mm (junction deviation).
+# M203 / M204 lines in the file override them, as they do on the printer.
+GCODE_MOTION_DEFAULTS = {
+    'max_speed_x': 200,
+    'max_speed_y': 200,
+    'max_speed_z': 12,
+    'max_speed_e': 120,
+    'acceleration': 1000,
+    'travel_acceleration': 1000,
+    'junction_deviation': 0.013,
+}
+
+# Filament reorder planning (calculator/forecasting.py): days from order to
+# delivery, and how many days of usage each reorder should cover on top
+FILAMENT_REORDER_LEAD_DAYS = 14
+FILAMENT_REORDER_COVER_DAYS = 30
+
+# First Jalali month of the fiscal year (1 = فروردین), used by CalendarDay
+FISCAL_YEAR_START_MONTH = 1
+
+# Fiscal years of sales kept in the main database (the current one included);
+# older, closed years are moved to archive.sqlite3 by manage.py archive_sales
+SALES_HOT_FISCAL_YEARS = 2
+
+# Monte Carlo quote simulation (calculator/quote_risk.py): draws per request
+# by default, and the most a request may ask for
+QUOTE_SIMULATION_DRAWS = 100000
+QUOTE_SIMULATION_MAX_DRAWS = 1000000
+
+# Rendered-page cache for projects/reports/view_filament (see calculator/cache.py)
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
 # --------------------------------------------------------------------------------------
 # Licensing public key
 # --------------------------------------------------------------------------------------
@@ -14,7 +14,6 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
@@ -22,13 +21,17 @@ from django.conf.urls.static import static
 from calculator.views_license import license_fingerprint, license_page, license_upload
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('calculator.urls')),
     path("license/", license_page, name="license_page"),
     path("license/upload", license_upload, name="license_upload"),
     path("license/fingerprint", license_fingerprint, name="license_fingerprint"),
 ]
 
+# Not installed in the slim app profile (APP_PROFILE)
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
 # Serve media files during development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,10 +1,13 @@
 # run_app.py
 import os
+import socket
 import sys
 import threading
 import time
 import webbrowser
 
+STARTED = time.perf_counter()
+
 def configure_paths_for_frozen():
     # When running as a PyInstaller bundle, resources are extracted to sys._MEIPASS.
     if getattr(sys, "frozen", False):
@@ -26,30 +29,65 @@ def main():
     # Run migrations in-process (avoid subprocess/manage.py under PyInstaller)
     from django.core.management import call_command
 
-    try:
-        # makemigrations is optional at runtime; only needed in dev. Harmless if none.
-        call_command("makemigrations", interactive=False, verbosity=0)
-    except Exception:
-        # Ignore if no changes or apps without migrations
-        pass
+    if not getattr(sys, "frozen", False):
+        try:
+            # makemigrations is optional at runtime; only needed in dev. Harmless if none.
+            call_command("makemigrations", interactive=False, verbosity=0)
+        except Exception:
+            # Ignore if no changes or apps without migrations
+            pass
 
-    # Apply migrations
+    # Apply migrations (the sales archive is a database of its own)
     call_command("migrate", interactive=False, verbosity=0)
+    call_command("migrate", database="archive", interactive=False, verbosity=0)
+
+    # Fresh planner statistics (also the admin's estimated row counts)
+    from calculator.dbstats import refresh_table_stats
+    refresh_table_stats()
+
+    # Periodic online snapshots of the databases and media (BACKUP_INTERVAL_HOURS)
+    from calculator.backup import start_backup_scheduler
+    start_backup_scheduler()
+
+    # Background job workers (JOB_WORKERS threads or processes)
+    from calculator.jobqueue import start_workers
+    start_workers()
 
     # Choose port (default 8765)
     port = os.environ.get("APP_PORT", "8765")
     addr = f"127.0.0.1:{port}"
 
+    # APP_SERVER=asgi serves config.asgi with uvicorn, so the async JSON
+    # endpoints can hold many open polling connections cheaply.
+    server_mode = os.environ.get("APP_SERVER", "wsgi").lower()
+
     # Start dev server in a thread (use_reloader=False to prevent a second process)
     def run_server():
+        if server_mode == "asgi":
+            try:
+                import uvicorn
+            except ImportError:
+                print("APP_SERVER=asgi needs uvicorn installed; falling back to runserver")
+            else:
+                from config.asgi import application
+                uvicorn.run(application, host="127.0.0.1", port=int(port), lifespan="off", log_level="info")
+                return
         call_command("runserver", addr, use_reloader=False, verbosity=1)
 
     t = threading.Thread(target=run_server, daemon=True)
     t.start()
 
-    # Wait a moment for the server to bind, then open browser
-    for _ in range(20):
-        time.sleep(0.2)
+    # Open the browser as soon as the server accepts connections (at most ~10 s)
+    for _ in range(1000):
+        try:
+            socket.create_connection(("127.0.0.1", int(port)), timeout=0.05).close()
+        except OSError:
+            if not t.is_alive():
+                break
+            time.sleep(0.01)
+        else:
+            print(f"Server listening on {addr} after {(time.perf_counter() - STARTED) * 1000:.0f} ms")
+            break
 
     try:
         webbrowser.open(f"http://{addr}/license")
@@ -64,4 +102,7 @@ def main():
         pass
 
 if __name__ == "__main__":
+    # Worker processes (JOB_WORKER_MODE=process) re-enter the frozen executable
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,22 @@
+// static/calculator/js/app.js
+// Add loading animation to buttons
+document.querySelectorAll('form').forEach(form => {
+    form.addEventListener('submit', function(e) {
+        const submitBtn = form.querySelector('button[type="submit"]');
+        if (submitBtn) {
+            const originalText = submitBtn.innerHTML;
+            submitBtn.innerHTML = '<span class="loading me-2"></span> در حال پردازش...';
+            submitBtn.disabled = true;
+        }
+    });
+});
+
+// Auto-hide alerts after 5 seconds
+setTimeout(() => {
+    document.querySelectorAll('.alert').forEach(alert => {
+        if (alert.classList.contains('show')) {
+            alert.classList.remove('show');
+            setTimeout(() => alert.remove(), 150);
+        }
+    });
+}, 5000);